@@ -8,26 +8,281 @@ conda-commands used by the pproject-module.
 
 import datetime as dt
 import getpass
+import hashlib
+import json
 import os
 from pathlib import Path
+import re
+import shutil
 import socket
 from subprocess import CalledProcessError
+import time
 
 import attr
-import jinja2
-from marshmallow import ValidationError
-from ruamel.yaml import YAML
-import six
 
 from ouroboros.tools.pproject import git
 from ouroboros.tools.pproject import inform
 from ouroboros.tools.pproject import utils
-from ouroboros.tools.pproject import validators
 
 
-CONFIG = utils.load_configs()
-CONDA_BIN = Path(CONFIG['conda_folder']) / 'bin/conda'
-CONDA_REPO_SETTINGS = CONFIG['conda_respository_server']
+CONFIG = utils.CONFIG
+PPROJECT_META = 'conda-meta/pproject.json'
+"""str: File inside a conda-environment storing the dependencies requested by
+pproject and the fingerprint of the environment."""
+LOCKFILE_NAME = 'conda.lock'
+"""str: Name of the lockfile stored next to the meta.yaml."""
+
+
+# -----------------------------------------------------------------------------
+def conda_bin():
+    """
+    Returns the path of the conda-executable as defined in the config.
+
+    Returns
+    -------
+    pathlib.Path
+    """
+    return Path(CONFIG['conda_folder']) / 'bin/conda'
+
+
+# -----------------------------------------------------------------------------
+def conda_repo_settings():
+    """
+    Returns the settings of the conda-repository-server as defined in the
+    config.
+
+    Returns
+    -------
+    dict
+    """
+    return CONFIG['conda_respository_server']
+
+
+# -----------------------------------------------------------------------------
+def normalize_dependency(dependency):
+    """
+    Converts a dependency as defined in the meta.yaml to the form used on the
+    commandline of conda.
+
+    Parameters
+    ----------
+    dependency: str
+        The dependency to convert.
+
+        Example:
+            'attrs >=17.4*'
+
+    Returns
+    -------
+    str
+        The converted dependency.
+
+        Example:
+            'attrs>=17.4'
+    """
+    # spaces in front of an operator (e.g. "six ~=1.11") are dropped, the
+    # others separate the version and the build-string
+    return (re.sub(r' +(?=[=<>!~])', '', dependency)
+            .replace(' ', '=')
+            .replace('*', ''))
+
+
+# -----------------------------------------------------------------------------
+def parse_dependency(dependency):
+    """
+    Splits a dependency into the packagename and the version-spec.
+
+    Parameters
+    ----------
+    dependency: str
+        The dependency as defined in the meta.yaml or as converted by
+        :func:`normalize_dependency`.
+
+    Returns
+    -------
+    tuple
+        The packagename and the version-spec (without build-string).
+
+        Example:
+            ('attrs', '>=17.4')
+    """
+    name, spec = re.match(r'([^=<>!~]*)(.*)',
+                          normalize_dependency(dependency.strip())).groups()
+    if spec.startswith('=') and not spec.startswith('=='):
+        spec = '=' + spec[1:].split('=')[0]
+    return name, spec
+
+
+# -----------------------------------------------------------------------------
+def check_available(dependencies):
+    """
+    Checks if the passed dependencies are available inside the configured
+    channels before the solver of conda is run for them and reports the
+    unavailable ones.
+    The check uses the repodata-index of :mod:`repodata` and is skipped if
+    the repodata of a channel isn't available. As conda also uses the
+    channels of its own config (e.g. the channel of the
+    conda-repository-server), dependencies missing inside the index don't
+    abort.
+
+    Parameters
+    ----------
+    dependencies: list
+    """
+    from ouroboros.tools.pproject import repodata
+    unavailable = repodata.load_index().unavailable(dependencies)
+    if unavailable:
+        inform.info('Not available in "conda_channels" (left to conda): '
+                    f'{", ".join(unavailable)}')
+
+
+# -----------------------------------------------------------------------------
+def dependency_hash(dependencies):
+    """
+    Calculates a hash of the passed dependencies. The hash doesn't depend on
+    the order or the notation of the dependencies.
+
+    Parameters
+    ----------
+    dependencies: list
+
+    Returns
+    -------
+    str
+    """
+    wanted = dict(parse_dependency(_) for _ in dependencies)
+    content = json.dumps(dict(python=wanted.get('python'),
+                              dependencies=sorted(wanted.items())))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:24]
+
+
+# -----------------------------------------------------------------------------
+def env_fingerprint(dependencies, lockfile=None):
+    """
+    Calculates the fingerprint of a conda-environment for the passed
+    dependencies. The fingerprint covers the normalized dependencies, the
+    python-version, the configured channels and the content of the lockfile.
+
+    Parameters
+    ----------
+    dependencies: list
+    lockfile: Lockfile
+        (default=None)
+
+    Returns
+    -------
+    dict
+    """
+    wanted = dict(parse_dependency(_) for _ in dependencies)
+    return dict(
+        dependencies=dependency_hash(dependencies),
+        python=wanted.get('python'),
+        channels=list(CONFIG['conda_channels']),
+        lockfile=(lockfile.content_hash()
+                  if lockfile is not None and lockfile.path.exists()
+                  else None))
+
+
+# -----------------------------------------------------------------------------
+def version_key(version):
+    """
+    Splits the passed version into comparable parts.
+
+    Parameters
+    ----------
+    version: str
+
+    Returns
+    -------
+    list
+        List of tuples of the numeric and the remaining part of each
+        version-component.
+
+        Example:
+            '1.10.2a1' => [(1, ''), (10, ''), (2, 'a1')]
+    """
+    key = []
+    for part in re.split(r'[._-]', version):
+        number, rest = re.match(r'(\d*)(.*)', part).groups()
+        key.append((int(number) if number else -1, rest))
+    return key
+
+
+# -----------------------------------------------------------------------------
+def compare_versions(first, second):
+    """
+    Compares two versions.
+
+    Parameters
+    ----------
+    first: str
+    second: str
+
+    Returns
+    -------
+    int
+        -1 if first is lower than second, 0 if both are equal, 1 if first is
+        greater than second.
+    """
+    first, second = version_key(first), version_key(second)
+    length = max(len(first), len(second))
+    first += [(0, '')] * (length - len(first))
+    second += [(0, '')] * (length - len(second))
+    return (first > second) - (first < second)
+
+
+# -----------------------------------------------------------------------------
+def version_matches(version, spec):
+    """
+    Checks if the passed version matches the passed version-spec.
+    Supports the commonly used subset of conda-version-specs: the operators
+    "==", "!=", ">=", "<=", ">", "<", "~=" (compatible release), "="
+    (fuzzy), trailing "*" and the combination of specs with "," (and) and
+    "|" (or).
+
+    Parameters
+    ----------
+    version: str
+        The version to check.
+
+        Example:
+            '3.6.3'
+    spec: str
+        The version-spec to check against.
+
+        Example:
+            '>=3.6,<3.7'
+
+    Returns
+    -------
+    bool
+        True if the version matches the spec, else False.
+    """
+    if '|' in spec:
+        return any(version_matches(version, _) for _ in spec.split('|'))
+    if ',' in spec:
+        return all(version_matches(version, _) for _ in spec.split(','))
+    spec = spec.strip()
+    if spec in ('', '*', '='):
+        return True
+    operator, spec_version = re.match(r'(==|!=|>=|<=|~=|>|<|=?)(.*)',
+                                      spec).groups()
+    spec_version = spec_version.rstrip('*').rstrip('.')
+    if operator in ('=', '') or (operator == '==' and spec.endswith('*')):
+        return (version == spec_version
+                or version.startswith(f'{spec_version}.'))
+    comparison = compare_versions(version, spec_version)
+    if operator == '~=':
+        # compatible release: ~=1.11 means >=1.11 and =1
+        prefix = spec_version.rsplit('.', 1)[0]
+        return (comparison >= 0
+                and (version == prefix or version.startswith(f'{prefix}.')))
+    return {'==': comparison == 0,
+            '!=': comparison != 0,
+            '>=': comparison >= 0,
+            '<=': comparison <= 0,
+            '>': comparison > 0,
+            '<': comparison < 0}[operator]
 
 
 # =============================================================================
@@ -63,6 +318,8 @@ class MetaYaml:
         if not self.path.exists():
             raise AttributeError(f'Path {self.path} doesn\'t exist.')
         self.update()
+        from marshmallow import ValidationError
+        from ouroboros.tools.pproject import validators
         try:
             validators.SMetaYaml(strict=True).load(self.get_content())
         except ValidationError as err:
@@ -97,6 +354,10 @@ class MetaYaml:
         content: dict
             Contents of the meta.yaml file.
         """
+        import jinja2
+        from ruamel.yaml import YAML
+        import six
+
         # =====================================================================
         class NullUndefined(jinja2.Undefined):
             """
@@ -171,15 +432,15 @@ class CondaEnvironment:
         """
         if self.exists():
             try:
-                utils.run_in_bash(
-                    f'{CONDA_BIN} env remove -q -y -n {self.name}')
+                utils.run([conda_bin(), 'env', 'remove', '-q', '-y',
+                           '-n', self.name])
             except CalledProcessError as err:
-                err_message = err.output.strip().decode('ascii')
+                err_message = err.output.strip().decode('utf-8', 'replace')
                 if 'CondaEnvironmentError:' in err_message:
                     inform.info('deactivating and retry')
                     utils.run_in_bash(
                         'source deactivate && '
-                        f'{CONDA_BIN} env remove -q -y -n {self.name}')
+                        f'{conda_bin()} env remove -q -y -n {self.name}')
                 else:
                     inform.error('Couldn\'t remove environment. '
                                  'Following error occured:')
@@ -187,9 +448,16 @@ class CondaEnvironment:
                     inform.critical()
 
     # -------------------------------------------------------------------------
-    def create(self, dependencies):
+    def create(self, dependencies, use_cache=True, lockfile=None):
         """
         Create conda-environment with name self.name and passed dependencies.
+        If the passed lockfile is up to date with the dependencies, the
+        packages are installed from the lockfile without running the solver.
+        An environment created from the same lockfile is cloned from the
+        environment-cache (see :class:`EnvironmentCache`), else the created
+        environment is added to the cache. Environments solved without a
+        lockfile aren't cached, as later solves of their dependencies can
+        result in other packages.
 
         Parameters
         ----------
@@ -199,26 +467,220 @@ class CondaEnvironment:
 
             Example:
                 ['python=3.6', 'attrs=>17.3']
+        use_cache: bool
+            (default=True) Flag if the environment-cache should be used.
+        lockfile: Lockfile
+            (default=None) The lockfile of the dependencies.
         """
-        deps = ' '.join([f"'{_}'"
-                         .replace(' >=', '>=')
-                         .replace(' <=', '<=')
-                         .replace(' ', '=')
-                         .replace('*', '')
-                         for _ in dependencies])
+        locked = lockfile is not None and lockfile.is_current(dependencies)
+        cache = environment_cache() if use_cache and locked else None
+        if cache:
+            cache_key = lockfile.content_hash()
+            cached = cache.get(cache_key)
+        else:
+            cached = None
+        create_cmd = [conda_bin(), 'create', '-y', '-q', '-n', self.name]
         try:
-            utils.run_in_bash(
-                f'{CONDA_BIN} create -y -q -n {self.name} {deps}')
+            if cached:
+                inform.info('Cloning env from cache')
+                utils.run_streaming(create_cmd + ['--clone', str(cached)])
+            elif locked:
+                inform.info('Creating env from lockfile')
+                utils.run_streaming(create_cmd
+                                    + ['--file', str(lockfile.path)])
+            else:
+                check_available(dependencies)
+                utils.run_streaming(create_cmd + [normalize_dependency(_)
+                                                  for _ in dependencies])
         except CalledProcessError as err:
             inform.error(f'Couldn\'t create environment {self.name}. '
                          'Following error occured:')
-            print(err.output.strip().decode('ascii'))
+            print(err.output.strip().decode('utf-8', 'replace'))
             inform.error('Please check your meta.yaml-file and if '
                          'dependencies are available.')
             inform.critical()
+        self.store_requested_dependencies(dependencies, lockfile)
+        if cache and not cached:
+            cache.add(self, cache_key, dependencies)
+
+    # -------------------------------------------------------------------------
+    def installed_packages(self):
+        """
+        Collects the packages installed inside the conda-environment from the
+        package-records in its conda-meta-folder.
+
+        Returns
+        -------
+        dict
+            The versions of the installed packages by packagename.
+        """
+        installed = {}
+        for record in (self.path / 'conda-meta').glob('*.json'):
+            if record.name.count('-') >= 2:
+                name, version, _ = record.stem.rsplit('-', 2)
+                installed[name] = version
+        return installed
+
+    # -------------------------------------------------------------------------
+    def requested_dependencies(self):
+        """
+        Collects the dependencies requested by pproject at the last
+        creation/update of the conda-environment.
+
+        Returns
+        -------
+        list or None
+            The requested dependencies or None if they are unknown.
+        """
+        try:
+            with (self.path / PPROJECT_META).open() as meta:
+                return json.load(meta)['dependencies']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # -------------------------------------------------------------------------
+    def store_requested_dependencies(self, dependencies, lockfile=None):
+        """
+        Stores the passed dependencies inside the conda-environment as
+        requested dependencies together with the fingerprint of the
+        environment (see :func:`env_fingerprint`).
+
+        Parameters
+        ----------
+        dependencies: list
+        lockfile: Lockfile
+            (default=None) The lockfile the environment matches.
+        """
+        if (self.path / 'conda-meta').exists():
+            (self.path / PPROJECT_META).write_text(json.dumps(dict(
+                dependencies=list(dependencies),
+                fingerprint=env_fingerprint(dependencies, lockfile))))
+
+    # -------------------------------------------------------------------------
+    def is_current(self, dependencies, lockfile=None):
+        """
+        Checks if the fingerprint stored inside the conda-environment matches
+        the passed dependencies and lockfile.
+
+        Parameters
+        ----------
+        dependencies: list
+        lockfile: Lockfile
+            (default=None)
+
+        Returns
+        -------
+        bool
+        """
+        try:
+            with (self.path / PPROJECT_META).open() as meta:
+                fingerprint = json.load(meta)['fingerprint']
+        except (OSError, ValueError, KeyError):
+            return False
+        return fingerprint == env_fingerprint(dependencies, lockfile)
+
+    # -------------------------------------------------------------------------
+    def install(self, dependencies):
+        """
+        Install (or up-/downgrade) the passed dependencies inside the existing
+        conda-environment.
+
+        Parameters
+        ----------
+        dependencies: list
+            List of strings with dependencies (packagename with optional
+            version) to install inside environment.
+        """
+        check_available(dependencies)
+        deps = [normalize_dependency(_) for _ in dependencies]
+        try:
+            utils.run_streaming([conda_bin(), 'install', '-y', '-q',
+                                 '-n', self.name] + deps)
+        except CalledProcessError as err:
+            inform.error(f'Couldn\'t install {" ".join(deps)} in '
+                         f'environment {self.name}. Following error '
+                         'occured:')
+            print(err.output.strip().decode('utf-8', 'replace'))
+            inform.critical()
 
     # -------------------------------------------------------------------------
-    def recreate(self, dependencies):
+    def uninstall(self, packagenames):
+        """
+        Remove the passed packages from the existing conda-environment.
+
+        Parameters
+        ----------
+        packagenames: list
+            List of the names of the packages to remove.
+        """
+        try:
+            utils.run([conda_bin(), 'remove', '-y', '-q', '-n', self.name]
+                      + list(packagenames))
+        except CalledProcessError as err:
+            inform.error(f'Couldn\'t remove {" ".join(packagenames)} from '
+                         f'environment {self.name}. Following error occured:')
+            print(err.output.strip().decode('utf-8', 'replace'))
+            inform.critical()
+
+    # -------------------------------------------------------------------------
+    def update(self, dependencies, rebuild=False, lockfile=None):
+        """
+        Bring the conda-environment in line with the passed dependencies.
+        Nothing is done if the fingerprint of the environment matches (see
+        :func:`CondaEnvironment.is_current`). Else only the changed
+        dependencies are installed, up-/downgraded or removed. The
+        conda-environment is recreated if it doesn't exist yet, the requested
+        python-version changed, the previously requested dependencies are
+        unknown or rebuild is set.
+
+        Parameters
+        ----------
+        dependencies: list
+            List of strings with dependencies (packagename with optional
+            version) to install inside environment.
+        rebuild: bool
+            (default=False) Flag to force the recreation of the environment.
+        lockfile: Lockfile
+            (default=None) The lockfile to create the environment from (see
+            :func:`CondaEnvironment.create`).
+        """
+        if not rebuild and self.is_current(dependencies, lockfile):
+            inform.info('Env already up to date')
+            return
+        requested = self.requested_dependencies()
+        wanted = dict(parse_dependency(_) for _ in dependencies)
+        previous = dict(parse_dependency(_) for _ in requested or [])
+        if (rebuild
+                or not self.exists()
+                or requested is None
+                or wanted.get('python') != previous.get('python')):
+            if self.exists():
+                inform.info('Removing env')
+                self.remove()
+            inform.info('Creating env')
+            self.create(dependencies, lockfile=lockfile)
+            return
+        installed = self.installed_packages()
+        to_remove = [name for name in previous
+                     if name not in wanted and name in installed]
+        to_install = []
+        for dep in dependencies:
+            name, spec = parse_dependency(dep)
+            if (name not in installed
+                    or not version_matches(installed[name], spec)):
+                to_install.append(dep)
+        if to_remove:
+            inform.info(f'Removing {", ".join(to_remove)}')
+            self.uninstall(to_remove)
+        if to_install:
+            inform.info(f'Installing {", ".join(to_install)}')
+            self.install(to_install)
+        if not to_remove and not to_install:
+            inform.info('Env already up to date')
+        self.store_requested_dependencies(dependencies, lockfile)
+
+    # -------------------------------------------------------------------------
+    def recreate(self, dependencies, lockfile=None):
         """
         Remove conda-environment if it already exists. Then creates new
         environment as self.name with passed dependencies.
@@ -231,20 +693,54 @@ class CondaEnvironment:
 
             Example:
                 ['python=3.6', 'attrs=>17.3']
+        lockfile: Lockfile
+            (default=None) The lockfile to create the environment from (see
+            :func:`CondaEnvironment.create`).
         """
         self.remove()
-        self.create(dependencies)
+        self.create(dependencies, lockfile=lockfile)
 
     # -------------------------------------------------------------------------
-    def create_remote(self, ssh, pythonversion, packagename, version,
-                      projectpath):
+    def create_from_lockfile(self, lockfile, package):
+        """
+        Create conda-environment with name self.name from the passed lockfile
+        and install the passed package into it without its dependencies (they
+        are already installed from the lockfile).
+
+        Parameters
+        ----------
+        lockfile: Lockfile
+        package: str
+            Packagename with version to install.
+
+            Example:
+                'ouroboros-tools-pproject=1.0.0'
+        """
+        try:
+            utils.run_streaming([conda_bin(), 'create', '-y', '-q',
+                                 '-n', self.name,
+                                 '--file', str(lockfile.path)])
+            utils.run_streaming([conda_bin(), 'install', '-y', '-q',
+                                 '--no-deps', '-n', self.name, package])
+        except CalledProcessError as err:
+            inform.error('Couldn\'t create environment from lockfile. '
+                         'Following error occured:')
+            print(err.output.strip().decode('utf-8', 'replace'))
+            inform.error('Please check your lockfile and channels.')
+            inform.critical()
+
+    # -------------------------------------------------------------------------
+    async def create_remote(self, host, pythonversion, packagename, version,
+                            projectpath, lockfile=None):
         """
         Release the package in its own conda-envrionment on a remote host.
+        If a lockfile is passed, it is uploaded and the environment is created
+        from it. The uploaded lockfile is removed afterwards.
 
         Parameters
         ----------
-        ssh: paramiko.SSHClient
-            Connection via ssh where the conda-environment should be created.
+        host: remote.RemoteHost
+            The host where the conda-environment should be created.
         pythonversion: str
             pythonversion to create the environment for.
         packagename: str
@@ -253,62 +749,82 @@ class CondaEnvironment:
             Version of the package to install inside the created environment.
         projectpath: str
             Path of currrent project.
+        lockfile: Lockfile
+            (default=None) The lockfile of the project.
+
+        Note
+        ----
+        If an existing environment is replaced, the entries of the release-log
+        are written while the corresponding commands run.
         """
+        import asyncio
         inform.info('Creating env')
-        cmd_create = (f'{CONDA_BIN} create -y -q -n {self.name} '
-                      f'python={pythonversion} '
-                      f'{packagename}={version}')
-        _, stdout, stderr = ssh.exec_command(cmd_create)
-        stdout.channel.recv_exit_status()
-        err = stderr.read().strip().decode('ascii')
-        if err:
-            if 'CondaValueError: prefix already exists:' in err:
-                inform.info('Recreating env')
-                self.release_log(ssh, 'recreate', projectpath)
-                self.remove_remote(ssh, projectpath)
-                self.release_log(ssh, 'create', projectpath)
-                _, stdout, stderr = ssh.exec_command(cmd_create)
-                stdout.channel.recv_exit_status()
-                err = stderr.read().strip().decode('ascii')
-            else:
-                inform.error(f'Error during rollout ({cmd_create} => {err})')
-                inform.critical()
+        if lockfile:
+            remote_lock = f'/tmp/{self.name}_{LOCKFILE_NAME}'
+            await host.put(lockfile.path, remote_lock)
+            cmd_create = (f'{conda_bin()} create -y -q -n {self.name} '
+                          f'--file {remote_lock} && '
+                          f'{conda_bin()} install -y -q --no-deps '
+                          f'-n {self.name} {packagename}={version}')
+        else:
+            remote_lock = None
+            cmd_create = (f'{conda_bin()} create -y -q -n {self.name} '
+                          f'python={pythonversion} '
+                          f'{packagename}={version}')
+        try:
+            status = await host.run(cmd_create)
+            err = status.stderr
             if err:
-                if not err.startswith('==> WARNING:'):
-                    inform.error(f'Error during rollout ({cmd_create} => {err})')
+                if 'CondaValueError: prefix already exists:' in err:
+                    inform.info('Recreating env')
+                    await self.release_log(host, 'recreate', projectpath)
+                    await self.remove_remote(host, projectpath)
+                    status, _ = await asyncio.gather(
+                        host.run(cmd_create),
+                        self.release_log(host, 'create', projectpath))
+                    err = status.stderr
+                else:
+                    inform.error(
+                        f'Error during rollout ({cmd_create} => {err})')
                     inform.critical()
-        else:
-            self.release_log(ssh, 'create', projectpath)
+                if err:
+                    if not err.startswith('==> WARNING:'):
+                        inform.error(
+                            f'Error during rollout ({cmd_create} => {err})')
+                        inform.critical()
+            else:
+                await self.release_log(host, 'create', projectpath)
+        finally:
+            if remote_lock:
+                await host.run(f'rm -f {remote_lock}')
 
     # -------------------------------------------------------------------------
-    def remove_remote(self, ssh, projectpath):
+    async def remove_remote(self, host, projectpath):
         """
-        Remove the conda-environment as defined in self.name via ssh from
-        remote.
+        Remove the conda-environment as defined in self.name from the remote
+        host.
 
         Parameters
         ----------
-        ssh: paramiko.SSHClient
-            Connection via ssh where the conda-environment should be removed
-            from.
+        host: remote.RemoteHost
+            The host where the conda-environment should be removed from.
         projectpath: str
             Path of currrent project.
         """
+        import asyncio
         inform.info('Removing env (already exists)')
-        self.release_log(ssh, 'remove', projectpath)
         cmd_remove = (
-            f'{CONDA_BIN} remove -y -q -n {self.name} --all')
-        _, stdout, _ = ssh.exec_command(cmd_remove)
-        stdout.channel.recv_exit_status()
+            f'{conda_bin()} remove -y -q -n {self.name} --all')
+        await asyncio.gather(self.release_log(host, 'remove', projectpath),
+                             host.run(cmd_remove))
 
     # -------------------------------------------------------------------------
-    def release_log(self, ssh, action, projectpath):
+    async def release_log(self, host, action, projectpath):
         """
-        Write information about ssh-interaction on the destination host as
-        passed in ssh.
+        Write information about the release on the passed remote host.
 
-        ssh: paramiko.SSHClient
-            Connection via ssh where to log the output to.
+        host: remote.RemoteHost
+            The host where to log the action to.
         action: str
             action as a string to log into the log-file.
 
@@ -317,22 +833,521 @@ class CondaEnvironment:
         projectpath: str
             Path of currrent project.
         """
-        git_repo = git.GitRepo(path=projectpath)
+        snapshot = git.GitRepo(path=projectpath).snapshot()
         log_entry = (f'{dt.datetime.utcnow().isoformat()} '
                      f'[{getpass.getuser()}@{socket.gethostname()}] '
                      f'{action.upper()} {self.name} '
-                     f'[SOURCE: {git_repo.get_branch()} {git_repo.get_tag()}]')
-        cmd = f'echo "{log_entry}" >> ~/.pproject.log'
-        _, stdout, stderr = ssh.exec_command(cmd)
-        stdout.channel.recv_exit_status()
-        err = stderr.read().strip().decode('ascii')
+                     f'[SOURCE: {snapshot.branch} {snapshot.tag}]')
+        await host.run(f'echo "{log_entry}" >> ~/.pproject.log')
+
+
+# =============================================================================
+@attr.s
+class EnvironmentCache:
+    """
+    Class representing a local cache of materialized conda-environments.
+    The environments are stored by a key, the hash of the lockfile they were
+    created from (see :func:`Lockfile.content_hash`). If the cache exceeds
+    its size, the least recently used environments are removed.
+
+    Attributes
+    ----------
+    folder: pathlib.Path
+        The folder the cached environments are stored in.
+    size_limit: int
+        The maximal size of the cache in megabytes.
+    """
+    folder = attr.ib()
+    size_limit = attr.ib()
+
+    # -------------------------------------------------------------------------
+    def entries(self):
+        """
+        Collects the metadata of all cached environments.
+
+        Returns
+        -------
+        list
+            List of dicts with path, size (bytes) and last_used (timestamp)
+            of each cached environment.
+        """
+        entries = []
+        for meta_path in self.folder.glob('*/pproject_cache.json'):
+            try:
+                entry = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            entry['path'] = meta_path.parent
+            entries.append(entry)
+        return entries
 
+    # -------------------------------------------------------------------------
+    def get(self, key):
+        """
+        Returns the path of the cached environment for the passed key and
+        marks it as used.
+
+        Parameters
+        ----------
+        key: str
+
+        Returns
+        -------
+        pathlib.Path or None
+            The path of the cached environment or None if not cached.
+        """
+        path = self.folder / key
+        meta_path = path / 'pproject_cache.json'
+        try:
+            entry = json.loads(meta_path.read_text())
+            entry['last_used'] = time.time()
+            meta_path.write_text(json.dumps(entry))
+        except (OSError, ValueError):
+            return None
+        return path
+
+    # -------------------------------------------------------------------------
+    def add(self, env, key, dependencies):
+        """
+        Adds a clone of the passed environment to the cache as environment
+        for the passed key. Afterwards the cache is reduced to its
+        size_limit.
+
+        Parameters
+        ----------
+        env: CondaEnvironment
+            The environment to add to the cache.
+        key: str
+        dependencies: list
+            The dependencies the environment was created for.
+        """
+        path = self.folder / key
+        if path.exists():
+            shutil.rmtree(str(path))
+        self.folder.mkdir(parents=True, exist_ok=True)
+        try:
+            utils.run([conda_bin(), 'create', '-y', '-q', '-p', str(path),
+                       '--clone', str(env.path)])
+            (path / 'pproject_cache.json').write_text(json.dumps(dict(
+                dependencies=list(dependencies),
+                size=utils.folder_size(path),
+                last_used=time.time())))
+        except (CalledProcessError, OSError):
+            inform.error('Couldn\'t add env to cache.')
+            shutil.rmtree(str(path), ignore_errors=True)
+            return
+        self.evict()
+
+    # -------------------------------------------------------------------------
+    def evict(self):
+        """
+        Removes the least recently used environments until the cache doesn't
+        exceed its size_limit anymore.
+        """
+        entries = sorted(self.entries(), key=lambda _: _['last_used'])
+        size = sum(_['size'] for _ in entries)
+        while entries and size > self.size_limit * 1024 ** 2:
+            entry = entries.pop(0)
+            shutil.rmtree(str(entry['path']), ignore_errors=True)
+            size -= entry['size']
+
+
+# =============================================================================
+@attr.s
+class Lockfile:
+    """
+    Class representing the lockfile of a project. The lockfile contains the
+    explicit urls and md5sums of all packages of the project-environment
+    (as created by "conda list --explicit --md5") and the hash of the
+    dependencies it was created for.
+
+    Attributes
+    ----------
+    path: pathlib.Path
+    """
+    path = attr.ib()
+
+    # -------------------------------------------------------------------------
+    def dependency_hash(self):
+        """
+        Returns the hash of the dependencies the lockfile was created for.
+
+        Returns
+        -------
+        str or None
+            None if the lockfile doesn't exist or contains no hash.
+        """
+        try:
+            with self.path.open() as lock:
+                for line in lock:
+                    if line.startswith('# dependency-hash:'):
+                        return line.split(':', 1)[1].strip()
+                    if not line.startswith('#'):
+                        break
+        except OSError:
+            pass
+        return None
+
+    # -------------------------------------------------------------------------
+    def is_current(self, dependencies):
+        """
+        Checks if the lockfile was created for the passed dependencies.
+
+        Parameters
+        ----------
+        dependencies: list
+
+        Returns
+        -------
+        bool
+        """
+        return self.dependency_hash() == dependency_hash(dependencies)
+
+    # -------------------------------------------------------------------------
+    def content_hash(self):
+        """
+        Returns the hash of the content of the lockfile.
+
+        Returns
+        -------
+        str
+        """
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()[:24]
+
+    # -------------------------------------------------------------------------
+    def write(self, env, dependencies):
+        """
+        Writes the packages of the passed environment as the lockfile for the
+        passed dependencies.
+
+        Parameters
+        ----------
+        env: CondaEnvironment
+            The environment created for the dependencies.
+        dependencies: list
+        """
+        try:
+            # stderr isn't merged as warnings of conda would end up in the
+            # lockfile
+            explicit = utils.run([conda_bin(), 'list', '--explicit', '--md5',
+                                  '-n', env.name], merge_stderr=False).output
+        except CalledProcessError as err:
+            inform.error('Couldn\'t create lockfile. Following error occured:')
+            print((err.stderr or err.output).strip().decode('utf-8',
+                                                            'replace'))
+            inform.critical()
+        self.path.write_text(
+            '# lockfile generated by pproject, don\'t edit.\n'
+            f'# dependency-hash: {dependency_hash(dependencies)}\n'
+            f'{explicit}\n')
+
+    # -------------------------------------------------------------------------
+    def update(self, env, dependencies):
+        """
+        Writes the lockfile if it wasn't created for the passed dependencies
+        yet.
+
+        Parameters
+        ----------
+        env: CondaEnvironment
+            The environment created for the dependencies.
+        dependencies: list
+
+        Returns
+        -------
+        bool
+            True if the lockfile was written.
+        """
+        if self.is_current(dependencies):
+            return False
+        inform.info('Writing lockfile')
+        self.write(env, dependencies)
+        return True
+
+
+# -----------------------------------------------------------------------------
+def current_lockfile(meta_yaml):
+    """
+    Returns the lockfile next to the passed meta.yaml if it was created for
+    the dependencies of the meta.yaml.
+
+    Parameters
+    ----------
+    meta_yaml: MetaYaml
+
+    Returns
+    -------
+    Lockfile or None
+        None if there is no lockfile or if it is outdated.
+    """
+    lockfile = Lockfile(path=meta_yaml.path.with_name(LOCKFILE_NAME))
+    if not lockfile.path.exists():
+        return None
+    if not lockfile.is_current(meta_yaml.dependencies):
+        inform.info('Lockfile is outdated (run "pproject update"), '
+                    'solving the dependencies instead')
+        return None
+    return lockfile
+
+
+# -----------------------------------------------------------------------------
+def environment_cache():
+    """
+    Returns the environment-cache as defined in the config.
+
+    Returns
+    -------
+    EnvironmentCache or None
+        None if the environment-cache is disabled ("env_cache_size" is 0).
+    """
+    if not CONFIG['env_cache_size']:
+        return None
+    return EnvironmentCache(
+        folder=Path(CONFIG['env_cache_folder']).expanduser(),
+        size_limit=CONFIG['env_cache_size'])
+
+
+# =============================================================================
+@attr.s
+class BuildCache:
+    """
+    Class representing a local cache of built conda-packages. The packages
+    are stored with the result of the tests by a key of the build-inputs (see
+    :func:`build_cache_key`). Entries older than max_age days are removed. If
+    the cache exceeds its size, the least recently used entries are removed.
+
+    Attributes
+    ----------
+    folder: pathlib.Path
+        The folder the cached packages are stored in.
+    size_limit: int
+        The maximal size of the cache in megabytes.
+    max_age: int
+        The maximal age of the cached packages in days.
+    """
+    folder = attr.ib()
+    size_limit = attr.ib()
+    max_age = attr.ib()
+
+    # -------------------------------------------------------------------------
+    def entries(self):
+        """
+        Collects the metadata of all cached builds.
+
+        Returns
+        -------
+        list
+            List of dicts with path, artifacts, tests, size (bytes), created
+            and last_used (timestamps) of each cached build.
+        """
+        entries = []
+        for meta_path in self.folder.glob('*/pproject_cache.json'):
+            try:
+                entry = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            entry['path'] = meta_path.parent
+            entries.append(entry)
+        return entries
+
+    # -------------------------------------------------------------------------
+    def get(self, key):
+        """
+        Returns the paths of the packages built for the passed key if their
+        tests passed and marks them as used. Packages missing at their
+        original path (e.g. removed from conda-bld) or replaced there by
+        another build with the same filename (e.g. of another commit with the
+        same tag) are restored from the cache.
+
+        Parameters
+        ----------
+        key: str
+
+        Returns
+        -------
+        list or None
+            The paths (pathlib.Path) of the packages or None if not cached.
+        """
+        path = self.folder / key
+        meta_path = path / 'pproject_cache.json'
+        try:
+            entry = json.loads(meta_path.read_text())
+            if entry['tests'] != 'passed':
+                return None
+            artifacts = [Path(_) for _ in entry['artifacts']]
+            for artifact in artifacts:
+                cached = path / artifact.name
+                if (not artifact.exists()
+                        or utils.md5(artifact) != utils.md5(cached)):
+                    artifact.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(str(cached), str(artifact))
+            entry['last_used'] = time.time()
+            meta_path.write_text(json.dumps(entry))
+        except (OSError, ValueError, KeyError):
+            return None
+        return artifacts
+
+    # -------------------------------------------------------------------------
+    def add(self, key, artifacts, tests='passed'):
+        """
+        Adds copies of the passed packages to the cache for the passed key.
+        Afterwards outdated entries are removed and the cache is reduced to
+        its size_limit.
+
+        Parameters
+        ----------
+        key: str
+        artifacts: list
+            The paths (pathlib.Path) of the built packages.
+        tests: str
+            (default='passed') The result of the tests of the build.
+        """
+        path = self.folder / key
+        if path.exists():
+            shutil.rmtree(str(path))
+        try:
+            path.mkdir(parents=True)
+            for artifact in artifacts:
+                shutil.copy2(str(artifact), str(path / artifact.name))
+            (path / 'pproject_cache.json').write_text(json.dumps(dict(
+                artifacts=[str(_) for _ in artifacts],
+                tests=tests,
+                size=utils.folder_size(path),
+                created=time.time(),
+                last_used=time.time())))
+        except OSError:
+            inform.error('Couldn\'t add build to cache.')
+            shutil.rmtree(str(path), ignore_errors=True)
+            return
+        self.evict()
+
+    # -------------------------------------------------------------------------
+    def evict(self):
+        """
+        Removes the entries older than max_age days and afterwards the least
+        recently used entries until the cache doesn't exceed its size_limit
+        anymore.
+        """
+        oldest = time.time() - self.max_age * 24 * 3600
+        entries = []
+        for entry in self.entries():
+            if entry['created'] < oldest:
+                shutil.rmtree(str(entry['path']), ignore_errors=True)
+            else:
+                entries.append(entry)
+        entries.sort(key=lambda _: _['last_used'])
+        size = sum(_['size'] for _ in entries)
+        while entries and size > self.size_limit * 1024 ** 2:
+            entry = entries.pop(0)
+            shutil.rmtree(str(entry['path']), ignore_errors=True)
+            size -= entry['size']
+
+
+# -----------------------------------------------------------------------------
+def build_tool_version():
+    """
+    Returns the version of conda-build installed in the conda-folder as
+    defined in the config. The version is read from the conda-meta records,
+    so no conda-process is required.
+
+    Returns
+    -------
+    str or None
+        None if conda-build isn't installed.
+    """
+    records = (Path(CONFIG['conda_folder']) / 'conda-meta').glob(
+        'conda-build-*.json')
+    for record in records:
+        name, version, _ = record.name[:-len('.json')].rsplit('-', 2)
+        if name == 'conda-build':
+            return version
+    return None
+
+
+# -----------------------------------------------------------------------------
+def build_cache_key(tree_hash, meta_yaml_path, pythonversion, tag=None,
+                    commit=None):
+    """
+    Calculates the key of a build in the build-cache from the build-inputs.
+
+    Parameters
+    ----------
+    tree_hash: str
+        The hash of the git-tree of the sources (see
+        :func:`git.GitRepo.get_tree_hash`).
+    meta_yaml_path: pathlib.Path
+        The path of the meta.yaml of the build.
+    pythonversion: str
+        The pythonversion of the build.
+    tag: str
+        (default=None) The git tag the package is versioned with.
+    commit: str
+        (default=None) The hash of the current commit. Together with the tag
+        it defines the build-number (GIT_DESCRIBE_NUMBER) of the package.
+
+    Returns
+    -------
+    str
+    """
+    content = json.dumps(dict(tree=tree_hash,
+                              tag=tag,
+                              commit=commit,
+                              meta_yaml=utils.md5(str(meta_yaml_path)),
+                              python=pythonversion,
+                              conda_build=build_tool_version()))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:24]
 
 
 # -----------------------------------------------------------------------------
-def build_package(path, pythonversion, simulate=False):
+def build_cache():
+    """
+    Returns the build-cache as defined in the config.
+
+    Returns
+    -------
+    BuildCache or None
+        None if the build-cache is disabled ("build_cache_size" is 0).
+    """
+    if not CONFIG['build_cache_size']:
+        return None
+    return BuildCache(
+        folder=Path(CONFIG['build_cache_folder']).expanduser(),
+        size_limit=CONFIG['build_cache_size'],
+        max_age=CONFIG['build_cache_max_age'])
+
+
+# -----------------------------------------------------------------------------
+def built_artifacts(output):
+    """
+    Collects the paths of the packages built by conda-build from the passed
+    output of "conda build".
+
+    Parameters
+    ----------
+    output: str
+        The output of "conda build".
+
+    Returns
+    -------
+    list
+        The paths (pathlib.Path) of the built packages in order of appearance.
+    """
+    artifacts = []
+    for line in output.splitlines():
+        if 'TEST END:' in line or 'anaconda upload' in line:
+            for artifact in re.findall(r'(/\S+\.tar\.bz2)', line):
+                if Path(artifact) not in artifacts:
+                    artifacts.append(Path(artifact))
+    return artifacts
+
+
+# -----------------------------------------------------------------------------
+def build_package(path, pythonversion, simulate=False, croot=None):
     """
     Build conda-package from source at passed path for passed pythonversion.
+    The recipe is only rendered once: the paths of the built packages are
+    taken from the output of the build. The output is shown while the build
+    is running.
     If simulate is set to True, the package isn't built. The function only
     returns the path of the resulting package if it would have been built.
 
@@ -344,24 +1359,320 @@ def build_package(path, pythonversion, simulate=False):
         The pythonversion to build the conda-package for.
     simulate: bool
         Flag if build is only simulated or not.
+    croot: pathlib.Path
+        (default=None) The build-root to use instead of the default
+        conda-bld-folder.
+
+    Returns
+    -------
+    artifacts: list
+        The paths (pathlib.Path) of the resulting conda-packages (simulated or
+        real).
+    """
+    build_cmd = [conda_bin(), 'build', f'--python={pythonversion}']
+    if croot:
+        build_cmd += ['--croot', str(croot)]
+    artifacts = []
+
+    def progress(line):
+        inform.progress(line, tool=f'build py{pythonversion}')
+    if not simulate:
+        artifacts = built_artifacts(
+            utils.run_streaming(build_cmd + [str(path)], cwd=path,
+                                progress=progress).output)
+    if not artifacts:
+        output = utils.run(build_cmd + ['--output', str(path)],
+                           cwd=path).output
+        artifacts = [Path(_.strip()) for _ in output.splitlines() if _.strip()]
+    return artifacts
+
+
+# -----------------------------------------------------------------------------
+def build_matrix(path, pythonversions, max_workers=None):
+    """
+    Builds the conda-packages from source at passed path for all passed
+    pythonversions in parallel worker-processes. Each build uses its own
+    build-root ("conda-bld-pyVERSION" inside the conda-folder as defined in
+    the config), so the builds don't interfere. The progress is reported for
+    each pythonversion. If a build fails, the remaining builds are finished
+    before aborting.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The path to the source for which the conda-packages should be build.
+    pythonversions: list
+        The pythonversions to build the conda-packages for.
+    max_workers: int
+        (default=None) The maximal number of parallel builds. Defaults to the
+        number of cpus.
+
+    Returns
+    -------
+    dict
+        The paths (pathlib.Path) of the built packages by pythonversion.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    max_workers = min(len(pythonversions), max_workers or os.cpu_count() or 1)
+    results = {}
+    failed = False
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for pythonversion in pythonversions:
+            croot = (Path(CONFIG['conda_folder'])
+                     / f'conda-bld-py{pythonversion}')
+            futures[executor.submit(build_package, path, pythonversion,
+                                    croot=croot)] = pythonversion
+            inform.info(f'Queued build for python {pythonversion}')
+        for done, future in enumerate(as_completed(futures), 1):
+            pythonversion = futures[future]
+            try:
+                results[pythonversion] = future.result()
+                inform.info(f'[{done}/{len(futures)}] Built python '
+                            f'{pythonversion}')
+            except CalledProcessError as err:
+                failed = True
+                inform.error(f'[{done}/{len(futures)}] Build for python '
+                             f'{pythonversion} failed:')
+                print(err.output.strip().decode('utf-8', 'replace'))
+    if failed:
+        inform.critical()
+    return results
+
+
+# -----------------------------------------------------------------------------
+def read_inventory(path):
+    """
+    Reads the hosts to release to from an inventory-file. The file contains
+    one "username@hostname" per line, empty lines and lines starting with "#"
+    are ignored.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+
+    Returns
+    -------
+    list
+        The hosts ("username@hostname") in the order of the file.
+    """
+    hosts = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split('#', 1)[0].strip()
+        if line:
+            hosts.append(line.split()[0])
+    return hosts
+
+
+# =============================================================================
+@attr.s(frozen=True)
+class RolloutResult:
+    """
+    Class representing the result of the release on one host (see
+    :func:`rollout`).
+
+    Attributes
+    ----------
+    host: str
+        The host as "username@hostname".
+    status: str
+        "ok", "failed" or "skipped" (not released because the rollout was
+        stopped).
+    duration: float
+        Seconds the release on the host took.
+    error: str
+        The reason of a failure.
+    """
+    host = attr.ib()
+    status = attr.ib()
+    duration = attr.ib(default=0.0)
+    error = attr.ib(default='')
+
+
+# -----------------------------------------------------------------------------
+def rollout(hosts, deploy, max_workers=None, max_unavailable=None,
+            max_failure_rate=None):
+    """
+    Runs the passed deploy-function for all passed hosts concurrently on one
+    event-loop (see :func:`remote.run`), so a release to many hosts takes
+    about the time of the slowest host.
+    In rolling mode (max_unavailable is set) at most max_unavailable hosts
+    are released at the same time and failed hosts count as unavailable for
+    the rest of the rollout. The rollout is stopped (remaining hosts are
+    skipped) if the share of failed hosts exceeds max_failure_rate.
+
+    Parameters
+    ----------
+    hosts: list
+        The hosts ("username@hostname") to release to.
+    deploy: callable
+        Coroutine-function (or blocking function, run in worker-threads)
+        called with the host to release to. Failures are signalled by
+        exceptions (including SystemExit from :func:`inform.critical`).
+    max_workers: int
+        (default=None) The maximal number of concurrent releases. Defaults to
+        "release_workers" as defined in the config.
+    max_unavailable: int
+        (default=None) The maximal number of hosts being released or failed
+        at the same time. None releases to all hosts as fast as the workers
+        allow.
+    max_failure_rate: float
+        (default=None) The share of failed hosts (0-1) which stops the
+        rollout. Defaults to "release_max_failure_rate" as defined in the
+        config.
 
     Returns
     -------
-    result: str
-        The path of the resulting conda-package (simulated or real).
-    """
-    if simulate:
-        pkg_name = utils.run_in_bash(
-            f'cd {str(path.absolute())} && '
-            f'{CONDA_BIN} build --python={pythonversion} --output {path}')
-    else:
-        utils.run_in_bash(f'cd {str(path.absolute())} && '
-                          f'{CONDA_BIN} build --python={pythonversion} {path}')
-        pkg_name = utils.run_in_bash(
-            f'cd {str(path.absolute())} && '
-            f'{CONDA_BIN} build --python={pythonversion} --output {path}')
-    result = Path(pkg_name).name.rstrip()
-    return result
+    list
+        The RolloutResult of each host in the order of hosts.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from ouroboros.tools.pproject import remote
+    hosts = list(dict.fromkeys(hosts))
+    if max_failure_rate is None:
+        max_failure_rate = CONFIG['release_max_failure_rate']
+    window = min(len(hosts),
+                 max_workers or CONFIG['release_workers'],
+                 max_unavailable or len(hosts))
+
+    async def deploy_host(host):
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(deploy):
+                await deploy(host)
+            else:
+                await asyncio.get_event_loop().run_in_executor(
+                    executor, deploy, host)
+        except (Exception, SystemExit) as err:
+            return RolloutResult(
+                host=host,
+                status='failed',
+                duration=time.perf_counter() - start,
+                error=('aborted' if isinstance(err, SystemExit)
+                       else str(err) or type(err).__name__))
+        return RolloutResult(host=host, status='ok',
+                             duration=time.perf_counter() - start)
+
+    results = {}
+    pending = list(hosts)
+
+    async def run_rollout():
+        running = {}
+        failed = 0
+        stopped = False
+        while pending or running:
+            slots = window - len(running) - (failed if max_unavailable else 0)
+            while pending and slots > 0 and not stopped:
+                host = pending.pop(0)
+                running[asyncio.ensure_future(deploy_host(host))] = host
+                slots -= 1
+            if not running:
+                if not stopped:
+                    inform.error(f'Rollout stopped: {failed} host(s) '
+                                 'unavailable')
+                break
+            done, _ = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[running.pop(future)] = result
+                inform.info(f'[{len(results)}/{len(hosts)}] {result.host}: '
+                            f'{result.status}')
+                if result.status == 'failed':
+                    failed += 1
+                    if not stopped and failed / len(hosts) > max_failure_rate:
+                        stopped = True
+                        inform.error(f'Rollout stopped: {failed} of '
+                                     f'{len(hosts)} host(s) failed')
+
+    with ThreadPoolExecutor(max_workers=max(window, 1)) as executor:
+        remote.run(run_rollout())
+    for host in pending:
+        results[host] = RolloutResult(host=host, status='skipped')
+    return [results[_] for _ in hosts]
+
+
+# -----------------------------------------------------------------------------
+def rollout_table(results):
+    """
+    Returns the passed results of a rollout as table for the user.
+
+    Parameters
+    ----------
+    results: list
+        The RolloutResults as returned by :func:`rollout`.
+
+    Returns
+    -------
+    list
+        The lines of the table.
+    """
+    colors = {'ok': inform.GREEN, 'failed': inform.RED, 'skipped': inform.RED}
+    width = max([len(_.host) for _ in results] + [4])
+    lines = [f'{"host".ljust(width)}  {"status".ljust(7)}  duration  error']
+    for result in results:
+        lines.append(f'{result.host.ljust(width)}  '
+                     f'{colors[result.status]}{result.status.ljust(7)}'
+                     f'{inform.NCOLOR}  {result.duration:7.1f}s  '
+                     f'{result.error}')
+    return lines
+
+
+# =============================================================================
+@attr.s(frozen=True)
+class PublishResult:
+    """
+    Class representing the result of the publish of one conda-package (see
+    :func:`publish_packages_on_reposerver`).
+
+    Attributes
+    ----------
+    path: str
+        The local path of the conda-package.
+    status: str
+        "uploaded", "resumed" (an interrupted upload was continued),
+        "skipped" (an identical package was already published) or "failed".
+    error: str
+        The reason of a failure.
+    """
+    path = attr.ib()
+    status = attr.ib()
+    error = attr.ib(default='')
+
+    # -------------------------------------------------------------------------
+    @property
+    def ok(self):
+        """
+        bool: True if the package is published.
+        """
+        return self.status != 'failed'
+
+
+# -----------------------------------------------------------------------------
+def publish_table(results):
+    """
+    Returns the passed results of a publish as table for the user.
+
+    Parameters
+    ----------
+    results: list
+        The PublishResults as returned by
+        :func:`publish_packages_on_reposerver`.
+
+    Returns
+    -------
+    list
+        The lines of the table.
+    """
+    width = max([len(Path(_.path).name) for _ in results] + [7])
+    lines = [f'{"package".ljust(width)}  {"status".ljust(8)}  error']
+    for result in results:
+        color = inform.GREEN if result.ok else inform.RED
+        lines.append(f'{Path(result.path).name.ljust(width)}  '
+                     f'{color}{result.status.ljust(8)}{inform.NCOLOR}  '
+                     f'{result.error}')
+    return lines
 
 
 # -----------------------------------------------------------------------------
@@ -375,15 +1686,86 @@ def publish_package_on_reposerver(sourcepath):
     sourcepath: str
         Local path to the conda-package to publish on the
         conda-repository-server.
+
+    Returns
+    -------
+    PublishResult
     """
-    ssh = utils.connect_ssh(
-        dst=f'{CONDA_REPO_SETTINGS["user"]}@{CONDA_REPO_SETTINGS["host"]}')
-    ftp_client = ssh.open_sftp()
-    ftp_client.put(sourcepath,
-                   f'{CONDA_REPO_SETTINGS["packages_path"]}/'
-                   f'{Path(sourcepath).name}')
-    ftp_client.close()
-    index_cmd = (f'{CONDA_REPO_SETTINGS["conda_exe"]} index '
-                 f'{CONDA_REPO_SETTINGS["packages_path"]}')
-    _, _, index_err = ssh.exec_command(index_cmd)
-    index_err.channel.recv_exit_status()
+    return publish_packages_on_reposerver([sourcepath])[0]
+
+
+# -----------------------------------------------------------------------------
+def publish_packages_on_reposerver(sourcepaths):
+    """
+    Publish the conda-packages from sourcepaths on conda-repository-server as
+    defined in the pprojects-config-file. All packages are uploaded
+    concurrently using one connection (see :class:`remote.RemoteHost`) and
+    only the records of the published packages are inserted into the
+    repository index once afterwards (see :func:`repodata.index_command`).
+    Packages already published with the same md5sum aren't uploaded again
+    and interrupted uploads are resumed (see :func:`remote.RemoteHost.upload`).
+    A failing package doesn't stop the publish of the others.
+
+    Parameters
+    ----------
+    sourcepaths: list
+        Local paths (str) to the conda-packages to publish on the
+        conda-repository-server.
+
+    Returns
+    -------
+    list
+        The PublishResult of each package in the order of sourcepaths.
+    """
+    from ouroboros.tools.pproject import remote
+    from ouroboros.tools.pproject import repodata
+    sourcepaths = list(dict.fromkeys(str(_) for _ in sourcepaths))
+    repo_settings = conda_repo_settings()
+    host = remote.RemoteHost(
+        dst=f'{repo_settings["user"]}@{repo_settings["host"]}')
+
+    async def publish_package(sourcepath):
+        import asyncio
+        record, upload = await asyncio.gather(
+            asyncio.get_event_loop().run_in_executor(
+                None, repodata.package_record, sourcepath),
+            host.upload(sourcepath,
+                        f'{repo_settings["packages_path"]}/'
+                        f'{Path(sourcepath).name}'),
+            return_exceptions=True)
+        for outcome in (record, upload):
+            if isinstance(outcome, Exception):
+                return PublishResult(
+                    path=sourcepath,
+                    status='failed',
+                    error=str(outcome) or type(outcome).__name__), None
+            if isinstance(outcome, BaseException):
+                raise outcome
+        inform.info(f'{Path(sourcepath).name}: {upload}')
+        return PublishResult(path=sourcepath, status=upload), record
+
+    async def publish():
+        import asyncio
+        published = await asyncio.gather(*[publish_package(_)
+                                           for _ in sourcepaths])
+        records = {Path(result.path).name: record
+                   for result, record in published if result.ok}
+        results = [result for result, _ in published]
+        if not records:
+            return results, None
+        return results, await host.run(
+            repodata.index_command(repo_settings['packages_path'],
+                                   repo_settings['conda_exe']),
+            stdin=json.dumps(records, sort_keys=True))
+
+    results, status = remote.run(publish())
+    if len(results) > 1 or not results[0].ok:
+        for line in publish_table(results):
+            print(line)
+    if status is not None:
+        if not status.ok:
+            inform.error(f'Error during publish (updating the index => '
+                         f'{status.stderr})')
+            inform.critical()
+        repodata.invalidate()
+    return results
@@ -7,39 +7,73 @@ git- and gitlab-commands used by the pproject-module.
 """
 
 
+import json
+import os
 from pathlib import Path
 from subprocess import CalledProcessError
-import urllib
+import time
 
 import attr
-import requests
 
 from ouroboros.tools.pproject import inform
 from ouroboros.tools.pproject import utils
 
 
-CONFIG = utils.load_configs()
-VCS_SETTINGS = CONFIG['vcs'][CONFIG['vcs']['use']]
+CONFIG = utils.CONFIG
+GITLAB_GROUPS_CACHE_PATH = Path.home() / '.cache/pproject/gitlab_groups.json'
+"""pathlib.Path: The gitlab-groups collected by the last gitlab-api call."""
+SNAPSHOTS = {}
+"""dict: The snapshots of the local git-repositories already collected by this
+process (by path)."""
+
+
+# -----------------------------------------------------------------------------
+def vcs_settings():
+    """
+    Returns the settings of the vcs to use as defined in the config.
+
+    Returns
+    -------
+    dict
+    """
+    return CONFIG['vcs'][CONFIG['vcs']['use']]
 
 
 # -----------------------------------------------------------------------------
 def check_remote_vcs():
     """
     Check if the vcs-url is reachable.
+    Uses the timeout defined as "remote_timeout" in the config. The result is
+    cached for the rest of the process.
 
     Returns
     -------
     check_result: bool
         Result for the remote vcs to check.
     """
-    try:
-        status = urllib.request.urlopen(VCS_SETTINGS['url']).getcode()
-        check_result = True if status == 200 else False
-    except:
-        check_result = False
+    status = utils.probe_url(vcs_settings()['url'],
+                             timeout=CONFIG['remote_timeout'])
+    check_result = True if status == 200 else False
     return check_result
 
 
+# -----------------------------------------------------------------------------
+def require_remote_vcs():
+    """
+    Validates that the vcs-url is reachable (see
+    :func:`validators.validate_url`) for commands which can't work without
+    the remote vcs. Aborts if it isn't.
+    """
+    # imported here as marshmallow isn't required by the other commands
+    from marshmallow import ValidationError
+    from ouroboros.tools.pproject import validators
+    try:
+        validators.validate_url(vcs_settings()['url'],
+                                timeout=CONFIG['remote_timeout'])
+    except ValidationError as err:
+        inform.error(f'Remote vcs not accessable ({" ".join(err.messages)})')
+        inform.critical()
+
 # -----------------------------------------------------------------------------
 def get_vcs_token():
     """
@@ -51,7 +85,7 @@ def get_vcs_token():
     token: str
         The vcs-token to interact with the remote vcs.
     """
-    token_path = VCS_SETTINGS['token_path'].replace('~', str(Path.home()))
+    token_path = vcs_settings()['token_path'].replace('~', str(Path.home()))
     with open(token_path, 'r') as tokenfile:
         token = tokenfile.readline().strip()
     return token
@@ -69,8 +103,10 @@ def get_gitlab_groups():
     gitlab_groups: dict
         Dict containing the available gitlab-groups.
     """
-    glab_groups_info = requests.get(f'{VCS_SETTINGS["api"]}/groups',
-                                    headers={'PRIVATE-TOKEN': get_vcs_token()})
+    import requests
+    glab_groups_info = requests.get(f'{vcs_settings()["api"]}/groups',
+                                    headers={'PRIVATE-TOKEN': get_vcs_token()},
+                                    timeout=CONFIG['remote_timeout'])
     try:
         gitlab_groups = {_['name']: _['id'] for _ in glab_groups_info.json()}
     except TypeError:
@@ -79,6 +115,88 @@ def get_gitlab_groups():
     return gitlab_groups
 
 
+# -----------------------------------------------------------------------------
+def get_cached_gitlab_groups(offline=False, cache_path=None):
+    """
+    Returns the available gitlab-groups like :func:`get_gitlab_groups` but
+    caches them on disk. The gitlab-api is only requested if the cache is
+    older than "namespaces_cache_ttl" seconds (as defined in the config).
+    If the gitlab-api can't be reached, the outdated cache is used.
+
+    Parameters
+    ----------
+    offline: bool
+        (default=False) If True the gitlab-api isn't requested at all and the
+        cache is used regardless of its age.
+    cache_path: pathlib.Path
+        (default=None) The cache-file to use. Defaults to
+        GITLAB_GROUPS_CACHE_PATH.
+
+    Returns
+    -------
+    gitlab_groups: dict
+        Dict containing the available gitlab-groups. Empty if neither the
+        cache nor the gitlab-api provide any groups.
+    """
+    cache_path = cache_path or GITLAB_GROUPS_CACHE_PATH
+    api = vcs_settings()['api']
+    try:
+        cache = json.loads(cache_path.read_text())
+        assert cache['api'] == api
+    except Exception:
+        cache = dict(api=api, timestamp=0, groups={})
+    cache_age = time.time() - cache['timestamp']
+    if offline or cache_age < CONFIG['namespaces_cache_ttl']:
+        return cache['groups']
+    import requests
+    try:
+        gitlab_groups = get_gitlab_groups()
+    except (OSError, ValueError, requests.RequestException):
+        gitlab_groups = {}
+    if not gitlab_groups:
+        return cache['groups']
+    tmp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}')
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(
+            dict(api=api, timestamp=time.time(), groups=gitlab_groups)))
+        os.replace(str(tmp_path), str(cache_path))
+    except OSError:
+        pass
+    return gitlab_groups
+
+
+# -----------------------------------------------------------------------------
+def get_namespaces(offline=False):
+    """
+    Returns the namespaces available for new projects of the company as
+    defined in the config.
+    If gitlab-groups are used, these are collected by
+    :func:`get_cached_gitlab_groups`. Else or if no groups are available the
+    "offline_namespaces" of the config are returned.
+
+    Parameters
+    ----------
+    offline: bool
+        (default=False) If True the gitlab-api isn't requested.
+
+    Returns
+    -------
+    list
+        The names of the available namespaces.
+    """
+    settings = vcs_settings()
+    if CONFIG['vcs']['use'] == 'gitlab' and settings['use_groups']:
+        namespaces = [
+            grp.split('-')[1]
+            for grp
+            in get_cached_gitlab_groups(offline=offline)
+            if '-' in grp and grp.split('-')[0] == CONFIG['company']]
+        if namespaces:
+            return namespaces
+    return settings['offline_namespaces']
+
+
 # -----------------------------------------------------------------------------
 def create_on_remote_vcs(*, company, namespace, project, username):
     """
@@ -99,12 +217,13 @@ def create_on_remote_vcs(*, company, namespace, project, username):
         which the project was created.
     """
     # TODO: returns what?
+    import requests
     assert check_remote_vcs()
     vcs = CONFIG['vcs']['use']
-    api = VCS_SETTINGS['api']
+    api = vcs_settings()['api']
     token = get_vcs_token()
     if vcs == 'gitlab':
-        if VCS_SETTINGS['use_groups']:
+        if vcs_settings()['use_groups']:
             assert all([isinstance(_, str)
                         for _ in (company, namespace, project)])
             gitlab_groups = get_gitlab_groups()
@@ -141,6 +260,358 @@ def create_on_remote_vcs(*, company, namespace, project, username):
         return project_to_create
 
 
+# -----------------------------------------------------------------------------
+def parse_config_value(value):
+    """
+    Parses the value of a line of a git-config-file (handles quotes, escapes
+    and comments).
+
+    Parameters
+    ----------
+    value: str
+        The part of the line behind the "=".
+
+    Returns
+    -------
+    str or None
+        None if the value can't be parsed safely (e.g. unterminated quotes).
+    """
+    escapes = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+    result = ''
+    spaces = ''
+    quoted = False
+    chars = iter(value.strip())
+    for char in chars:
+        if not quoted and char in '#;':
+            break
+        if not quoted and char.isspace():
+            spaces += char
+            continue
+        result += spaces
+        spaces = ''
+        if char == '"':
+            quoted = not quoted
+        elif char == '\\':
+            escaped = next(chars, None)
+            if escaped not in escapes:
+                return None
+            result += escapes[escaped]
+        else:
+            result += char
+    if quoted:
+        return None
+    return result
+
+
+# -----------------------------------------------------------------------------
+def read_git_config(git_dir=None):
+    """
+    Reads the system-, global- and (if git_dir is passed) the
+    repository-config of git without git-process. Later files override
+    earlier ones like in git itself.
+
+    Parameters
+    ----------
+    git_dir: GitDir
+        (default=None) The repository to read the local config of.
+
+    Returns
+    -------
+    dict or None
+        The values by lowercase "section.key" (subsections keep their case).
+        None if the config can't be read safely (e.g. it uses includes or
+        the config-location is changed by environment-variables), so the
+        git-cli has to be used.
+    """
+    if any(_ in os.environ for _ in ('GIT_CONFIG', 'GIT_CONFIG_GLOBAL',
+                                     'GIT_CONFIG_SYSTEM', 'GIT_CONFIG_COUNT',
+                                     'GIT_DIR')):
+        return None
+    xdg_home = Path(os.environ.get('XDG_CONFIG_HOME',
+                                   str(Path.home() / '.config')))
+    paths = [xdg_home / 'git/config', Path.home() / '.gitconfig']
+    if not os.environ.get('GIT_CONFIG_NOSYSTEM'):
+        paths.insert(0, Path('/etc/gitconfig'))
+    if git_dir:
+        paths.append(git_dir.path / 'config')
+    config = {}
+    for path in paths:
+        try:
+            content = path.read_text()
+        except OSError:
+            continue
+        section = None
+        for line in content.splitlines():
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+            if line.startswith('['):
+                header, _, rest = line[1:].partition(']')
+                name, _, subsection = header.partition(' ')
+                name = name.lower()
+                if (name in ('include', 'includeif')
+                        or rest.strip() and rest.strip()[0] not in '#;'):
+                    return None
+                subsection = subsection.strip()
+                if subsection:
+                    if not (subsection.startswith('"')
+                            and subsection.endswith('"')):
+                        return None
+                    name = f'{name}.{subsection[1:-1]}'
+                section = name
+                continue
+            if section is None or line.endswith('\\'):
+                return None
+            key, sep, value = line.partition('=')
+            value = parse_config_value(value) if sep else 'true'
+            if value is None:
+                return None
+            config[f'{section}.{key.strip().lower()}'] = value
+    return config
+
+
+# -----------------------------------------------------------------------------
+def find_git_dir(path):
+    """
+    Returns the git-folder of the repository containing the passed path if
+    its refs can be read without git-process (see :class:`GitDir`).
+
+    Parameters
+    ----------
+    path: pathlib.Path
+
+    Returns
+    -------
+    GitDir or None
+        None if there is no repository or its layout isn't supported
+        (worktrees, submodules, reftable), so the git-cli has to be used.
+    """
+    if 'GIT_DIR' in os.environ:
+        return None
+    path = Path(str(path)).absolute()
+    for folder in [path] + list(path.parents):
+        dot_git = folder / '.git'
+        if dot_git.is_dir():
+            if ((dot_git / 'reftable').exists()
+                    or (dot_git / 'commondir').exists()
+                    or not (dot_git / 'HEAD').is_file()):
+                return None
+            return GitDir(path=dot_git)
+        if dot_git.exists():
+            return None
+    return None
+
+
+# =============================================================================
+@attr.s
+class GitDir:
+    """
+    Class representing the git-folder of a local git-repository. Reads HEAD,
+    refs and objects directly for read-only queries. The methods return None
+    if an answer can't be found safely, so the git-cli has to be used.
+
+    Attributes
+    ----------
+    path: pathlib.Path
+        The ".git"-folder.
+    """
+    path = attr.ib()
+
+    # -------------------------------------------------------------------------
+    def packed_refs(self):
+        """
+        Returns the refs stored in the packed-refs-file.
+
+        Returns
+        -------
+        dict
+            The hash and the peeled hash by ref. The peeled hash is the hash
+            itself for refs known not to be annotated tags and None if
+            unknown.
+
+            Example:
+                {'refs/tags/1.0.0': ('a1b2...', 'c3d4...')}
+        """
+        refs = {}
+        try:
+            content = (self.path / 'packed-refs').read_text()
+        except OSError:
+            return refs
+        fully_peeled = 'fully-peeled' in content.split('\n', 1)[0]
+        ref = None
+        for line in content.splitlines():
+            if line.startswith('^') and ref:
+                refs[ref] = (refs[ref][0], line[1:].strip())
+            elif line and not line.startswith('#'):
+                sha, _, ref = line.partition(' ')
+                refs[ref] = (sha, sha if fully_peeled else None)
+        return refs
+
+    # -------------------------------------------------------------------------
+    def read_ref(self, ref):
+        """
+        Returns the hash the passed ref points to (following symbolic refs).
+
+        Parameters
+        ----------
+        ref: str
+            Example:
+                'refs/heads/master'
+
+        Returns
+        -------
+        str or None
+            None if the ref doesn't exist.
+        """
+        for _ in range(5):
+            try:
+                content = (self.path / ref).read_text().strip()
+            except OSError:
+                packed = self.packed_refs().get(ref)
+                return packed[0] if packed else None
+            if not content.startswith('ref: '):
+                return content
+            ref = content[5:].strip()
+        return None
+
+    # -------------------------------------------------------------------------
+    def head(self):
+        """
+        Returns the current branch and commit.
+
+        Returns
+        -------
+        tuple or None
+            The branch ("HEAD" if detached) and the hash of the current commit
+            (None if there is no commit yet). None if HEAD can't be read.
+        """
+        try:
+            content = (self.path / 'HEAD').read_text().strip()
+        except OSError:
+            return None
+        if content.startswith('ref: refs/heads/'):
+            return content[16:], self.read_ref(content[5:])
+        if content.startswith('ref: '):
+            return None
+        return 'HEAD', content
+
+    # -------------------------------------------------------------------------
+    def peel(self, sha):
+        """
+        Returns the hash of the commit the passed (tag-)object points to.
+        Only loose objects can be read.
+
+        Parameters
+        ----------
+        sha: str
+
+        Returns
+        -------
+        str or None
+            None if the object isn't available as loose object.
+        """
+        import zlib
+        for _ in range(5):
+            try:
+                data = zlib.decompress(
+                    (self.path / 'objects' / sha[:2] / sha[2:]).read_bytes())
+            except (OSError, zlib.error):
+                return None
+            header, _, body = data.partition(b'\0')
+            if header.startswith(b'commit '):
+                return sha
+            if not (header.startswith(b'tag ')
+                    and body.startswith(b'object ')):
+                return None
+            sha = body.split(b'\n', 1)[0][7:].decode('ascii')
+        return None
+
+    # -------------------------------------------------------------------------
+    def tags(self):
+        """
+        Returns all tags of the repository.
+
+        Returns
+        -------
+        dict
+            The hash and the peeled hash (or None if unknown) by tagname.
+        """
+        tags = {ref[10:]: refs
+                for ref, refs in self.packed_refs().items()
+                if ref.startswith('refs/tags/')}
+        tags_folder = self.path / 'refs/tags'
+        for tag_path in tags_folder.glob('**/*'):
+            if tag_path.is_file():
+                tags[tag_path.relative_to(tags_folder).as_posix()] = (
+                    tag_path.read_text().strip(), None)
+        return tags
+
+    # -------------------------------------------------------------------------
+    def exact_tag(self, commit):
+        """
+        Returns the git tag of the passed commit like "git describe --tag",
+        but only if it can be determined without walking the history: if the
+        repository has no tags or exactly one tag points to the commit.
+
+        Parameters
+        ----------
+        commit: str
+            The hash of the commit.
+
+        Returns
+        -------
+        str or None
+            "0.0.0" if the repository has no tags. None if the tag can't be
+            determined without git-cli.
+        """
+        tags = self.tags()
+        if not tags:
+            return '0.0.0'
+        matching = []
+        for tag, (sha, peeled) in tags.items():
+            if sha != commit and not peeled:
+                peeled = self.peel(sha)
+                if peeled is None:
+                    return None
+            if commit in (sha, peeled):
+                matching.append(tag)
+        if len(matching) != 1:
+            return None
+        return matching[0].split('-')[0]
+
+
+# =============================================================================
+@attr.s(frozen=True)
+class GitSnapshot:
+    """
+    Class representing the state of a local git-repository at one point in
+    time (see :func:`GitRepo.snapshot`).
+
+    Attributes
+    ----------
+    branch: str
+        The current branch ("HEAD" if detached).
+    head: str
+        The hash of the current commit (None if there is no commit yet).
+    tag: str
+        The git tag of the current commit as returned by "git describe"
+        ("0.0.0" if there is no tag yet).
+    dirty: bool
+        Flag if the repository contains uncommited or untracked stuff (None
+        if the status wasn't collected, see :func:`GitRepo.snapshot`).
+    username: str
+        The name of the user as defined in the git-config.
+    email: str
+        The email of the user as defined in the git-config.
+    """
+    branch = attr.ib()
+    head = attr.ib()
+    tag = attr.ib()
+    dirty = attr.ib()
+    username = attr.ib()
+    email = attr.ib()
+
+
 # =============================================================================
 @attr.s
 class GitRepo:
@@ -151,6 +622,111 @@ class GitRepo:
     """
     path = attr.ib()
 
+    # -------------------------------------------------------------------------
+    def snapshot(self, refresh=False):
+        """
+        Collects branch, current commit, tag, status and the user-config of
+        the local git-repository. Branch, commit, tag and config are read
+        directly from the git-folder (see :class:`GitDir`) if possible, else
+        (and for the status) the git-cli is used ("git status --porcelain=v2
+        --branch", "git describe --tag" and "git config --list"). The
+        snapshot is kept for the rest of the process (also for other
+        instances with the same path) and dropped by the methods changing
+        the repository.
+
+        Parameters
+        ----------
+        refresh: bool
+            (default=False) Flag if the snapshot should be collected again
+            even if one exists already. The status of the working tree is only
+            collected on refresh, so use it before checks which have to
+            consider changes made since the last snapshot. The user-config of
+            the former snapshot is reused.
+
+        Returns
+        -------
+        GitSnapshot
+        """
+        key = str(Path(str(self.path)).absolute())
+        if key in SNAPSHOTS and not refresh:
+            return SNAPSHOTS[key]
+        git_dir = find_git_dir(self.path)
+        head = git_dir.head() if git_dir else None
+        dirty = None
+        valid = True
+        if refresh or head is None:
+            status = utils.run(['git', 'status', '--porcelain=v2',
+                                '--branch'],
+                               cwd=self.path, check=False)
+            branch = commit = None
+            dirty = not status.ok
+            valid = status.ok
+            for line in status.output.splitlines():
+                if line.startswith('# branch.oid '):
+                    commit = line.split()[2]
+                elif line.startswith('# branch.head '):
+                    branch = line.split()[2]
+                elif line and not line.startswith('#'):
+                    dirty = True
+            if branch == '(detached)':
+                branch = 'HEAD'
+            if commit == '(initial)':
+                commit = None
+        else:
+            branch, commit = head
+        tag = '0.0.0'
+        if valid and commit:
+            tag = git_dir.exact_tag(commit) if git_dir else None
+            if tag is None:
+                describe = utils.run(['git', 'describe', '--tag'],
+                                     cwd=self.path, check=False)
+                tag = (describe.output.split('-')[0] if describe.ok
+                       else '0.0.0')
+        if key in SNAPSHOTS:
+            username = SNAPSHOTS[key].username
+            email = SNAPSHOTS[key].email
+        else:
+            config = self.config()
+            username = config.get('user.name', '')
+            email = config.get('user.email', '')
+        snapshot = GitSnapshot(branch=branch,
+                               head=commit,
+                               tag=tag,
+                               dirty=dirty,
+                               username=username,
+                               email=email)
+        SNAPSHOTS[key] = snapshot
+        return snapshot
+
+    # -------------------------------------------------------------------------
+    def config(self):
+        """
+        Returns the git-config valid for the local git-repository. The
+        config-files are read directly (see :func:`read_git_config`) if
+        possible, else "git config --list" is used.
+
+        Returns
+        -------
+        dict
+            The values by lowercase "section.key".
+        """
+        git_dir = find_git_dir(self.path)
+        config = read_git_config(git_dir) if git_dir else None
+        if config is None:
+            res = utils.run(['git', 'config', '--list'], cwd=self.path,
+                            check=False)
+            config = dict(line.partition('=')[::2]
+                          for line in res.output.splitlines())
+        return config
+
+    # -------------------------------------------------------------------------
+    def forget_snapshot(self):
+        """
+        Drops the snapshot of the local git-repository, so the next call of
+        :func:`GitRepo.snapshot` collects it again.
+        """
+        SNAPSHOTS.pop(str(Path(str(self.path)).absolute()), None)
+
     # -------------------------------------------------------------------------
     def status(self):
         """
@@ -165,15 +741,16 @@ class GitRepo:
             returned.
         """
         return not bool(
-            utils.run_in_bash(f'cd {self.path.absolute()} && git status -s'))
+            utils.run(['git', 'status', '-s'], cwd=self.path).output)
 
     # -------------------------------------------------------------------------
     def initialize(self):
         """
         Initialize current local project as a git-repository.
         """
+        self.forget_snapshot()
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && git init -q')
+            utils.run(['git', 'init', '-q'], cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t initialize git.')
 
@@ -182,8 +759,9 @@ class GitRepo:
         """
         Add all content of local git-repository.
         """
+        self.forget_snapshot()
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && git add .')
+            utils.run(['git', 'add', '.'], cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t add files to git folder.')
 
@@ -192,10 +770,11 @@ class GitRepo:
         """
         Commit current state of local git-repository.
         """
+        self.forget_snapshot()
         try:
-            utils.run_in_bash(
-                f'cd {self.path.absolute()} && '
-                f'git ci -m "automatically created by skeleton" -q')
+            utils.run(['git', 'ci', '-m', 'automatically created by skeleton',
+                       '-q'],
+                      cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t commit files.')
 
@@ -212,19 +791,49 @@ class GitRepo:
         message: str
             The message to pass with the tag.
         """
+        self.forget_snapshot()
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && '
-                              f'git tag -a {tag} -m "{message}"')
+            utils.run(['git', 'tag', '-a', tag, '-m', message], cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t create tag {tag}.')
 
+    # -------------------------------------------------------------------------
     def get_branch(self):
+        """
+        Returns the current branch of the local git-repository ("HEAD" if
+        detached).
+
+        Returns
+        -------
+        str
+        """
+        git_dir = find_git_dir(self.path)
+        head = git_dir.head() if git_dir else None
+        if head:
+            return head[0]
         try:
-            return utils.run_in_bash(f'cd {self.path.absolute()} && '
-                                     'git rev-parse --abbrev-ref HEAD')
+            return utils.run(['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+                             cwd=self.path).output
         except CalledProcessError as err:
             inform.error(f'Can\'t get branch. Got error {err.output}')
 
+    # -------------------------------------------------------------------------
+    def get_tree_hash(self):
+        """
+        Returns the hash of the tree of the current commit of the local
+        git-repository, which identifies the committed sources.
+
+        Returns
+        -------
+        str or None
+            None if the repository has no commit yet.
+        """
+        try:
+            return utils.run(['git', 'rev-parse', 'HEAD^{tree}'],
+                             cwd=self.path).output
+        except CalledProcessError:
+            return None
+
     # -------------------------------------------------------------------------
     def get_tag(self):
         """
@@ -238,9 +847,16 @@ class GitRepo:
             Git tag for current local git-repository or "0.0.0" if no git tag
             available yet.
         """
+        git_dir = find_git_dir(self.path)
+        head = git_dir.head() if git_dir else None
+        if head and not head[1]:
+            return '0.0.0'
+        tag = git_dir.exact_tag(head[1]) if head else None
+        if tag:
+            return tag
         try:
-            return utils.run_in_bash(f'cd {self.path.absolute()} && '
-                                     'git describe --tag').split('-')[0]
+            return utils.run(['git', 'describe', '--tag'],
+                             cwd=self.path).output.split('-')[0]
         except CalledProcessError:
             #inform.error('Project has no git-tag yet.')
             return '0.0.0'
@@ -256,8 +872,7 @@ class GitRepo:
             The tag to push to the git-repositories origin.
         """
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && '
-                              f'git push origin "{tag}"')
+            utils.run(['git', 'push', 'origin', tag], cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t push {tag} to origin.')
 
@@ -272,8 +887,7 @@ class GitRepo:
             Branchname to push to origin.
         """
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && '
-                              f'git push -u origin {branch}')
+            utils.run(['git', 'push', '-u', 'origin', branch], cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t push to branch {branch}.')
 
@@ -287,9 +901,10 @@ class GitRepo:
         origin: str
             Origin to set for the local git-repository.
         """
+        self.forget_snapshot()
         try:
-            utils.run_in_bash(f'cd {self.path.absolute()} && '
-                              f'git remote add origin "{origin}"')
+            utils.run(['git', 'remote', 'add', 'origin', origin],
+                      cwd=self.path)
         except CalledProcessError:
             inform.error(f'Can\'t set origin to {origin}.')
 
@@ -304,7 +919,8 @@ class GitRepo:
         str
             Name of current user as defined in the .gitconfig-file.
         """
-        return utils.run_in_bash('git config user.name')
+        return (self.config().get('user.name')
+                or utils.run(['git', 'config', 'user.name']).output)
 
     # -------------------------------------------------------------------------
     def get_email(self):
@@ -317,25 +933,32 @@ class GitRepo:
         str
             Email of current user as defined in the .gitconfig-file.
         """
-        return utils.run_in_bash('git config user.email')
+        return (self.config().get('user.email')
+                or utils.run(['git', 'config', 'user.email']).output)
 
     # -------------------------------------------------------------------------
-    def check_tag_on_remote(self):
+    def check_tag_on_remote(self, tag=None):
         """
         Check if current tag is pushed to the origin url.
 
+        Parameters
+        ----------
+        tag: str
+            (default=None) The current tag if already known. Else it is
+            collected with :func:`GitRepo.get_tag`.
+
         Returns
         -------
         check: bool
         """
         try:
-            res = utils.run_in_bash(
-                f'cd {self.path.absolute()} && '
-                f'git ls-remote origin refs/tags/{self.get_tag()}')
+            res = utils.run(['git', 'ls-remote', 'origin',
+                             f'refs/tags/{tag or self.get_tag()}'],
+                            cwd=self.path).output
             check = bool(res)
         except CalledProcessError as err:
             inform.error(f'Can\'t check if tag exists on remote. '
                          'Following error occured:')
-            print(err.output.strip().decode('ascii'))
+            print(err.output.strip().decode('utf-8', 'replace'))
             check = False
         return check
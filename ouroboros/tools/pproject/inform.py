@@ -58,6 +58,28 @@ def error(msg=None):
     print(f' {RED}E{NCOLOR}{CYAN}{toolstr}{NCOLOR}{msg}')
 
 
+# -----------------------------------------------------------------------------
+def progress(msg=None, tool=None):
+    """
+    Generates output in defined progress-style for the user. Used to show the
+    output of long running commands while they are running.
+
+    Parameters
+    ----------
+    msg: str
+        (default=None) Message to output for the user in progress-style.
+    tool: str
+        (default=None) The name to show in front of the message. Defaults to
+        the name of the calling function.
+    """
+    if not tool:
+        tool = inspect.getouterframes(inspect.currentframe(), 2)[1][3]
+    toolstr = f'  {tool.upper()} '.rjust(22, ' ')
+    if not msg:
+        msg = ''
+    print(f' {CYAN}\u25b8{NCOLOR}{CYAN}{toolstr}{NCOLOR}{msg}', flush=True)
+
+
 # -----------------------------------------------------------------------------
 def finished(msg=None):
     """
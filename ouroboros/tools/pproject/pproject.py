@@ -16,31 +16,26 @@ from pathlib import Path
 import string
 import sys
 from subprocess import CalledProcessError
-from pkg_resources import get_distribution
 
 import attr
-from cookiecutter.main import cookiecutter
-from marshmallow import ValidationError
 
 from ouroboros.tools.pproject import inform
 from ouroboros.tools.pproject import git
 from ouroboros.tools.pproject import utils
 from ouroboros.tools.pproject import conda
-from ouroboros.tools.pproject import validators
+from ouroboros.tools.pproject import repodata
 from ouroboros.tools.pproject import sphinx
+from ouroboros.tools.pproject import tasks
 
 
-try:
-    __version__ = get_distribution('ouroboros-tools-pproject').version
-except:
-    __version__ = ''
-
-for name, logger in logging.root.manager.loggerDict.items():
+# the heavy dependencies are imported by the tools requiring them. Their
+# loggers are created here so the level also applies to them.
+for name in (list(logging.root.manager.loggerDict)
+             + ['binaryornot', 'cookiecutter', 'paramiko', 'requests',
+                'urllib3']):
     logging.getLogger(name).setLevel(logging.WARNING)
 
-CONFIG = utils.load_configs()
-VCS_SETTINGS = CONFIG['vcs'][CONFIG['vcs']['use']]
-OFFLINE_NAMESPACES = VCS_SETTINGS['offline_namespaces']
+CONFIG = utils.CONFIG
 
 
 # =============================================================================
@@ -80,6 +75,8 @@ class Project:
         by "company-namespace-project" if created.
     git: git.GitRepo
         Enables git-interactions for project.
+    tasks: tasks.TaskGraph
+        The execution plan of the steps of the current invocation.
     """
     company = attr.ib()
     namespace = attr.ib()
@@ -93,6 +90,7 @@ class Project:
     environment = attr.ib(init=False)
     path = attr.ib(default=Path.cwd())
     git = attr.ib(init=False, default=None)
+    tasks = attr.ib(init=False, default=None)
 
     # -------------------------------------------------------------------------
     def __attrs_post_init__(self):
@@ -100,6 +98,7 @@ class Project:
         #if not envname in str(self.path):
         #    self.path = Path(self.path) / envname
         self.git = git.GitRepo(path=self.path)
+        self.tasks = tasks.TaskGraph(state_path=tasks.state_path(self.path))
 
     # -------------------------------------------------------------------------
     def update_informations(self, create=False, path=None):
@@ -120,9 +119,17 @@ class Project:
         ----
         Uses :class:`conda.MetaYaml` to collect the name of environment
         from the current project if **create** is False.
-        To collect git-specific informations :class:`git.GitRepo` is used.
+        To collect git-specific informations :func:`git.GitRepo.snapshot` is
+        used.
         Checks for valid project-definition with :class:`validators.SProject`.
+        For existing projects the informations are only collected once per
+        invocation and path.
         """
+        if not create:
+            step = f'informations:{(path or self.path).absolute()}'
+            if step in self.tasks.done:
+                return
+            self.tasks.done[step] = True
         self.environment = f'{self.company}-{self.namespace}-{self.project}'
         if create:
             if not path:
@@ -136,12 +143,15 @@ class Project:
             meta_yaml = conda.MetaYaml(path=path / CONFIG['meta_yaml_path'])
             self.environment = meta_yaml.package_name
             self.git = git.GitRepo(path=self.path)
-            self.version = self.git.get_tag()
+            self.version = self.git.snapshot().tag
         now = dt.datetime.now()
         self.year = now.strftime('%Y')
         self.today = now.strftime('%Y-%m-%d %H:%M')
-        self.username = self.git.get_username()
-        self.email = self.git.get_email()
+        snapshot = self.git.snapshot()
+        self.username = snapshot.username
+        self.email = snapshot.email
+        from marshmallow import ValidationError
+        from ouroboros.tools.pproject import validators
         try:
             validators.SProject(strict=True).load(self.__dict__)
         except ValidationError as err:
@@ -170,7 +180,7 @@ class Project:
         ----
         Calls :func:`Project.update_informations` with **create=True** to
         update the **attributes** of the project.
-        For git operations the function :func:`utils.run_in_bash` is called.
+        For git operations the function :func:`utils.run` is called.
         After creation :func:`Project.update` with **path** set to current
         working directory is called to create the conda-environment of the
         project.
@@ -181,10 +191,9 @@ class Project:
         assert isinstance(path, Path)
         if not (path / self.environment).exists():
             if on_vcs:
-                if not git.check_remote_vcs():
-                    inform.error('Remote vcs not accessable')
-                    inform.critical()
+                git.require_remote_vcs()
             inform.info(f'Creating project {self.environment}')
+            from cookiecutter.main import cookiecutter
             cookiecutter(CONFIG['skeleton_repo'],
                          checkout=str(self.pythonversion),
                          output_dir=str(Path.cwd()),
@@ -195,6 +204,8 @@ class Project:
             if not self.environment in str(self.path):
                 self.path = self.path / self.environment
             self.git = git.GitRepo(path=self.path)
+            self.tasks = tasks.TaskGraph(
+                state_path=tasks.state_path(self.path))
             if on_vcs:
                 create_on_remote_res = git.create_on_remote_vcs(
                     company=self.company,
@@ -207,9 +218,10 @@ class Project:
             self.git.add_all()
             inform.info('Commiting')
             self.git.commit()
-            vcs_ssh = VCS_SETTINGS['ssh']
+            vcs_settings = git.vcs_settings()
+            vcs_ssh = vcs_settings['ssh']
             vcs = CONFIG['vcs']['use']
-            vcs_use_groups = VCS_SETTINGS['use_groups']
+            vcs_use_groups = vcs_settings['use_groups']
             if on_vcs:
                 if vcs == 'gitlab' and vcs_use_groups:
                     git_repo = f'{create_on_remote_res}/{self.project}.git'
@@ -230,13 +242,18 @@ class Project:
             inform.critical()
 
     # -------------------------------------------------------------------------
-    def update(self, path=None):
+    def update(self, path=None, rebuild=False):
         """
         Updates the project-related conda-environment.
-        If it already exists it will be removed and then recreated.
-        This ensures to remove dependencies of packages which aren't required
-        anymore.
+        If it already exists only the changed dependencies are installed,
+        up-/downgraded or removed. It is only removed and recreated if the
+        pythonversion changed or rebuild is set.
         If the environment doesn't exist yet, the environment will be created.
+        If the fingerprint stored inside the environment matches the
+        dependencies, channels and lockfile, nothing is updated.
+        If the lockfile next to the meta.yaml is up to date, a new environment
+        is created from the lockfile, else the lockfile is written from the
+        updated environment.
         Finally stores the md5sum of the based meta.yaml file inside a file
         to enable the pproject-autoenv functionality triggered by changes
         inside the meta.yaml file.
@@ -246,12 +263,15 @@ class Project:
         path: str
             Path of the required meta.yaml file. Only required if the meta.yaml
             is outside of the current working directory
+        rebuild: bool
+            (default=False) Flag to force the recreation of the environment.
 
         Note
         ----
         The pythonversion and the dependencies are collected with
-        :class:`conda.MetaYaml`. Environment creation/removal is done using
-        :class:`conda.CondaEnvironment`.
+        :class:`conda.MetaYaml`. Environment creation/update is done using
+        :func:`conda.CondaEnvironment.update`, the lockfile is handled by
+        :class:`conda.Lockfile`.
         To calculate the new md5sum of the meta.yaml and store it inside the
         hash.md5-file, :func:`update_md5sum` is used.
         """
@@ -262,15 +282,70 @@ class Project:
         inform.info('Updating env')
         meta_yaml = conda.MetaYaml(path=path / CONFIG['meta_yaml_path'])
         self.pythonversion = meta_yaml.pythonversion
+        lockfile = conda.Lockfile(
+            path=meta_yaml.path.with_name(conda.LOCKFILE_NAME))
         env = conda.CondaEnvironment(name=self.environment)
-        if env.exists():
-            inform.info('Removing env')
-            env.remove()
-        inform.info('Creating env')
-        env.create(dependencies=meta_yaml.dependencies)
+        env.update(dependencies=meta_yaml.dependencies, rebuild=rebuild,
+                   lockfile=lockfile)
+        if lockfile.update(env, meta_yaml.dependencies):
+            env.store_requested_dependencies(meta_yaml.dependencies, lockfile)
         self.update_md5sum()
         inform.finished()
 
+    # -------------------------------------------------------------------------
+    def update_inputs(self, path=None):
+        """
+        Returns the inputs of the update of the project-environment: the
+        md5sums of the meta.yaml and the lockfile and if the environment
+        exists.
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            The projects path.
+
+        Returns
+        -------
+        dict
+        """
+        if not path:
+            path = self.path
+        meta_yaml_path = path / CONFIG['meta_yaml_path']
+        lockfile_path = meta_yaml_path.with_name(conda.LOCKFILE_NAME)
+        return dict(
+            meta_yaml=utils.md5(str(meta_yaml_path)),
+            lockfile=(utils.md5(str(lockfile_path))
+                      if lockfile_path.exists() else None),
+            env=conda.CondaEnvironment(name=self.environment).exists())
+
+    # -------------------------------------------------------------------------
+    def test_inputs(self, path=None):
+        """
+        Returns the inputs of the tests of the project: the git-tree of the
+        sources, the md5sum of the meta.yaml and the pytest-arguments.
+
+        Parameters
+        ----------
+        path: pathlib.Path
+            The projects path.
+
+        Returns
+        -------
+        dict or None
+            None if the sources contain uncommited changes, so the tests
+            can't be skipped.
+        """
+        if not path:
+            path = self.path
+        if self.git.snapshot(refresh=True).dirty:
+            return None
+        tree_hash = self.git.get_tree_hash()
+        if not tree_hash:
+            return None
+        return dict(tree=tree_hash,
+                    meta_yaml=utils.md5(str(path / CONFIG['meta_yaml_path'])),
+                    pytest_arguments=CONFIG['pytest_arguments'])
+
     # -------------------------------------------------------------------------
     def test(self, path=None):
         """
@@ -283,27 +358,28 @@ class Project:
 
         Note
         ----
-        Calls :func:`Project.test` to update the projects conda-environment
-        before running the tests with pytest.
+        Calls :func:`Project.update` to update the projects conda-environment
+        before running the tests with pytest, unless the environment is
+        unchanged since its last update (see :func:`Project.update_inputs`).
         """
         if not path:
             path = self.path
-        self.update()
+        self.tasks.run('update', lambda: self.update(path=path),
+                       inputs=lambda: self.update_inputs(path=path))
         inform.info('Running tests for project with pytest')
-        # using bash cause importing pytest in sublevels (testing pproject
-        # itself) can be pain in the ass
+        # using a subprocess cause importing pytest in sublevels (testing
+        # pproject itself) can be pain in the ass
         try:
-            res = utils.run_in_bash(
-                f'{Path(CONFIG["pproject_env"]) / "bin/pytest"} '
-                f'{" ".join(CONFIG["pytest_arguments"])} {path}')
-            print(res)
+            utils.run_streaming([Path(CONFIG['pproject_env']) / 'bin/pytest']
+                                + list(CONFIG['pytest_arguments'])
+                                + [path])
         except CalledProcessError as err:
-            print(err.output.strip().decode('ascii'))
+            print(err.output.strip().decode('utf-8', 'replace'))
             inform.critical()
         inform.finished()
 
     # -------------------------------------------------------------------------
-    def build(self, publish=False, path=None):
+    def build(self, publish=False, path=None, pythonversions=None):
         """
         Builds a conda-package from the project.
         First it runs all tests to ensure functionality of the resulting
@@ -321,6 +397,11 @@ class Project:
             or not.
         path: pathlib.Path
             The projects path.
+        pythonversions: list
+            (default=None) The pythonversions to build conda-packages for.
+            Multiple pythonversions are built in parallel by
+            :func:`conda.build_matrix`. Defaults to the pythonversion of the
+            project.
 
         Note
         ----
@@ -328,30 +409,67 @@ class Project:
         Checks if uncommited stuff remains inside project-folder before build
         with :func:`check_git_status`.
         Also checks if a required git-tag exists with :func:`get_git_tag`.
-        To execute the conda-build command :func:`utils.run_in_bash` is used.
+        To execute the conda-build command :func:`utils.run` is used.
+        If the same sources were already built and tested for the same tag
+        and commit (see :class:`conda.BuildCache`), tests and build are
+        skipped and the cached packages are used.
         """
         if not path:
             path = self.path
         self.update_informations()
-        self.test(path=path)
-        checks = all([self.git.status(),
-                      self.git.get_tag(),
-                      self.git.check_tag_on_remote()])
+        pythonversions = pythonversions or [self.pythonversion]
+        cache = conda.build_cache()
+        tree_hash = self.git.get_tree_hash() if cache else None
+        cache_keys = {}
+        built = {}
+        if tree_hash:
+            current = self.git.snapshot()
+            for pythonversion in pythonversions:
+                cache_keys[pythonversion] = conda.build_cache_key(
+                    tree_hash=tree_hash,
+                    meta_yaml_path=path / CONFIG['meta_yaml_path'],
+                    pythonversion=pythonversion,
+                    tag=current.tag,
+                    commit=current.head)
+                cached = cache.get(cache_keys[pythonversion])
+                if cached:
+                    built[pythonversion] = cached
+        if len(built) < len(pythonversions):
+            self.tasks.run('test', lambda: self.test(path=path),
+                           inputs=lambda: self.test_inputs(path=path))
+        snapshot = self.git.snapshot(refresh=True)
+        checks = all([not snapshot.dirty,
+                      snapshot.tag,
+                      self.git.check_tag_on_remote(snapshot.tag)])
         if checks:
-            inform.info(f'Started build of {self.environment}')
-            pkg_name = conda.build_package(path=path,
-                                           pythonversion=self.pythonversion,
-                                           simulate=True)
-            inform.info(f'Returning packagename will be {pkg_name}')
             try:
-                pkg_file = conda.build_package(
-                    path=path,
-                    pythonversion=self.pythonversion)
-                bld_path = Path(CONFIG['conda_folder']) / 'conda-bld/linux-64'
-                pkg_path = str(bld_path / pkg_file)
-                inform.info(f'Built package is {localfilepath}')
+                for pythonversion in built:
+                    inform.info(f'Using cached build of {self.environment} '
+                                f'for python {pythonversion}')
+                missing = [_ for _ in pythonversions if _ not in built]
+                if missing:
+                    inform.info(f'Started build of {self.environment}')
+                if len(pythonversions) > 1 and missing:
+                    new_builds = conda.build_matrix(path=path,
+                                                    pythonversions=missing)
+                else:
+                    new_builds = {_: conda.build_package(path=path,
+                                                         pythonversion=_)
+                                  for _ in missing}
+                for pythonversion, artifacts in new_builds.items():
+                    if tree_hash:
+                        cache.add(cache_keys[pythonversion], artifacts)
+                built.update(new_builds)
+                pkg_paths = [pkg_path
+                             for pythonversion in pythonversions
+                             for pkg_path in built[pythonversion]]
+                for pkg_path in pkg_paths:
+                    inform.info(f'Built package is {pkg_path}')
                 if publish:
-                    conda.publish_package_on_reposerver(pkg_path)
+                    results = conda.publish_packages_on_reposerver(
+                        [str(_) for _ in pkg_paths])
+                    if not all(_.ok for _ in results):
+                        inform.critical()
                 inform.finished()
             except CalledProcessError:
                 inform.critical()
@@ -396,30 +514,28 @@ class Project:
         assert all([isinstance(vtype, str), isinstance(message, str)])
         assert vtype in ('major', 'minor', 'patch')
         self.update_informations(path=path)
-        if self.git.status():
-            if not git.check_remote_vcs():
-                inform.error('Remote vcs not accessable')
+        snapshot = self.git.snapshot(refresh=True)
+        if not snapshot.dirty:
+            git.require_remote_vcs()
+            self.version = snapshot.tag
+            inform.info(f'Current version is {self.version}')
+            major, minor, patch = [
+                int(_) for _ in self.version.split('-')[0].split('.')]
+            vrs = {'major': major, 'minor': minor, 'patch': patch}
+            vrs[vtype] += 1
+            if vtype != 'patch':
+                vrs['patch'] = 0
+                if vtype == 'major':
+                    vrs['minor'] = 0
+            res_version = f'{vrs["major"]}.{vrs["minor"]}.{vrs["patch"]}'
+            inform.info(f'Resulting version {res_version}')
+            try:
+                self.git.create_tag(res_version, message)
+                self.git.push_tag(res_version)
+            except CalledProcessError:
+                inform.error('Can\'t push to remote vcs.')
                 inform.critical()
-            else:
-                self.version = self.git.get_tag()
-                inform.info(f'Current version is {self.version}')
-                major, minor, patch = [
-                    int(_) for _ in self.version.split('-')[0].split('.')]
-                vrs = {'major': major, 'minor': minor, 'patch': patch}
-                vrs[vtype] += 1
-                if vtype != 'patch':
-                    vrs['patch'] = 0
-                    if vtype == 'major':
-                        vrs['minor'] = 0
-                res_version = f'{vrs["major"]}.{vrs["minor"]}.{vrs["patch"]}'
-                inform.info(f'Resulting version {res_version}')
-                try:
-                    self.git.create_tag(res_version, message)
-                    self.git.push_tag(res_version)
-                except CalledProcessError:
-                    inform.error('Can\'t push to remote vcs.')
-                    inform.critical()
-                self.version = res_version
+            self.version = res_version
         else:
             inform.error(
                 'No new git-tag possible, uncommited stuff in project')
@@ -439,6 +555,10 @@ class Project:
         Note
         ----
         Uses :class:`conda.MetaYaml` to collect the project informations.
+        The availability of the dependencies inside the channels of
+        "conda_channels" is checked by :func:`repodata.check_availability`
+        (dependencies of other channels, e.g. of the conda-repository-server,
+        are shown as not in conda_channels).
         The current version is collected by :func:`get_git_tag`.
         Resulting packagename is collected by
         :func:`conda.build_package`.
@@ -448,26 +568,21 @@ class Project:
             path = self.path
         meta_yaml = conda.MetaYaml()
         dependencies = f'- {meta_yaml.dependencies[0]}'
+        availability = repodata.check_availability(
+            meta_yaml.dependencies[1:])
         for dep in meta_yaml.dependencies[1:]:
-            try:
-                search = (dep
-                          .replace("<", "")
-                          .replace(">", "")
-                          .replace("=", "")
-                          .replace(" ", "="))
-                utils.run_in_bash(
-                    f'{Path(CONFIG["conda_folder"]) / "bin/conda"} search '
-                    f'{search}')
-                dependencies += f'\n{"." * 26} - {dep}'
-            except CalledProcessError:
+            if availability[dep] is False:
                 dependencies += (f'\n{"." * 26} {inform.RED}- {dep} '
-                                 f'(not available in channels){inform.NCOLOR}')
+                                 f'(not in conda_channels){inform.NCOLOR}')
+            else:
+                dependencies += f'\n{"." * 26} - {dep}'
+        tag = self.git.snapshot().tag
         project_infos = [
             '',
             ' PROJECT INFO'.rjust(80, '='),
             f'{" name".rjust(26, ".")}  {self.environment}',
             f'{" reponame".rjust(26, ".")}  {self.environment}',
-            f'{" current version-tag".rjust(26, ".")}  {self.git.get_tag()}',
+            f'{" current version-tag".rjust(26, ".")}  {tag}',
             f'{" pythonversion".rjust(26, ".")}  {self.pythonversion}',
             f'{" dependencies".rjust(26, ".")} {dependencies}',
             '']
@@ -475,22 +590,35 @@ class Project:
             print(f'{inform.BOLD}{project_info}{inform.NCOLOR}')
 
     # -------------------------------------------------------------------------
-    def release(self, dst='localhost', envname=None, path=None):
+    def release(self, dst='localhost', envname=None, path=None,
+                max_workers=None, max_unavailable=None,
+                max_failure_rate=None):
         """
         Rolls out the current project as a conda-package in its own
-        conda-environment either on localhost or on a remote.
+        conda-environment either on localhost or on one or more remotes.
 
         Parameters
         ----------
-        dst: str
+        dst: str or list
             The destination where the resulting package should be rolled out.
-            Valid values are: "localhost" (default), "USER@HOSTNAME"
+            Valid values are: "localhost" (default), "USER@HOSTNAME" or a
+            list of "USER@HOSTNAME" to roll out to many hosts concurrently
+            (see :func:`conda.rollout`).
         envname: str
             The name of the environment to create on destination with the
             resulting package. If no "environment" is passed, the name of the
             project-environment is used.
         path: pathlib.Path
             The projects path.
+        max_workers: int
+            (default=None) The maximal number of hosts released to at the same
+            time.
+        max_unavailable: int
+            (default=None) Enables the rolling mode with at most this number
+            of hosts being released or failed at the same time.
+        max_failure_rate: float
+            (default=None) The share of failed hosts (0-1) which stops the
+            rollout.
 
         Note
         ----
@@ -498,15 +626,23 @@ class Project:
         Then the project is build as a conda-package with
         :func:`Project.build`. If **destination** is "localhost", the creation
         of the conda-envrionment for the just created package is done by
-        :func:`utils.run_in_bash`. Else the required commands are executed by
-        paramiko.
+        :func:`utils.run`. Else the required commands are executed
+        asynchronously on the remote hosts (see :mod:`remote`).
+        If the project has a lockfile which is up to date with the
+        dependencies of the meta.yaml, the environment is created from the
+        lockfile and the package is installed into it without solving its
+        dependencies again.
+        For many hosts a table with the result of each host is shown
+        afterwards.
         """
         if not path:
             path = self.path
         envname = envname or f'{self.environment}_env'
-        self.build(path=path)
+        self.tasks.run('build', lambda: self.build(path=path))
         self.update_informations(path=path)
         inform.info(f'Env: {envname}')
+        lockfile = conda.current_lockfile(
+            conda.MetaYaml(path=path / CONFIG['meta_yaml_path']))
         if dst == 'localhost':
             env = conda.CondaEnvironment(name=envname)
             # TODO: use recreate
@@ -514,15 +650,36 @@ class Project:
                 inform.info('Removing env (already exists)')
                 env.remove()
             inform.info('Creating env')
-            env.create(dependencies=[f'python={self.pythonversion}',
-                                     f'{self.environment}={self.version}'])
+            package = f'{self.environment}={self.version}'
+            if lockfile:
+                env.create_from_lockfile(lockfile, package)
+            else:
+                env.create(dependencies=[f'python={self.pythonversion}',
+                                         package],
+                           use_cache=False)
         else:
+            from ouroboros.tools.pproject import remote
             env = conda.CondaEnvironment(name=envname)
-            env.create_remote(ssh=utils.connect_ssh(dst),
-                              pythonversion=self.pythonversion,
-                              packagename=self.environment,
-                              version=self.version,
-                              projectpath=self.path)
+
+            async def deploy(host):
+                await env.create_remote(host=remote.RemoteHost(dst=host),
+                                        pythonversion=self.pythonversion,
+                                        packagename=self.environment,
+                                        version=self.version,
+                                        projectpath=self.path,
+                                        lockfile=lockfile)
+            hosts = [dst] if isinstance(dst, str) else list(dst)
+            if len(hosts) == 1:
+                remote.run(deploy(hosts[0]))
+            else:
+                results = conda.rollout(hosts, deploy,
+                                        max_workers=max_workers,
+                                        max_unavailable=max_unavailable,
+                                        max_failure_rate=max_failure_rate)
+                for line in conda.rollout_table(results):
+                    print(line)
+                if any(_.status != 'ok' for _ in results):
+                    inform.critical()
         inform.finished()
 
     # -------------------------------------------------------------------------
@@ -558,6 +715,24 @@ class Project:
          .write(utils.md5(str(self.path / CONFIG['meta_yaml_path']))))
 
 
+# -----------------------------------------------------------------------------
+def get_version():
+    """
+    Returns the installed version of pproject.
+
+    Returns
+    -------
+    str
+        The version or an empty string if pproject isn't installed.
+    """
+    # pkg_resources takes long to import, so only import it if required
+    from pkg_resources import get_distribution
+    try:
+        return get_distribution('ouroboros-tools-pproject').version
+    except:
+        return ''
+
+
 # -----------------------------------------------------------------------------
 def general_info():
     """
@@ -590,25 +765,25 @@ def general_info():
     autosts = {'AUTOACTIVATE': None,
                'AUTOUPDATE': None}
     for astate in autosts:
-        if int(utils.run_in_bash(f'echo ${astate}')) == 0:
+        if os.environ.get(astate, '').strip() == '0':
             autosts[astate] = f'{inform.GREEN}on{inform.NCOLOR}'
         else:
             autosts[astate] = f'{inform.RED}off{inform.NCOLOR}'
     pproject_infos = ['',
                       ' GENERAL PPROJECT-INFO'.rjust(80, '='),
-                      f'{justify_key("version")}  {bold(__version__)}',
+                      f'{justify_key("version")}  {bold(get_version())}',
                       f'{justify_key("autoenv")}  {autosts["AUTOACTIVATE"]}',
                       f'{justify_key("autoupdate")}  {autosts["AUTOUPDATE"]}',
                       '',
                       ' CONFIG'.rjust(80, '=')]
     pproject_infos.extend(
-        create_table_content(utils.load_configs(), []) + [''])
+        create_table_content(CONFIG, []) + [''])
 
     vcs = CONFIG['vcs']['use']
-    if vcs == 'gitlab' and VCS_SETTINGS['use_groups']:
+    if vcs == 'gitlab' and git.vcs_settings()['use_groups']:
         namespaces_info = [' NAMESPACES'.rjust(80, "="),]
         try:
-            raw_gitlab_groups = git.get_gitlab_groups()
+            raw_gitlab_groups = git.get_cached_gitlab_groups()
             namespaces_info.append(f'{justify_key("GROUP")}  ID')
             available_namespaces = {
                 grp.split('-')[1]: grp_id
@@ -626,6 +801,28 @@ def general_info():
         print(f'{inform.CYAN}{pproject_info}{inform.NCOLOR}')
 
 
+# -----------------------------------------------------------------------------
+def split_values(value):
+    """
+    Splits a comma-separated commandline-value into its entries.
+
+    Parameters
+    ----------
+    value: str
+        Example:
+            '3.6, 3.7'
+
+    Returns
+    -------
+    list
+        The stripped entries without the empty ones.
+
+        Example:
+            ['3.6', '3.7']
+    """
+    return [_.strip() for _ in value.split(',') if _.strip()]
+
+
 # -----------------------------------------------------------------------------
 def build_arguments(args):
     """
@@ -646,20 +843,10 @@ def build_arguments(args):
     except AssertionError:
         inform.error('Your company-name contains unsupported chars (only letters and "_" are allowed)')
         inform.critical()
-    vcs = CONFIG['vcs']['use']
-    if vcs == 'gitlab' and VCS_SETTINGS['use_groups']:
-        try:
-            available_namespaces = [
-                grp.split('-')[1]
-                for grp
-                in git.get_gitlab_groups().keys()
-                if '-' in grp and grp.split('-')[0] == CONFIG['company']]
-            if not available_namespaces:
-                raise AttributeError
-        except:
-            available_namespaces = OFFLINE_NAMESPACES
-    else:
-        available_namespaces = OFFLINE_NAMESPACES
+    # only "create" requires up to date namespaces, all other tools work
+    # without requesting the remote vcs
+    available_namespaces = git.get_namespaces(
+        offline=not args or args[0] != 'create')
     parser = argparse.ArgumentParser(description='ouroboros-tools-pproject')
     tools = parser.add_subparsers(
         description='pproject supports different tools. These are:')
@@ -684,9 +871,13 @@ def build_arguments(args):
     build = tools.add_parser('build')
     build.set_defaults(tool='build')
     build.add_argument('-p', '--publish', action='store_true', default=False)
-    for tool in ('test', 'sphinx', 'update'):
+    build.add_argument('--python', type=str, default=None)
+    for tool in ('test', 'sphinx'):
         new_tool = tools.add_parser(tool)
         new_tool.set_defaults(tool=tool)
+    update = tools.add_parser('update')
+    update.set_defaults(tool='update')
+    update.add_argument('-r', '--rebuild', action='store_true', default=False)
     info_parser = tools.add_parser('info')
     info_parser.set_defaults(tool='info')
     infotypes = info_parser.add_subparsers()
@@ -701,10 +892,20 @@ def build_arguments(args):
     for versiontype in ('major', 'minor', 'patch'):
         vtype = versiontypes.add_parser(versiontype)
         vtype.set_defaults(versiontype=versiontype)
+    publish = tools.add_parser(
+        'publish',
+        description='publishes built conda-packages on the '
+                    'conda-repository-server')
+    publish.set_defaults(tool='publish')
+    publish.add_argument('packages', type=str, nargs='+')
     release = tools.add_parser('release')
     release.set_defaults(tool='release')
     release.add_argument('-d', '--userathost', type=str)
+    release.add_argument('-i', '--inventory', type=str, default=None)
     release.add_argument('-e', '--envname', type=str)
+    release.add_argument('-w', '--workers', type=int, default=None)
+    release.add_argument('--max-unavailable', type=int, default=None)
+    release.add_argument('--max-failure-rate', type=float, default=None)
     return parser.parse_args(args)
 
 
@@ -716,7 +917,12 @@ def run(options, path=Path.cwd()):
     options: argparse.Namespace
     path: pathlib.Path
     """
-    if options.tool == 'info':
+    if options.tool == 'publish':
+        results = conda.publish_packages_on_reposerver(options.packages)
+        if not all(_.ok for _ in results):
+            inform.critical()
+        inform.finished()
+    elif options.tool == 'info':
         if options.infotype == 'general':
             general_info()
         elif options.infotype == 'project':
@@ -753,10 +959,15 @@ def run(options, path=Path.cwd()):
                       path=path)
         if options.tool == 'update':
             prj.update_informations()
-            prj.update()
+            prj.tasks.run('update',
+                          lambda: prj.update(rebuild=options.rebuild),
+                          inputs=prj.update_inputs,
+                          requested=True)
         elif options.tool == 'test':
             prj.update_informations()
-            prj.test(path=path)
+            prj.tasks.run('test', lambda: prj.test(path=path),
+                          inputs=lambda: prj.test_inputs(path=path),
+                          requested=True)
         elif options.tool == 'sphinx':
             prj.update_informations()
             prj.sphinx()
@@ -765,7 +976,9 @@ def run(options, path=Path.cwd()):
                        path=path)
         elif options.tool == 'build':
             prj.update_informations()
-            prj.build(publish=options.publish)
+            prj.build(publish=options.publish,
+                      pythonversions=(split_values(options.python)
+                                      if options.python else None))
         elif options.tool == 'version':
             prj.update_informations()
             prj.new_version(vtype=options.versiontype,
@@ -775,9 +988,17 @@ def run(options, path=Path.cwd()):
                 envname = options.envname
             except:
                 envname = f'{Path.cwd().name}_env'
+            hosts = (split_values(options.userathost)
+                     if options.userathost else [])
+            if options.inventory:
+                hosts += conda.read_inventory(options.inventory)
             prj.update_informations()
-            prj.release(dst=options.userathost,
-                        envname=envname)
+            prj.release(dst=(hosts[0] if len(hosts) == 1
+                             else hosts or 'localhost'),
+                        envname=envname,
+                        max_workers=options.workers,
+                        max_unavailable=options.max_unavailable,
+                        max_failure_rate=options.max_failure_rate)
 
 
 # -----------------------------------------------------------------------------
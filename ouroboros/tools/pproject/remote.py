@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (C) 2018 Simon Kallfass
+
+Asynchronous execution of commands and uploads on remote hosts used by the
+pproject-module for releases and publishing.
+"""
+
+import asyncio
+from pathlib import Path
+import shlex
+
+import attr
+
+from ouroboros.tools.pproject import utils
+
+
+CONFIG = utils.CONFIG
+SSH_CHANNELS = 4
+"""int: Maximal number of commands and uploads running at the same time on one
+host (each uses its own channel of the pooled ssh-connection)."""
+UPLOAD_WINDOW_SIZE = 1 << 24
+"""int: Bytes the remote host may receive on an upload-channel before it has
+to acknowledge them (larger than the paramiko-default to keep slow links with
+long round-trips busy)."""
+UPLOAD_CHUNK_SIZE = 1 << 20
+"""int: Bytes read from the local file and written to the remote file at
+once during uploads."""
+PARTIAL_SUFFIX = '.part'
+"""str: Suffix of files being uploaded. They are renamed to their final name
+after their checksum is verified."""
+
+
+# =============================================================================
+@attr.s(frozen=True)
+class RemoteStatus:
+    """
+    Class representing the result of a command executed by
+    :func:`RemoteHost.run`.
+
+    Attributes
+    ----------
+    dst: str
+        The host as "username@hostname".
+    command: str
+        The executed command.
+    returncode: int
+        The exit-code of the command (-9 if it was cancelled because of its
+        timeout).
+    stdout: str
+        The stripped stdout of the command.
+    stderr: str
+        The stripped stderr of the command.
+    timed_out: bool
+        Flag if the command was cancelled because of its timeout.
+    """
+    dst = attr.ib()
+    command = attr.ib()
+    returncode = attr.ib()
+    stdout = attr.ib(default='')
+    stderr = attr.ib(default='')
+    timed_out = attr.ib(default=False)
+
+    # -------------------------------------------------------------------------
+    @property
+    def ok(self):
+        """
+        bool: True if the command succeeded.
+        """
+        return self.returncode == 0 and not self.timed_out
+
+
+# -----------------------------------------------------------------------------
+def exec_command(ssh, command, stdin, channels):
+    """
+    Executes the passed command on a new channel of the passed connection and
+    waits for its result. Blocking, used by :func:`RemoteHost.run` inside
+    worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    command: str
+    stdin: str or None
+        Input written to stdin of the command (closed afterwards).
+    channels: list
+        The opened channel is appended, so it can be closed on cancellation.
+
+    Returns
+    -------
+    tuple
+        The exit-code, stdout and stderr (bytes) of the command.
+    """
+    command_stdin, stdout, stderr = ssh.exec_command(command)
+    channels.append(stdout.channel)
+    if stdin is not None:
+        command_stdin.write(stdin.encode('utf-8'))
+        command_stdin.channel.shutdown_write()
+    out = stdout.read()
+    err = stderr.read()
+    return stdout.channel.recv_exit_status(), out, err
+
+
+# -----------------------------------------------------------------------------
+def put_file(ssh, localpath, remotepath, channels):
+    """
+    Uploads the passed local file with a new sftp-session of the passed
+    connection. Blocking, used by :func:`RemoteHost.put` inside
+    worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    localpath: str
+    remotepath: str
+    channels: list
+        The sftp-session is appended, so it can be closed on cancellation.
+    """
+    sftp = ssh.open_sftp()
+    channels.append(sftp)
+    try:
+        sftp.put(str(localpath), str(remotepath))
+    finally:
+        sftp.close()
+
+
+# -----------------------------------------------------------------------------
+def open_sftp(ssh, window_size=None):
+    """
+    Opens a new sftp-session on the passed connection.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    window_size: int
+        (default=None) The window-size of the channel of the session.
+        Defaults to the paramiko-default.
+
+    Returns
+    -------
+    paramiko.SFTPClient
+    """
+    if not window_size:
+        return ssh.open_sftp()
+    import paramiko
+    return paramiko.SFTPClient.from_transport(ssh.get_transport(),
+                                              window_size=window_size)
+
+
+# -----------------------------------------------------------------------------
+def stat_files(ssh, remotepaths, channels):
+    """
+    Returns the sizes of the passed remote files. Blocking, used by
+    :func:`RemoteHost.upload` inside worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    remotepaths: list
+    channels: list
+        The sftp-session is appended, so it can be closed on cancellation.
+
+    Returns
+    -------
+    list
+        The size of each file in bytes (None for missing files).
+    """
+    sftp = open_sftp(ssh)
+    channels.append(sftp)
+    sizes = []
+    try:
+        for remotepath in remotepaths:
+            try:
+                sizes.append(sftp.stat(str(remotepath)).st_size)
+            except IOError:
+                sizes.append(None)
+    finally:
+        sftp.close()
+    return sizes
+
+
+# -----------------------------------------------------------------------------
+def write_file(ssh, localpath, remotepath, offset, channels):
+    """
+    Writes the passed local file from offset on to the same offset of the
+    passed remote file (which is truncated if offset is 0). The writes are
+    pipelined, so the upload doesn't wait for the acknowledgement of each
+    chunk. Blocking, used by :func:`RemoteHost.upload` inside worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    localpath: str
+    remotepath: str
+    offset: int
+        Bytes already uploaded.
+    channels: list
+        The sftp-session is appended, so it can be closed on cancellation.
+    """
+    sftp = open_sftp(ssh, window_size=UPLOAD_WINDOW_SIZE)
+    channels.append(sftp)
+    try:
+        with open(str(localpath), 'rb') as local_file, \
+                sftp.open(str(remotepath), 'r+b' if offset else 'wb') \
+                as remote_file:
+            local_file.seek(offset)
+            remote_file.seek(offset)
+            remote_file.set_pipelined(True)
+            for chunk in iter(lambda: local_file.read(UPLOAD_CHUNK_SIZE),
+                              b''):
+                remote_file.write(chunk)
+    finally:
+        sftp.close()
+
+
+# -----------------------------------------------------------------------------
+def rename_file(ssh, remotepath, new_remotepath, channels):
+    """
+    Renames the passed remote file, replacing an existing file atomically.
+    Blocking, used by :func:`RemoteHost.upload` inside worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    remotepath: str
+    new_remotepath: str
+    channels: list
+        The sftp-session is appended, so it can be closed on cancellation.
+    """
+    sftp = open_sftp(ssh)
+    channels.append(sftp)
+    try:
+        sftp.posix_rename(str(remotepath), str(new_remotepath))
+    finally:
+        sftp.close()
+
+
+# -----------------------------------------------------------------------------
+def remove_file(ssh, remotepath, channels):
+    """
+    Removes the passed remote file if it exists. Blocking, used by
+    :func:`RemoteHost.upload` inside worker-threads.
+
+    Parameters
+    ----------
+    ssh: paramiko.SSHClient
+    remotepath: str
+    channels: list
+        The sftp-session is appended, so it can be closed on cancellation.
+    """
+    sftp = open_sftp(ssh)
+    channels.append(sftp)
+    try:
+        sftp.remove(str(remotepath))
+    except IOError:
+        pass
+    finally:
+        sftp.close()
+
+
+# -----------------------------------------------------------------------------
+def close_channels(channels):
+    """
+    Closes the passed channels (or sftp-sessions), so worker-threads blocked
+    on them return.
+
+    Parameters
+    ----------
+    channels: list
+    """
+    for channel in channels:
+        try:
+            channel.close()
+        except Exception:
+            pass
+
+
+# =============================================================================
+@attr.s
+class RemoteHost:
+    """
+    Class representing a remote host commands and uploads are run on from
+    asyncio-coroutines. The blocking paramiko-calls run in worker-threads on
+    the pooled connection of the host (see :func:`utils.ssh_connection`), so
+    many commands (on one or many hosts) can be awaited at the same time.
+    Instances are bound to the event-loop they are used in first.
+
+    Attributes
+    ----------
+    dst: str
+        The host as "username@hostname".
+    max_channels: int
+        (default=SSH_CHANNELS) Maximal number of commands and uploads running
+        at the same time on the host.
+    """
+    dst = attr.ib()
+    max_channels = attr.ib(default=SSH_CHANNELS)
+    _lock = attr.ib(init=False, default=None, repr=False)
+    _channels = attr.ib(init=False, default=None, repr=False)
+
+    # -------------------------------------------------------------------------
+    async def connect(self):
+        """
+        Returns the pooled connection to the host. Concurrent callers wait for
+        the same handshake.
+
+        Returns
+        -------
+        paramiko.SSHClient
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            self._channels = asyncio.Semaphore(self.max_channels)
+        async with self._lock:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, utils.ssh_connection, self.dst)
+
+    # -------------------------------------------------------------------------
+    async def call(self, func, *args, timeout=None):
+        """
+        Runs the passed blocking function with the connection, the passed
+        args and a list for the opened channels in a worker-thread. The
+        channels are closed if the call times out or is cancelled.
+
+        Parameters
+        ----------
+        func: callable
+            Function like :func:`exec_command` or :func:`put_file`.
+        args: object
+        timeout: int
+            (default=None) Seconds the call may take. Defaults to
+            "ssh_command_timeout" as defined in the config (0 disables the
+            timeout).
+
+        Returns
+        -------
+        object
+            The result of func.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the call took longer than timeout.
+        """
+        if timeout is None:
+            timeout = CONFIG['ssh_command_timeout']
+        ssh = await self.connect()
+        channels = []
+        async with self._channels:
+            future = asyncio.get_event_loop().run_in_executor(
+                None, func, ssh, *args, channels)
+            try:
+                return await asyncio.wait_for(future, timeout or None)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                close_channels(channels)
+                raise
+
+    # -------------------------------------------------------------------------
+    async def run(self, command, timeout=None, stdin=None):
+        """
+        Executes the passed command on the host.
+
+        Parameters
+        ----------
+        command: str
+        timeout: int
+            (default=None) See :func:`RemoteHost.call`.
+        stdin: str
+            (default=None) Input passed to the command on stdin.
+
+        Returns
+        -------
+        RemoteStatus
+        """
+        try:
+            returncode, out, err = await self.call(exec_command, command,
+                                                   stdin, timeout=timeout)
+        except asyncio.TimeoutError:
+            return RemoteStatus(dst=self.dst, command=command, returncode=-9,
+                                stderr='timed out', timed_out=True)
+        return RemoteStatus(dst=self.dst,
+                            command=command,
+                            returncode=returncode,
+                            stdout=out.strip().decode('utf-8', 'replace'),
+                            stderr=err.strip().decode('utf-8', 'replace'))
+
+    # -------------------------------------------------------------------------
+    async def put(self, localpath, remotepath, timeout=None):
+        """
+        Uploads the passed local file to the host.
+
+        Parameters
+        ----------
+        localpath: str
+        remotepath: str
+        timeout: int
+            (default=None) See :func:`RemoteHost.call`.
+        """
+        await self.call(put_file, localpath, remotepath, timeout=timeout)
+
+    # -------------------------------------------------------------------------
+    async def checksum(self, remotepath, size=None):
+        """
+        Returns the md5sum of the passed remote file (calculated on the host
+        by "md5sum").
+
+        Parameters
+        ----------
+        remotepath: str
+        size: int
+            (default=None) Only the first size bytes of the file are hashed if
+            passed.
+
+        Returns
+        -------
+        str or None
+            None if the md5sum couldn't be calculated.
+        """
+        if size is None:
+            command = f'md5sum {shlex.quote(str(remotepath))}'
+        else:
+            command = (f'head -c {int(size)} {shlex.quote(str(remotepath))} '
+                       '| md5sum')
+        status = await self.run(command)
+        if not status.ok or not status.stdout:
+            return None
+        return status.stdout.split()[0]
+
+    # -------------------------------------------------------------------------
+    async def upload(self, localpath, remotepath, timeout=None):
+        """
+        Uploads the passed local file to the host unless an identical file
+        (same size and md5sum) already exists there.
+        The file is written to remotepath with PARTIAL_SUFFIX first and
+        renamed after its md5sum is verified, so the remote file is never
+        incomplete. A partial file left by an interrupted upload is continued
+        from its end if its content matches the start of the local file.
+
+        Parameters
+        ----------
+        localpath: str
+        remotepath: str
+        timeout: int
+            (default=None) See :func:`RemoteHost.call` (used for the
+            transfer).
+
+        Returns
+        -------
+        str
+            "skipped" (identical file exists), "resumed" or "uploaded".
+
+        Raises
+        ------
+        OSError
+            If the md5sum of the uploaded file doesn't match.
+        """
+        loop = asyncio.get_event_loop()
+        size = Path(localpath).stat().st_size
+        partpath = f'{remotepath}{PARTIAL_SUFFIX}'
+        checksum, (remote_size, part_size) = await asyncio.gather(
+            loop.run_in_executor(None, utils.md5, str(localpath)),
+            self.call(stat_files, [remotepath, partpath]))
+        if (remote_size == size
+                and await self.checksum(remotepath) == checksum):
+            return 'skipped'
+        offset = 0
+        if part_size and part_size <= size:
+            part_checksum, local_checksum = await asyncio.gather(
+                self.checksum(partpath),
+                loop.run_in_executor(None, utils.md5, str(localpath),
+                                     part_size))
+            if part_checksum == local_checksum:
+                offset = part_size
+        await self.call(write_file, localpath, partpath, offset,
+                        timeout=timeout)
+        if await self.checksum(partpath) != checksum:
+            await self.call(remove_file, partpath)
+            raise OSError(f'Checksum of {remotepath} on {self.dst} doesn\'t '
+                          'match after upload')
+        await self.call(rename_file, partpath, remotepath)
+        return 'resumed' if offset else 'uploaded'
+
+
+# -----------------------------------------------------------------------------
+def run(awaitable):
+    """
+    Runs the passed coroutine in a new event-loop and returns its result.
+    If it is interrupted (e.g. by KeyboardInterrupt) all its pending tasks are
+    cancelled, which closes their channels on the remote hosts.
+
+    Parameters
+    ----------
+    awaitable: coroutine
+
+    Returns
+    -------
+    object
+        The result of the coroutine.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        try:
+            all_tasks = getattr(asyncio, 'all_tasks', None)
+            pending = [_ for _ in (all_tasks or asyncio.Task.all_tasks)(loop)
+                       if not _.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            loop.close()
@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (C) 2018 Simon Kallfass
+
+Access to the repodata of the conda-channels used by the pproject-module.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path, PurePosixPath
+import shlex
+import time
+
+import attr
+
+from ouroboros.tools.pproject import conda
+from ouroboros.tools.pproject import utils
+
+
+CONFIG = utils.CONFIG
+REPODATA_CACHE_FOLDER = Path.home() / '.cache/pproject/repodata'
+"""pathlib.Path: Folder storing the compact indexes of the channels with their
+http-cache-headers."""
+CACHE_FORMAT = 2
+"""int: Version of the format of the stored compact indexes. Stored indexes
+of other versions are collected again."""
+SUBDIRS = ('linux-64', 'noarch')
+"""tuple: The subdirs of the channels to collect the repodata for."""
+REPODATA = {}
+"""dict: The compact indexes already collected by this process (by url)."""
+INDEX = {}
+"""dict: The combined index of the configured channels built by this
+process."""
+INDEX_LOCK_NAME = '.pproject-index.lock'
+"""str: Name of the lockfile inside the packages-folder of the
+conda-repository-server held while its index is updated."""
+INDEX_FILES = ('repodata.json', 'repodata_from_packages.json',
+               'current_repodata.json')
+"""tuple: The index-files of the packages-folder new packages are inserted into
+(if they exist)."""
+INDEX_SCRIPT = """
+import bz2, fcntl, json, os, re, subprocess, sys
+folder, conda_exe = sys.argv[1], sys.argv[2]
+records = json.load(sys.stdin)
+def version_key(version):
+    return [(int(number) if number else -1, rest) for number, rest in
+            (re.match('([0-9]*)(.*)', _).groups()
+             for _ in re.split('[._-]', version))]
+def newer(first, second):
+    first, second = version_key(first), version_key(second)
+    length = max(len(first), len(second))
+    first += [(0, '')] * (length - len(first))
+    second += [(0, '')] * (length - len(second))
+    return first > second
+def insert_current(index, key, filename, record):
+    version = record.get('version', '')
+    for section in ('packages', 'packages.conda'):
+        packages = index.get(section, {})
+        for known, known_record in list(packages.items()):
+            if known_record.get('name') != record.get('name'):
+                continue
+            known_version = known_record.get('version', '')
+            if newer(known_version, version):
+                return
+            if newer(version, known_version):
+                del packages[known]
+    index.setdefault(key, {})[filename] = record
+def write(path, content):
+    tmp_path = '%s.%d' % (path, os.getpid())
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(content)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.rename(tmp_path, path)
+with open(os.path.join(folder, sys.argv[3]), 'a') as lock:
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    if not os.path.exists(os.path.join(folder, 'repodata.json')):
+        sys.exit(subprocess.call([conda_exe, 'index', folder]))
+    for name in sys.argv[4:]:
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            continue
+        with open(path) as index_file:
+            index = json.load(index_file)
+        for filename, record in records.items():
+            key = ('packages.conda' if filename.endswith('.conda')
+                   else 'packages')
+            if name == 'current_repodata.json':
+                insert_current(index, key, filename, record)
+            else:
+                index.setdefault(key, {})[filename] = record
+        content = json.dumps(index, indent=2, sort_keys=True).encode('utf-8')
+        write(path, content)
+        if name == 'repodata.json':
+            write(path + '.bz2', bz2.compress(content))
+"""
+"""str: Python-script run on the conda-repository-server (with the python of
+its conda-installation) to insert new packages into the index (see
+:func:`index_command`). The records are read from stdin, as they can exceed
+the size-limit of a commandline-argument. current_repodata.json only keeps
+the newest version of each package."""
+
+
+# -----------------------------------------------------------------------------
+def repodata_urls():
+    """
+    Returns the urls of the repodata.json-files of the channels as defined in
+    "conda_channels" inside the config.
+
+    Returns
+    -------
+    list
+    """
+    return [f'{channel.rstrip("/")}/{subdir}/repodata.json'
+            for channel in CONFIG['conda_channels']
+            for subdir in SUBDIRS]
+
+
+# -----------------------------------------------------------------------------
+def cache_path(url, cache_folder=None):
+    """
+    Returns the path of the cache-file for the repodata of the passed url.
+
+    Parameters
+    ----------
+    url: str
+    cache_folder: pathlib.Path
+        (default=None) Defaults to REPODATA_CACHE_FOLDER.
+
+    Returns
+    -------
+    pathlib.Path
+    """
+    cache_folder = cache_folder or REPODATA_CACHE_FOLDER
+    return cache_folder / f'{hashlib.md5(url.encode()).hexdigest()}.json'
+
+
+# -----------------------------------------------------------------------------
+def compact_index(repodata):
+    """
+    Reduces the passed repodata to the builds of each version of each
+    package. The packages of both formats (".tar.bz2" and ".conda") are
+    considered.
+
+    Parameters
+    ----------
+    repodata: dict
+        The content of a repodata.json.
+
+    Returns
+    -------
+    dict
+        The builds by version by packagename.
+
+        Example:
+            {'attrs': {'17.3.0': ['py36_0'], '17.4.0': ['py27_0', 'py36_0']}}
+    """
+    index = {}
+    records = [record
+               for section in ('packages', 'packages.conda')
+               for record in repodata.get(section, {}).values()]
+    for record in records:
+        builds = (index
+                  .setdefault(record['name'], {})
+                  .setdefault(record['version'], []))
+        if record.get('build', '') not in builds:
+            builds.append(record.get('build', ''))
+    return index
+
+
+# -----------------------------------------------------------------------------
+def fetch_repodata(url, cache_folder=None):
+    """
+    Returns the compact index (see :func:`compact_index`) of the passed
+    repodata-url.
+    The index is stored on disk with the ETag and Last-Modified header of the
+    response. Within "repodata_cache_ttl" seconds (as defined in the config)
+    the stored index is used without any request, afterwards the repodata is
+    only downloaded again if it changed on the channel. If the channel can't
+    be reached, the stored index is used.
+    Each url is only handled once per process.
+
+    Parameters
+    ----------
+    url: str
+        The url of the repodata.json.
+    cache_folder: pathlib.Path
+        (default=None) Defaults to REPODATA_CACHE_FOLDER.
+
+    Returns
+    -------
+    dict or None
+        None if neither the channel nor the cache provide the repodata.
+    """
+    if url in REPODATA:
+        return REPODATA[url]
+    path = cache_path(url, cache_folder)
+    try:
+        cache = json.loads(path.read_text())
+        assert cache['url'] == url and 'timestamp' in cache
+        assert cache.get('format') == CACHE_FORMAT
+    except Exception:
+        cache = dict(url=url, etag=None, modified=None, timestamp=0,
+                     packages=None)
+    if (cache['packages'] is not None
+            and time.time() - cache['timestamp']
+            < CONFIG['repodata_cache_ttl']):
+        REPODATA[url] = cache['packages']
+        return cache['packages']
+    import urllib.error
+    import urllib.request
+    request = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'})
+    if cache['packages'] is not None:
+        if cache['etag']:
+            request.add_header('If-None-Match', cache['etag'])
+        if cache['modified']:
+            request.add_header('If-Modified-Since', cache['modified'])
+    try:
+        with urllib.request.urlopen(request,
+                                    timeout=CONFIG['remote_timeout']) as resp:
+            content = resp.read()
+            if resp.headers.get('Content-Encoding') == 'gzip':
+                content = gzip.decompress(content)
+            cache = dict(url=url,
+                         format=CACHE_FORMAT,
+                         etag=resp.headers.get('ETag'),
+                         modified=resp.headers.get('Last-Modified'),
+                         packages=compact_index(
+                             json.loads(content.decode('utf-8'))))
+    except urllib.error.HTTPError as err:
+        if err.code != 304:
+            REPODATA[url] = cache['packages']
+            return cache['packages']
+    except (OSError, ValueError):
+        REPODATA[url] = cache['packages']
+        return cache['packages']
+    cache['timestamp'] = time.time()
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(cache))
+        os.replace(str(tmp_path), str(path))
+    except OSError:
+        pass
+    REPODATA[url] = cache['packages']
+    return cache['packages']
+
+
+# -----------------------------------------------------------------------------
+def invalidate(cache_folder=None):
+    """
+    Marks the stored repodata of all configured channels as outdated, so it
+    is refreshed (with a conditional request) by the next query. Used after
+    publishing new packages.
+
+    Parameters
+    ----------
+    cache_folder: pathlib.Path
+        (default=None) Defaults to REPODATA_CACHE_FOLDER.
+    """
+    REPODATA.clear()
+    INDEX.clear()
+    for url in repodata_urls():
+        path = cache_path(url, cache_folder)
+        try:
+            cache = json.loads(path.read_text())
+            cache['timestamp'] = 0
+            path.write_text(json.dumps(cache))
+        except (OSError, ValueError):
+            pass
+
+
+# =============================================================================
+@attr.s
+class RepodataIndex:
+    """
+    Class representing the combined compact index of all configured channels.
+    Used to query available packages without running conda.
+
+    Attributes
+    ----------
+    packages: dict
+        The builds by version by packagename (see :func:`compact_index`).
+    complete: bool
+        Flag if the repodata of all configured channels is available.
+    """
+    packages = attr.ib(default=attr.Factory(dict))
+    complete = attr.ib(default=True)
+
+    # -------------------------------------------------------------------------
+    def add(self, packages):
+        """
+        Adds the passed compact index to the index.
+
+        Parameters
+        ----------
+        packages: dict
+        """
+        for name, versions in packages.items():
+            for version, builds in versions.items():
+                known = (self.packages
+                         .setdefault(name, {})
+                         .setdefault(version, []))
+                known.extend(_ for _ in builds if _ not in known)
+
+    # -------------------------------------------------------------------------
+    def versions(self, name):
+        """
+        Returns the available versions of the passed package.
+
+        Parameters
+        ----------
+        name: str
+
+        Returns
+        -------
+        list
+            The versions sorted ascending.
+        """
+        return sorted(self.packages.get(name, {}),
+                      key=conda.version_key)
+
+    # -------------------------------------------------------------------------
+    def builds(self, name, version):
+        """
+        Returns the available builds of the passed version of the passed
+        package.
+
+        Parameters
+        ----------
+        name: str
+        version: str
+
+        Returns
+        -------
+        list
+        """
+        return list(self.packages.get(name, {}).get(version, []))
+
+    # -------------------------------------------------------------------------
+    def find(self, dependency):
+        """
+        Returns the available versions matching the passed dependency.
+
+        Parameters
+        ----------
+        dependency: str
+            The dependency as defined in the meta.yaml.
+
+            Example:
+                'attrs >=17.4*'
+
+        Returns
+        -------
+        list
+            The versions sorted ascending.
+        """
+        name, spec = conda.parse_dependency(dependency)
+        return [_ for _ in self.versions(name)
+                if not spec or conda.version_matches(_, spec)]
+
+    # -------------------------------------------------------------------------
+    def latest(self, dependency):
+        """
+        Returns the latest available version matching the passed dependency.
+
+        Parameters
+        ----------
+        dependency: str
+
+        Returns
+        -------
+        str or None
+        """
+        versions = self.find(dependency)
+        return versions[-1] if versions else None
+
+    # -------------------------------------------------------------------------
+    def is_available(self, dependency):
+        """
+        Checks if a version matching the passed dependency is available.
+
+        Parameters
+        ----------
+        dependency: str
+
+        Returns
+        -------
+        bool
+        """
+        return bool(self.find(dependency))
+
+    # -------------------------------------------------------------------------
+    def unavailable(self, dependencies):
+        """
+        Returns the passed dependencies without available version. Returns
+        nothing if the index isn't complete, because missing packages could be
+        inside the channels without repodata.
+
+        Parameters
+        ----------
+        dependencies: list
+
+        Returns
+        -------
+        list
+        """
+        if not self.complete:
+            return []
+        return [_ for _ in dependencies if not self.is_available(_)]
+
+
+# -----------------------------------------------------------------------------
+def load_index(cache_folder=None):
+    """
+    Returns the combined index of all configured channels. The index is only
+    built once per process.
+
+    Parameters
+    ----------
+    cache_folder: pathlib.Path
+        (default=None) Defaults to REPODATA_CACHE_FOLDER.
+
+    Returns
+    -------
+    RepodataIndex
+    """
+    if 'index' not in INDEX:
+        index = RepodataIndex()
+        for url in repodata_urls():
+            packages = fetch_repodata(url, cache_folder)
+            if packages is None:
+                index.complete = False
+            else:
+                index.add(packages)
+        INDEX['index'] = index
+    return INDEX['index']
+
+
+# -----------------------------------------------------------------------------
+def check_availability(dependencies, cache_folder=None):
+    """
+    Checks for each of the passed dependencies if a matching version is
+    available inside the configured channels (see :func:`load_index`). Like
+    :func:`RepodataIndex.unavailable` the availability is unknown if the
+    repodata of a channel isn't available.
+
+    Parameters
+    ----------
+    dependencies: list
+        The dependencies as defined in the meta.yaml.
+    cache_folder: pathlib.Path
+        (default=None) Defaults to REPODATA_CACHE_FOLDER.
+
+    Returns
+    -------
+    dict
+        The availability (bool or None if unknown) by dependency.
+    """
+    index = load_index(cache_folder)
+    return {_: index.is_available(_) if index.complete else None
+            for _ in dependencies}
+
+
+# -----------------------------------------------------------------------------
+def package_record(path):
+    """
+    Returns the entry of the passed conda-package inside the repodata.json of
+    a channel: the content of its "info/index.json" with the md5sum, sha256sum
+    and size of the package.
+
+    Parameters
+    ----------
+    path: str
+        The path of the conda-package (.tar.bz2).
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    OSError
+        If the package can't be read.
+    """
+    import tarfile
+    try:
+        with tarfile.open(str(path), 'r:bz2') as package:
+            record = json.loads(
+                package.extractfile('info/index.json').read().decode('utf-8'))
+    except (tarfile.TarError, KeyError, ValueError) as err:
+        raise OSError(f'{path} is no valid conda-package ({err})')
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(str(path), 'rb') as package:
+        for chunk in iter(lambda: package.read(utils.MD5_CHUNK_SIZE), b''):
+            md5.update(chunk)
+            sha256.update(chunk)
+            size += len(chunk)
+    record.update(md5=md5.hexdigest(), sha256=sha256.hexdigest(), size=size)
+    return record
+
+
+# -----------------------------------------------------------------------------
+def index_command(packages_path, conda_exe):
+    """
+    Returns the command inserting records into the index-files (see
+    INDEX_FILES) of the packages-folder on the conda-repository-server. The
+    records (see :func:`package_record`) are passed to the command by
+    filename of the package as json on stdin.
+    Only the new records are added, so the time doesn't depend on the number
+    of packages of the channel (unlike "conda index", which hashes all of
+    them). The index-files are replaced atomically while holding a lock (see
+    INDEX_LOCK_NAME), so concurrent publishes don't lose records. If the
+    folder has no repodata.json yet, "conda index" is run instead (holding
+    the lock, too).
+
+    Parameters
+    ----------
+    packages_path: str
+        The packages-folder on the conda-repository-server.
+    conda_exe: str
+        The conda-executable on the conda-repository-server. The python next
+        to it runs the update.
+
+    Returns
+    -------
+    str
+    """
+    python = str(PurePosixPath(conda_exe).with_name('python'))
+    return ' '.join(shlex.quote(str(_)) for _ in
+                    [python, '-c', INDEX_SCRIPT, packages_path, conda_exe,
+                     INDEX_LOCK_NAME]
+                    + list(INDEX_FILES))
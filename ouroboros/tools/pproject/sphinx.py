@@ -6,23 +6,32 @@ Copyright (C) 2018 Simon Kallfass
 sphinx-commands used by the pproject-module.
 """
 
+import os
 from subprocess import CalledProcessError
 
 from ouroboros.tools.pproject import inform
 from ouroboros.tools.pproject import utils
 
 
-CONFIG = utils.load_configs()
-PPROJECT_ENV_PATH = CONFIG['pproject_env']
-"""str: The folder where the pproject-env is stored."""
-COMPANY = CONFIG['company']
-"""str: The company name to use for new project creations based on
-"pproject create"."""
-SPHINX_QUICKSTART = f'{PPROJECT_ENV_PATH}/bin/sphinx-quickstart'
-PYTEST = f'{PPROJECT_ENV_PATH}/bin/pytest'
-COVERAGE_BADGE = f'{PPROJECT_ENV_PATH}/bin/coverage-badge'
-SPHINX_APIDOC = f'{PPROJECT_ENV_PATH}/bin/sphinx-apidoc'
-SPHINXBUILD = f'{PPROJECT_ENV_PATH}/bin/sphinx-build'
+CONFIG = utils.CONFIG
+
+
+# -----------------------------------------------------------------------------
+def pproject_bin(executable):
+    """
+    Returns the path of the passed executable inside the pproject-env as
+    defined in the config.
+
+    Parameters
+    ----------
+    executable: str
+        The name of the executable, e.g. "sphinx-build".
+
+    Returns
+    -------
+    str
+    """
+    return f'{CONFIG["pproject_env"]}/bin/{executable}'
 
 
 # -----------------------------------------------------------------------------
@@ -44,17 +53,17 @@ def run_sphinx_quickstart(path, environment, username, version):
         The current version of the project.
     """
     inform.info('Running sphinx-quickstart')
-    utils.run_in_bash(f"cd {path.absolute()} && "
-                      f"{SPHINX_QUICKSTART} "
-                      "-q "
-                      f"-p '{environment}' "
-                      f"-a '{username}' "
-                      f"-v {version} "
-                      "-l en "
-                      "--ext-autodoc --ext-todo --ext-coverage "
-                      "--ext-viewcode "
-                      "--extensions=sphinx.ext.napoleon "
-                      "--makefile --sep")
+    utils.run([pproject_bin('sphinx-quickstart'),
+               '-q',
+               '-p', environment,
+               '-a', username,
+               '-v', version,
+               '-l', 'en',
+               '--ext-autodoc', '--ext-todo', '--ext-coverage',
+               '--ext-viewcode',
+               '--extensions=sphinx.ext.napoleon',
+               '--makefile', '--sep'],
+              cwd=path)
 
 
 # -----------------------------------------------------------------------------
@@ -89,8 +98,7 @@ def customize_config(path):
                     if key in line:
                         line = line.replace(key, find_replace[key])
                 new_data.write(line)
-    utils.run_in_bash(f'mv {str((path / "source/new_data.txt").absolute())} '
-                      f'{str((path / "source/conf.py").absolute())}')
+    os.replace(str(path / 'source/new_data.txt'), str(path / 'source/conf.py'))
 
 
 # -----------------------------------------------------------------------------
@@ -109,12 +117,15 @@ def create_coverage_badge(path, environment):
     """
     inform.info('Running pytest-cov and creating coverage-badge')
     try:
-        utils.run_in_bash(
-            f'cd {str(path.absolute())} && '
-            f'{PYTEST} --cov={COMPANY} --cov-report term-missing -v && '
-            f'{COVERAGE_BADGE} -o source/_static/{environment}_coverage.svg -f')
+        utils.run_streaming([pproject_bin('pytest'),
+                             f'--cov={CONFIG["company"]}',
+                             '--cov-report', 'term-missing', '-v'],
+                            cwd=path)
+        utils.run([pproject_bin('coverage-badge'),
+                   '-o', f'source/_static/{environment}_coverage.svg', '-f'],
+                  cwd=path)
     except CalledProcessError as err:
-        print(err.output.strip().decode('ascii'))
+        print(err.output.strip().decode('utf-8', 'replace'))
 
 
 # -----------------------------------------------------------------------------
@@ -129,11 +140,10 @@ def update_source(path):
     """
     inform.info('Updating source for documentation to create')
     try:
-        utils.run_in_bash(
-            f'cd {str(path.absolute())} && '
-            f'{SPHINX_APIDOC} -f -o source/ .')
+        utils.run([pproject_bin('sphinx-apidoc'), '-f', '-o', 'source/', '.'],
+                  cwd=path)
     except CalledProcessError as err:
-        print(err.output.strip().decode('ascii'))
+        print(err.output.strip().decode('utf-8', 'replace'))
 
 
 # -----------------------------------------------------------------------------
@@ -148,8 +158,9 @@ def make_documentation(path):
     """
     inform.info('Generating html- and pdf-documentation')
     try:
-        utils.run_in_bash(
-            f'cd {str(path.absolute())} && '
-            f'make SPHINXBUILD={SPHINXBUILD} html')
+        utils.run_streaming(['make',
+                             f'SPHINXBUILD={pproject_bin("sphinx-build")}',
+                             'html'],
+                            cwd=path)
     except CalledProcessError as err:
-        print(err.output.strip().decode('ascii'))
+        print(err.output.strip().decode('utf-8', 'replace'))
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copyright (C) 2018 Simon Kallfass
+
+Execution plan of the steps of a pproject-invocation.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import attr
+
+from ouroboros.tools.pproject import inform
+
+
+TASKS_STATE_FOLDER = Path.home() / '.cache/pproject/tasks'
+"""pathlib.Path: Folder storing the inputs of the last successful run of each
+step by project."""
+
+
+# -----------------------------------------------------------------------------
+def state_path(project_path, state_folder=None):
+    """
+    Returns the path of the file storing the inputs of the last successful
+    steps of the project at the passed path.
+
+    Parameters
+    ----------
+    project_path: pathlib.Path
+    state_folder: pathlib.Path
+        (default=None) Defaults to TASKS_STATE_FOLDER.
+
+    Returns
+    -------
+    pathlib.Path
+    """
+    state_folder = state_folder or TASKS_STATE_FOLDER
+    key = hashlib.md5(str(Path(project_path).absolute()).encode()).hexdigest()
+    return state_folder / f'{key}.json'
+
+
+# =============================================================================
+@attr.s
+class TaskGraph:
+    """
+    Class representing the execution plan of one pproject-invocation.
+    Each step (e.g. "update", "test", "build") runs at most once per
+    invocation. Steps with inputs are also skipped if their inputs didn't
+    change since their last successful run, unless they are the requested
+    step of the invocation.
+
+    Attributes
+    ----------
+    state_path: pathlib.Path
+        The file storing the inputs of the last successful run of each step.
+    done: dict
+        The results of the steps already run (or skipped) by name.
+    """
+    state_path = attr.ib()
+    done = attr.ib(init=False, default=attr.Factory(dict))
+
+    # -------------------------------------------------------------------------
+    def last_inputs(self, name):
+        """
+        Returns the inputs of the last successful run of the passed step.
+
+        Parameters
+        ----------
+        name: str
+
+        Returns
+        -------
+        dict or None
+        """
+        try:
+            return json.loads(self.state_path.read_text()).get(name)
+        except (OSError, ValueError):
+            return None
+
+    # -------------------------------------------------------------------------
+    def store_inputs(self, name, inputs):
+        """
+        Stores the passed inputs as inputs of the last successful run of the
+        passed step.
+
+        Parameters
+        ----------
+        name: str
+        inputs: dict
+        """
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            state = {}
+        state[name] = inputs
+        tmp_path = self.state_path.with_name(
+            f'{self.state_path.name}.{os.getpid()}')
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(state))
+            os.replace(str(tmp_path), str(self.state_path))
+        except OSError:
+            pass
+
+    # -------------------------------------------------------------------------
+    def run(self, name, func, inputs=None, requested=False):
+        """
+        Runs the passed step if it didn't run in this invocation yet and its
+        inputs changed since its last successful run.
+
+        Parameters
+        ----------
+        name: str
+            The name of the step.
+        func: callable
+            The function running the step.
+        inputs: callable
+            (default=None) Function returning the inputs (json-serializable
+            dict) of the step. It is called before the step to compare the
+            inputs with the last successful run and after the step to store
+            them. Steps without inputs are never skipped because of former
+            runs. If the function returns None, the step isn't skipped and
+            nothing is stored.
+        requested: bool
+            (default=False) Flag if the step is the requested step of the
+            invocation. Requested steps are run even if their inputs didn't
+            change.
+
+        Returns
+        -------
+        object
+            The result of func or None if the step was skipped.
+        """
+        if name in self.done:
+            return self.done[name]
+        if inputs is not None and not requested:
+            current_inputs = inputs()
+            if (current_inputs is not None
+                    and self.last_inputs(name) == current_inputs):
+                inform.info(f'Skipping {name} (unchanged since last run)')
+                self.done[name] = None
+                return None
+        result = func()
+        self.done[name] = result
+        if inputs is not None:
+            current_inputs = inputs()
+            if current_inputs is not None:
+                self.store_inputs(name, current_inputs)
+        return result
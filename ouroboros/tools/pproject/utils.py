@@ -7,43 +7,164 @@ Utils used by the pproject-module like md5sum-calculations, config-loading,
 executing commands in bash and ssh-interactions.
 """
 
+from collections.abc import Mapping
 import hashlib
+import os
 from pathlib import Path
+import pickle
 import socket
 import subprocess
-from subprocess import check_output
+from subprocess import CalledProcessError
 
-import paramiko
-import yaml
+import attr
 
-from ouroboros.tools.pproject.validators import SConfig
 from ouroboros.tools.pproject import inform
 
 
+DEFAULT_CONFIG_PATH = (Path(__file__).absolute()
+                       .with_name('pproject_config.yml'))
+"""pathlib.Path: The default-config shipped with pproject."""
+USER_CONFIG_PATH = Path.home() / '.config/pproject/pproject_config.yml'
+"""pathlib.Path: The user-config overriding the default-config."""
+CONFIG_SNAPSHOT_PATH = Path.home() / '.cache/pproject/config.pickle'
+"""pathlib.Path: The validated and merged config of the last config-load."""
+URL_TIMEOUT = 5
+"""int: Default timeout in seconds for reachability-checks of urls."""
+URL_PROBES = {}
+"""dict: Results of reachability-checks already done in this process."""
+SSH_CONNECTIONS = {}
+"""dict: The open ssh-connections of this process (by "username@hostname")."""
+SSH_KEEPALIVE = 30
+"""int: Seconds between keepalive-packets of pooled ssh-connections."""
+MD5_CHUNK_SIZE = 1 << 20
+"""int: Bytes read at once while calculating md5sums of files."""
+OUTPUT_TAIL_LINES = 200
+"""int: Number of lines of the output of streamed commands kept for
+error-reporting."""
+
+
+# -----------------------------------------------------------------------------
+def config_fingerprint(*paths):
+    """
+    Combines path, mtime and size of the passed config-files to a fingerprint.
+    Missing files are part of the fingerprint, too.
+
+    Parameters
+    ----------
+    paths: pathlib.Path
+
+    Returns
+    -------
+    tuple
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            fingerprint.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((str(path), None, None))
+    return tuple(fingerprint)
+
+
+# -----------------------------------------------------------------------------
+def read_config_snapshot(snapshot_path, fingerprint):
+    """
+    Reads the config stored in the snapshot-file if it was created for the
+    passed fingerprint.
+
+    Parameters
+    ----------
+    snapshot_path: pathlib.Path
+    fingerprint: tuple
+        The fingerprint of the config-files as returned by
+        :func:`config_fingerprint`.
+
+    Returns
+    -------
+    dict or None
+        The stored config or None if there is no valid snapshot.
+    """
+    try:
+        with open(str(snapshot_path), 'rb') as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+        if snapshot['fingerprint'] == fingerprint:
+            return snapshot['config']
+    except Exception:
+        # a missing or broken snapshot only means the config is loaded
+        # from the config-files again
+        pass
+    return None
+
+
+# -----------------------------------------------------------------------------
+def write_config_snapshot(snapshot_path, fingerprint, config):
+    """
+    Stores the passed config together with the fingerprint of the
+    config-files it was created from. The snapshot-file is replaced
+    atomically. Failures are ignored as the snapshot is only a cache.
+
+    Parameters
+    ----------
+    snapshot_path: pathlib.Path
+    fingerprint: tuple
+    config: dict
+    """
+    tmp_path = snapshot_path.with_name(f'{snapshot_path.name}.{os.getpid()}')
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(str(tmp_path), 'wb') as snapshot_file:
+            pickle.dump(dict(fingerprint=fingerprint, config=config),
+                        snapshot_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(tmp_path), str(snapshot_path))
+    except OSError:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
 # -----------------------------------------------------------------------------
-def load_configs(default_config_path=None, user_config_path=None):
+def load_configs(default_config_path=None, user_config_path=None,
+                 snapshot_path=None, use_snapshot=True):
     """
-    Unwritten yet
+    Loads the default-config and the user-config, validates both and returns
+    the merged config (values of the user-config override the defaults).
+    The result is stored as a snapshot. As long as mtime and size of both
+    config-files are unchanged, later calls return the snapshot without
+    parsing and validating the config-files again.
 
     Parameters
     ----------
     default_config_path: pathlib.Path
     user_config_path: pathlib.Path
+    snapshot_path: pathlib.Path
+        (default=None) The snapshot-file to use. Defaults to
+        CONFIG_SNAPSHOT_PATH.
+    use_snapshot: bool
+        (default=True) Flag if the snapshot should be used and updated.
 
     Returns
     -------
-    list:
-        List of dicts containing "default_config"-content and
-        "user_config"-content.
+    dict:
+        The merged and validated config.
     """
     config = {}
     if not default_config_path:
-        default_config_path = (Path(__file__).absolute()
-                               .with_name('pproject_config.yml'))
+        default_config_path = DEFAULT_CONFIG_PATH
     if not user_config_path:
-        user_config_path = Path.home() / '.config/pproject/pproject_config.yml'
+        user_config_path = USER_CONFIG_PATH
+    if not snapshot_path:
+        snapshot_path = CONFIG_SNAPSHOT_PATH
     assert all([isinstance(default_config_path, Path),
                 isinstance(user_config_path, Path)])
+    fingerprint = config_fingerprint(default_config_path, user_config_path)
+    if use_snapshot:
+        snapshot = read_config_snapshot(snapshot_path, fingerprint)
+        if snapshot is not None:
+            return snapshot
+    # imported here as they aren't required if the snapshot is used
+    import yaml
+    from ouroboros.tools.pproject.validators import SConfig
     with open(str(default_config_path)) as default_conf:
         default_config = yaml.load(default_conf)
         SConfig(strict=True).load(default_config)
@@ -54,11 +175,92 @@ def load_configs(default_config_path=None, user_config_path=None):
     else:
         user_config = {}
     for config_key, config_value in default_config.items():
-        config[config_key] = user_config.get(config_key) or config_value
+        config[config_key] = (user_config[config_key]
+                              if config_key in user_config else config_value)
     SConfig(strict=True).load(config)
+    if use_snapshot:
+        write_config_snapshot(snapshot_path, fingerprint, config)
     return config
 
 
+# =============================================================================
+@attr.s
+class LazyConfig(Mapping):
+    """
+    Read-only view of the pproject-config shared by all modules of a process.
+    The config-files are read and validated by :func:`load_configs` on first
+    access only. The result is memoized until :func:`LazyConfig.reload` is
+    called.
+
+    Attributes
+    ----------
+    default_config_path: pathlib.Path
+    user_config_path: pathlib.Path
+    """
+    default_config_path = attr.ib(default=None)
+    user_config_path = attr.ib(default=None)
+    _content = attr.ib(init=False, default=None, repr=False)
+
+    # -------------------------------------------------------------------------
+    def load(self):
+        """
+        Loads the config if it isn't loaded yet and returns it.
+
+        Returns
+        -------
+        dict
+            The merged and validated config.
+        """
+        if self._content is None:
+            self._content = load_configs(
+                default_config_path=self.default_config_path,
+                user_config_path=self.user_config_path)
+        return self._content
+
+    # -------------------------------------------------------------------------
+    def reload(self):
+        """
+        Drops the memoized config and loads it again from the config-files.
+
+        Returns
+        -------
+        dict
+            The merged and validated config.
+        """
+        self._content = None
+        return self.load()
+
+    # -------------------------------------------------------------------------
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    # -------------------------------------------------------------------------
+    def __iter__(self):
+        return iter(self.load())
+
+    # -------------------------------------------------------------------------
+    def __len__(self):
+        return len(self.load())
+
+
+CONFIG = LazyConfig()
+"""LazyConfig: The process-wide pproject-config."""
+
+
+# -----------------------------------------------------------------------------
+def reload_configs():
+    """
+    Reloads the process-wide config (:data:`CONFIG`), e.g. after the
+    config-files were changed.
+
+    Returns
+    -------
+    dict
+        The merged and validated config.
+    """
+    return CONFIG.reload()
+
+
 # -----------------------------------------------------------------------------
 def get_config_for_terminal():
     """
@@ -70,20 +272,25 @@ def get_config_for_terminal():
     path: pathlib.Path
         The path of the config file.
     """
-    for key, val in load_configs().items():
+    for key, val in CONFIG.items():
         if not isinstance(val, dict) and not isinstance(val, list):
             print(f'{key}={val}')
 
 
 # -----------------------------------------------------------------------------
-def md5(fname):
+def md5(fname, size=None):
     """
     Calculates the md5sum of the passed file and returns the calculated value.
+    The file is read in chunks, so even big packages don't need to fit into
+    memory.
 
     Parameters
     ----------
     fname: str
         filename of file to calculate the md5sum for
+    size: int
+        (default=None) Only the first size bytes of the file are hashed if
+        passed (used to verify partial uploads).
 
     Returns
     --------
@@ -95,16 +302,295 @@ def md5(fname):
         fname = Path(fname)
     assert isinstance(fname, Path)
     assert fname.exists()
+    remaining = float('inf') if size is None else size
     with open(str(fname), "rb") as file_of_interest:
-        for chunk in iter(lambda: file_of_interest.read(4096), b""):
+        while remaining > 0:
+            chunk = file_of_interest.read(int(min(MD5_CHUNK_SIZE, remaining)))
+            if not chunk:
+                break
             hash_md5.update(chunk)
+            remaining -= len(chunk)
     return hash_md5.hexdigest()
 
 
+# -----------------------------------------------------------------------------
+def folder_size(path):
+    """
+    Calculates the size of all files inside the passed folder. Files
+    hardlinked multiple times inside the folder are only counted once.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+
+    Returns
+    -------
+    int
+        The size in bytes.
+    """
+    inodes = set()
+    size = 0
+    for root, _, files in os.walk(str(path)):
+        for fname in files:
+            stat = os.lstat(os.path.join(root, fname))
+            if stat.st_ino not in inodes:
+                inodes.add(stat.st_ino)
+                size += stat.st_size
+    return size
+
+
+# =============================================================================
+@attr.s(frozen=True)
+class ExitStatus:
+    """
+    Class representing the result of a process executed by :func:`run`.
+
+    Attributes
+    ----------
+    argv: list
+        The executed command.
+    returncode: int
+        The exit-code of the process (-9 if it was killed by the timeout, 127
+        if the executable couldn't be started).
+    output: str
+        The combined and stripped stdout and stderr of the process (only
+        stdout if stderr was captured separately).
+    timed_out: bool
+        Flag if the process was killed because of its timeout.
+    error: str
+        The stripped stderr of the process if it was captured separately.
+    """
+    argv = attr.ib()
+    returncode = attr.ib()
+    output = attr.ib()
+    timed_out = attr.ib(default=False)
+    error = attr.ib(default='')
+
+    # -------------------------------------------------------------------------
+    @property
+    def ok(self):
+        """
+        bool: True if the process succeeded.
+        """
+        return self.returncode == 0 and not self.timed_out
+
+    # -------------------------------------------------------------------------
+    def check(self):
+        """
+        Raises a subprocess.CalledProcessError (with the output and stderr as
+        bytes) if the process didn't succeed.
+
+        Returns
+        -------
+        ExitStatus
+            The status itself if the process succeeded.
+        """
+        if not self.ok:
+            raise CalledProcessError(self.returncode, self.argv,
+                                     output=self.output.encode('utf-8'),
+                                     stderr=self.error.encode('utf-8'))
+        return self
+
+
+# -----------------------------------------------------------------------------
+def run(argv, cwd=None, timeout=None, env=None, check=True,
+        merge_stderr=True):
+    """
+    Executes the passed command directly (without a shell).
+
+    Parameters
+    ----------
+    argv: list
+        The executable and its arguments.
+
+        Example:
+            ['git', 'describe', '--tag']
+    cwd: pathlib.Path
+        (default=None) The directory to execute the command in.
+    timeout: int
+        (default=None) Seconds after which the process is killed.
+    env: dict
+        (default=None) Environment-variables to set in addition to the
+        current environment.
+    check: bool
+        (default=True) Flag if a subprocess.CalledProcessError should be
+        raised if the process doesn't succeed.
+    merge_stderr: bool
+        (default=True) Flag if stderr should be part of the output. Else it
+        is captured separately (see :attr:`ExitStatus.error`).
+
+    Returns
+    -------
+    ExitStatus
+    """
+    argv = [str(_) for _ in argv]
+    try:
+        proc = subprocess.run(argv,
+                              cwd=str(cwd) if cwd else None,
+                              env=dict(os.environ, **env) if env else None,
+                              stdout=subprocess.PIPE,
+                              stderr=(subprocess.STDOUT if merge_stderr
+                                      else subprocess.PIPE),
+                              timeout=timeout)
+        status = ExitStatus(argv=argv,
+                            returncode=proc.returncode,
+                            output=proc.stdout.decode('utf-8',
+                                                      'replace').strip(),
+                            error=(proc.stderr or b'').decode(
+                                'utf-8', 'replace').strip())
+    except subprocess.TimeoutExpired as err:
+        status = ExitStatus(argv=argv,
+                            returncode=-9,
+                            output=(err.output or b'').decode(
+                                'utf-8', 'replace').strip(),
+                            timed_out=True)
+    except OSError as err:
+        status = ExitStatus(argv=argv, returncode=127, output=str(err))
+    if check:
+        status.check()
+    return status
+
+
+# =============================================================================
+@attr.s
+class OutputStream:
+    """
+    Class representing the output of a process executed directly (without a
+    shell). Iterating over the stream starts the process and yields the lines
+    of its combined stdout and stderr while it is running. The output is
+    decoded incrementally as utf-8 and only the last lines are kept for
+    error-reporting.
+
+    Attributes
+    ----------
+    argv: list
+        The executable and its arguments.
+    cwd: pathlib.Path
+        (default=None) The directory to execute the command in.
+    timeout: int
+        (default=None) Seconds after which the process is killed.
+    env: dict
+        (default=None) Environment-variables to set in addition to the
+        current environment.
+    tail: int
+        (default=OUTPUT_TAIL_LINES) Number of lines of the output to keep.
+    status: ExitStatus
+        The result of the process (with the kept lines as output). Set after
+        the stream was consumed.
+    """
+    argv = attr.ib(converter=lambda argv: [str(_) for _ in argv])
+    cwd = attr.ib(default=None)
+    timeout = attr.ib(default=None)
+    env = attr.ib(default=None)
+    tail = attr.ib(default=OUTPUT_TAIL_LINES)
+    status = attr.ib(init=False, default=None)
+
+    # -------------------------------------------------------------------------
+    def __iter__(self):
+        import codecs
+        from collections import deque
+        import re
+        import selectors
+        import time
+        lines = deque(maxlen=self.tail)
+        try:
+            proc = subprocess.Popen(
+                self.argv,
+                cwd=str(self.cwd) if self.cwd else None,
+                env=dict(os.environ, **self.env) if self.env else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT)
+        except OSError as err:
+            self.status = ExitStatus(argv=self.argv, returncode=127,
+                                     output=str(err))
+            return
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        deadline = (time.monotonic() + self.timeout
+                    if self.timeout is not None else None)
+        pending = ''
+        timed_out = False
+        with proc, selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ)
+            while True:
+                wait = (None if deadline is None
+                        else max(deadline - time.monotonic(), 0))
+                if not selector.select(wait):
+                    timed_out = True
+                    proc.kill()
+                    break
+                chunk = os.read(proc.stdout.fileno(), 65536)
+                pending += decoder.decode(chunk, final=not chunk)
+                *complete, pending = re.split(r'\r\n|\r|\n', pending)
+                for line in complete:
+                    lines.append(line)
+                    yield line
+                if not chunk:
+                    break
+            if pending:
+                lines.append(pending)
+                yield pending
+            proc.wait()
+        self.status = ExitStatus(argv=self.argv,
+                                 returncode=-9 if timed_out
+                                 else proc.returncode,
+                                 output='\n'.join(lines).strip(),
+                                 timed_out=timed_out)
+
+
+# -----------------------------------------------------------------------------
+def run_streaming(argv, cwd=None, timeout=None, env=None, check=True,
+                  progress=None, tail=OUTPUT_TAIL_LINES):
+    """
+    Executes the passed command directly (without a shell) like :func:`run`,
+    but passes each line of its output to progress while it is running (see
+    :class:`OutputStream`). Used for long running commands like conda-builds
+    or test-runs.
+
+    Parameters
+    ----------
+    argv: list
+        The executable and its arguments.
+    cwd: pathlib.Path
+        (default=None) The directory to execute the command in.
+    timeout: int
+        (default=None) Seconds after which the process is killed.
+    env: dict
+        (default=None) Environment-variables to set in addition to the
+        current environment.
+    check: bool
+        (default=True) Flag if a subprocess.CalledProcessError should be
+        raised if the process doesn't succeed.
+    progress: callable
+        (default=None) Function called with each line of the output. Defaults
+        to :func:`inform.progress` with the name of the executable.
+    tail: int
+        (default=OUTPUT_TAIL_LINES) Number of lines of the output to keep in
+        the returned status.
+
+    Returns
+    -------
+    ExitStatus
+        The status with the last tail lines of the output.
+    """
+    if progress is None:
+        tool = Path(str(argv[0])).name
+
+        def progress(line):
+            inform.progress(line, tool=tool)
+    stream = OutputStream(argv=argv, cwd=cwd, timeout=timeout, env=env,
+                          tail=tail)
+    for line in stream:
+        progress(line)
+    if check:
+        stream.status.check()
+    return stream.status
+
+
 # -----------------------------------------------------------------------------
 def run_in_bash(command):
     """
-    Executes a passed command in bash.
+    Executes a passed command in bash. Only required for commands depending
+    on shell-features, use :func:`run` for all other commands.
 
     Parameters
     ----------
@@ -116,10 +602,36 @@ def run_in_bash(command):
     result: str
         Result for executed command
     """
-    result = check_output([f'/bin/bash -c "{command}"'],
-                          shell=True,
-                          stderr=subprocess.STDOUT).strip().decode('utf-8')
-    return result
+    return run(['/bin/bash', '-c', command]).output
+
+
+# -----------------------------------------------------------------------------
+def probe_url(url, timeout=URL_TIMEOUT):
+    """
+    Requests the passed url and returns the resulting http-code.
+    The result is cached for the rest of the process, so each url is only
+    probed once.
+
+    Parameters
+    ----------
+    url: str
+        The url to probe.
+    timeout: int
+        (default=URL_TIMEOUT) Seconds to wait for the url to respond.
+
+    Returns
+    -------
+    int or None
+        The http-code of the response or None if the url can't be reached.
+    """
+    if url not in URL_PROBES:
+        import urllib.request
+        try:
+            URL_PROBES[url] = urllib.request.urlopen(
+                url, timeout=timeout).getcode()
+        except:
+            URL_PROBES[url] = None
+    return URL_PROBES[url]
 
 
 # -----------------------------------------------------------------------------
@@ -137,6 +649,7 @@ def connect_ssh(dst):
     paramiko.SSHClient
         The connection-object to the dst-host.
     """
+    import paramiko
     ssh = paramiko.SSHClient()
     ssh.load_system_host_keys()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -151,3 +664,49 @@ def connect_ssh(dst):
         inform.critical()
     else:
         return ssh
+
+
+# -----------------------------------------------------------------------------
+def ssh_connection(dst):
+    """
+    Returns the pooled connection to the destination host (dst). The
+    connection is opened with :func:`connect_ssh` on first use (or if it was
+    lost) and reused for the rest of the process, so the handshake is only
+    done once per host. Commands and sftp-sessions run as separate channels
+    of the same transport. All pooled connections are closed at exit (see
+    :func:`close_ssh_connections`).
+
+    Parameters
+    ----------
+    dst: str
+        The destination-host as combination of "username@hostname".
+
+    Returns
+    -------
+    paramiko.SSHClient
+        The connection-object to the dst-host. Don't close it.
+    """
+    ssh = SSH_CONNECTIONS.get(dst)
+    transport = ssh.get_transport() if ssh else None
+    if transport is None or not transport.is_active():
+        ssh = connect_ssh(dst)
+        ssh.get_transport().set_keepalive(SSH_KEEPALIVE)
+        if not SSH_CONNECTIONS:
+            import atexit
+            atexit.unregister(close_ssh_connections)
+            atexit.register(close_ssh_connections)
+        SSH_CONNECTIONS[dst] = ssh
+    return ssh
+
+
+# -----------------------------------------------------------------------------
+def close_ssh_connections():
+    """
+    Closes all pooled ssh-connections (see :func:`ssh_connection`).
+    """
+    while SSH_CONNECTIONS:
+        _, ssh = SSH_CONNECTIONS.popitem()
+        try:
+            ssh.close()
+        except Exception:
+            pass
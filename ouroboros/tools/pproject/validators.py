@@ -9,11 +9,12 @@ meta.yaml-validations).
 
 
 from pathlib import Path
-import urllib.request
 
 from marshmallow import fields, Schema, ValidationError, validate
 import toastedmarshmallow
 
+from ouroboros.tools.pproject import utils
+
 
 # ------------------------------------------------------------------- VALIDATOR
 def validate_environmentname(environment):
@@ -96,23 +97,26 @@ def validate_path_exists(path):
 
 
 # ------------------------------------------------------------------- VALIDATOR
-def validate_url(url):
+def validate_url(url, timeout=utils.URL_TIMEOUT):
     """
-    Validates if the passed url is valid.
+    Validates if the passed url is reachable.
+    Not used inside the schemata as it requires network access, only by the
+    commands requiring the remote vcs (see :func:`git.require_remote_vcs`).
 
     Parameters
     ----------
     url: str
         The url to validate.
+    timeout: int
+        (default=utils.URL_TIMEOUT) Seconds to wait for the url to respond.
 
     Raises
     ------
     marshmallow.ValidationError
         If passed url isn't valid, raises a marshmallow.ValidationError.
     """
-    try:
-        status = urllib.request.urlopen(url).getcode()
-    except:
+    status = utils.probe_url(url, timeout=timeout)
+    if status is None:
         raise ValidationError(f'Passed url {url} can\'t be reached.')
     if status != 200:
         raise ValidationError(
@@ -137,6 +141,8 @@ class SToasted(Schema):
 class SConfig(SToasted):
     """
     The schema-class for the pproject-config.
+    Only structural checks are done here. Reachability of the configured
+    remotes is checked by the commands requiring them.
 
     Attributes
     ----------
@@ -155,6 +161,18 @@ class SConfig(SToasted):
     conda_repo_pkgs_path: str
     conda_repo_conda_bin: str
     pytest_arguments: list
+    remote_timeout: int
+    namespaces_cache_ttl: int
+    env_cache_folder: str
+    env_cache_size: int
+    conda_channels: list
+    repodata_cache_ttl: int
+    build_cache_folder: str
+    build_cache_size: int
+    build_cache_max_age: int
+    release_workers: int
+    release_max_failure_rate: float
+    ssh_command_timeout: int
     """
     conda_folder = fields.String(strict=True, validate=validate_path_exists)
     meta_yaml_path = fields.String(strict=True)
@@ -164,8 +182,7 @@ class SConfig(SToasted):
     skeleton_repo = fields.String(strict=True)
     company = fields.String(strict=True,
                             validate=validate.Length(min=3))
-    gitlab_url = fields.String(strict=True, validate=[validate_url,
-                                                      validate.URL])
+    gitlab_url = fields.String(strict=True, validate=validate.URL())
     gitlab_api = fields.String(strict=True)
     gitlab_token_path = fields.String(strict=True,
                                       validate=validate_path_exists)
@@ -174,6 +191,27 @@ class SConfig(SToasted):
     conda_repo_pkgs_path = fields.String(strict=True)
     conda_repo_conda_bin = fields.String(strict=True)
     pytest_arguments = fields.List(fields.String(strict=True), strict=True)
+    remote_timeout = fields.Integer(strict=True,
+                                    validate=validate.Range(min=1))
+    namespaces_cache_ttl = fields.Integer(strict=True,
+                                          validate=validate.Range(min=0))
+    env_cache_folder = fields.String(strict=True)
+    env_cache_size = fields.Integer(strict=True,
+                                    validate=validate.Range(min=0))
+    conda_channels = fields.List(fields.String(strict=True), strict=True)
+    repodata_cache_ttl = fields.Integer(strict=True,
+                                        validate=validate.Range(min=0))
+    build_cache_folder = fields.String(strict=True)
+    build_cache_size = fields.Integer(strict=True,
+                                      validate=validate.Range(min=0))
+    build_cache_max_age = fields.Integer(strict=True,
+                                         validate=validate.Range(min=0))
+    release_workers = fields.Integer(strict=True,
+                                     validate=validate.Range(min=1))
+    release_max_failure_rate = fields.Float(
+        validate=validate.Range(min=0, max=1))
+    ssh_command_timeout = fields.Integer(strict=True,
+                                         validate=validate.Range(min=0))
 
 
 # ====================================================================== SCHEMA
@@ -206,7 +206,7 @@ function pproject(){
         update)
             # for the following the meta.yaml is required, so check if exists.
             if ! pproject::check_if_meta_yaml; then return 1; fi
-            if ! $pproject_py update; then return 1; fi
+            if ! $pproject_py update "$@"; then return 1; fi
             return 0;;
         # TODO: implement "project build {package, container}"
         build)
@@ -224,6 +224,9 @@ function pproject(){
             if ! pproject::check_if_meta_yaml; then return 1; fi
             if ! $pproject_py release "$@"; then return 1; fi
             return 0;;
+        publish)
+            if ! $pproject_py publish "$@"; then return 1; fi
+            return 0;;
         info)
             # for the following the meta.yaml is required, so check if exists.
             if ! $pproject_py info "$@"; then return 1; fi
@@ -0,0 +1,303 @@
+"""
+
+
+Description
+-----------
+   This module contains the benchmarks for the pproject-package.
+   The results are compared with the baselines stored in
+   benchmark_baselines.json. The number of subprocess-calls is always
+   compared, the durations depend on the machine running the tests and are
+   only compared if the environment-variable PPROJECT_BENCHMARKS=1 is set.
+   Run the benchmarks with the environment-variable
+   PPROJECT_UPDATE_BASELINES=1 to store the current results as new
+   baselines.
+
+"""
+
+
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ouroboros.tools.pproject import conda
+from ouroboros.tools.pproject import pproject
+from ouroboros.tools.pproject import repodata
+from ouroboros.tools.pproject import tasks
+from ouroboros.tools.pproject import utils
+
+
+CURRENT_PATH = Path.cwd()
+
+BASELINES_PATH = Path(__file__).absolute().with_name('benchmark_baselines.json')
+"""pathlib.Path: The file storing the baselines of the benchmarks."""
+UPDATE_BASELINES = bool(os.environ.get('PPROJECT_UPDATE_BASELINES'))
+"""bool: Flag if the results should be stored as new baselines."""
+CHECK_DURATIONS = bool(os.environ.get('PPROJECT_BENCHMARKS'))
+"""bool: Flag if the durations should be compared with the baselines."""
+TOLERANCE = 1.5
+"""float: Factor a benchmark may be slower than its baseline."""
+SLACK = 0.01
+"""float: Seconds a benchmark may be slower than its baseline (for noise)."""
+
+MODULES = ('ouroboros.tools.pproject.inform',
+           'ouroboros.tools.pproject.utils',
+           'ouroboros.tools.pproject.validators',
+           'ouroboros.tools.pproject.git',
+           'ouroboros.tools.pproject.conda',
+           'ouroboros.tools.pproject.remote',
+           'ouroboros.tools.pproject.repodata',
+           'ouroboros.tools.pproject.sphinx',
+           'ouroboros.tools.pproject.tasks',
+           'ouroboros.tools.pproject.pproject')
+
+
+# -----------------------------------------------------------------------------
+def load_baselines():
+    if BASELINES_PATH.exists():
+        return json.loads(BASELINES_PATH.read_text())
+    return {}
+
+
+BASELINES = load_baselines()
+
+
+# -----------------------------------------------------------------------------
+@pytest.fixture(scope='module')
+def results():
+    """
+    Collects the results of all benchmarks of this module and stores them as
+    new baselines if UPDATE_BASELINES is set.
+    """
+    collected = {}
+    yield collected
+    if UPDATE_BASELINES and collected:
+        baselines = load_baselines()
+        baselines.update(collected)
+        BASELINES_PATH.write_text(
+            json.dumps(baselines, indent=4, sort_keys=True) + '\n')
+
+
+# -----------------------------------------------------------------------------
+def check_baseline(results, name, duration, calls=None):
+    """
+    Stores the result of a benchmark and compares it with its baseline.
+    The duration may exceed the baseline by TOLERANCE and SLACK (only checked
+    if CHECK_DURATIONS is set), the number of subprocess-calls mustn't exceed
+    the baseline at all.
+    """
+    results[name] = dict(duration=round(duration, 6), calls=calls)
+    baseline = BASELINES.get(name)
+    if UPDATE_BASELINES or not baseline:
+        return
+    if CHECK_DURATIONS:
+        assert duration <= baseline['duration'] * TOLERANCE + SLACK, (
+            f'{name} took {duration:.4f}s '
+            f'(baseline {baseline["duration"]:.4f}s)')
+    if calls is not None and baseline['calls'] is not None:
+        assert calls <= baseline['calls'], (
+            f'{name} needed {calls} subprocess-calls '
+            f'(baseline {baseline["calls"]})')
+
+
+# -----------------------------------------------------------------------------
+def measure(func, repeat=5):
+    """
+    Returns the fastest duration in seconds of repeat calls of func.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+# =============================================================================
+class FakeStream:
+    """
+    Stub for the stdout/stderr of paramiko.SSHClient.exec_command.
+    """
+    # =========================================================================
+    class channel:
+        # ---------------------------------------------------------------------
+        @staticmethod
+        def recv_exit_status():
+            return 0
+
+    # -------------------------------------------------------------------------
+    def read(self):
+        return b''
+
+
+# =============================================================================
+class FakeSFTP:
+    """
+    Stub for paramiko.SFTPClient.
+    """
+    # -------------------------------------------------------------------------
+    def put(self, localpath, remotepath):
+        pass
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        pass
+
+
+# =============================================================================
+class FakeTransport:
+    """
+    Stub for paramiko.Transport.
+    """
+    # -------------------------------------------------------------------------
+    def is_active(self):
+        return True
+
+    # -------------------------------------------------------------------------
+    def set_keepalive(self, interval):
+        pass
+
+
+# =============================================================================
+class FakeSSH:
+    """
+    Stub for paramiko.SSHClient.
+    """
+    # -------------------------------------------------------------------------
+    def get_transport(self):
+        return FakeTransport()
+
+    # -------------------------------------------------------------------------
+    def exec_command(self, command):
+        return None, FakeStream(), FakeStream()
+
+    # -------------------------------------------------------------------------
+    def open_sftp(self):
+        return FakeSFTP()
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        pass
+
+
+# -----------------------------------------------------------------------------
+@pytest.fixture
+def stubbed(monkeypatch, tmpdir):
+    """
+    Creates a project in tmpdir and replaces all subprocess-, ssh- and
+    http-interactions by stubs. Returns the project and the list of commands
+    passed to the subprocess-stub.
+    """
+    calls = []
+    artifact = ('/var/local/conda/conda-bld/linux-64/'
+                'ouroboros-tools-pproject-1.0.0-py36_0.tar.bz2')
+    responses = {'--porcelain=v2': ('# branch.oid abc\n'
+                                    '# branch.head master'),
+                 '--get-regexp': ('user.name Dummy User\n'
+                                  'user.email dummy@user.com'),
+                 'git describe': '1.0.0',
+                 'git rev-parse': 'master',
+                 'user.name': 'Dummy User',
+                 'user.email': 'dummy@user.com',
+                 'ls-remote': 'abc\trefs/tags/1.0.0',
+                 '--output': artifact,
+                 'build --python': f'TEST END: {artifact}'}
+
+    def run(argv, cwd=None, **kwargs):
+        command = ' '.join(str(_) for _ in argv)
+        calls.append(command)
+        output = next((response for key, response in responses.items()
+                       if key in command), '')
+        return utils.ExitStatus(argv=argv, returncode=0, output=output)
+
+    path = Path(tmpdir)
+    (path / 'conda-build').mkdir()
+    shutil.copy(str(CURRENT_PATH / 'conda-build/meta.yaml'),
+                str(path / 'conda-build/meta.yaml'))
+    monkeypatch.setattr(utils, 'run', run)
+    monkeypatch.setattr(utils, 'run_streaming', run)
+    monkeypatch.setattr(utils, 'connect_ssh', lambda dst: FakeSSH())
+    monkeypatch.setattr(utils, 'SSH_CONNECTIONS', {})
+    monkeypatch.setattr(pproject.git, 'get_gitlab_groups', lambda: {})
+    monkeypatch.setattr(conda, 'environment_cache', lambda: None)
+    monkeypatch.setattr(conda, 'build_cache', lambda: None)
+    monkeypatch.setattr(tasks, 'TASKS_STATE_FOLDER', path / 'tasks')
+    monkeypatch.setattr(pproject.git, 'SNAPSHOTS', {})
+    monkeypatch.setattr(repodata, 'fetch_repodata',
+                        lambda url, cache_folder=None: None)
+    monkeypatch.chdir(path)
+    prj = pproject.Project(company='ouroboros',
+                           namespace='tools',
+                           project='pproject',
+                           pythonversion='3.6',
+                           path=path)
+    prj.update_informations()
+    return prj, calls
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('module', MODULES)
+def test_benchmark_import_time(results, module):
+    # the namespace-packages are imported before (see test_imports)
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                          f'import ouroboros.tools; import {module}'],
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE,
+                         cwd=str(CURRENT_PATH),
+                         check=True)
+    import_time = 0
+    for line in res.stderr.decode('utf-8').splitlines():
+        if line.rstrip().endswith(f'| {module}'):
+            import_time = int(line.split('|')[1]) / 1e6
+    check_baseline(results, f'import:{module}', import_time)
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('args', [['update'], ['info', 'general'],
+                                  ['create', 'testing', '-n', 'benchmark']])
+def test_benchmark_build_arguments(results, args):
+    duration = measure(lambda: pproject.build_arguments(args))
+    check_baseline(results, f'build_arguments:{args[0]}', duration)
+
+
+# -----------------------------------------------------------------------------
+def test_benchmark_meta_yaml(results):
+    path = CURRENT_PATH / 'conda-build/meta.yaml'
+    duration = measure(lambda: conda.MetaYaml(path=path))
+    check_baseline(results, 'meta_yaml', duration)
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('use_snapshot', [True, False])
+def test_benchmark_load_configs(results, tmpdir, use_snapshot):
+    snapshot_path = Path(tmpdir) / 'config.pickle'
+    duration = measure(lambda: utils.load_configs(snapshot_path=snapshot_path,
+                                                  use_snapshot=use_snapshot))
+    check_baseline(results, f'load_configs:snapshot={use_snapshot}', duration)
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('command, kwargs', [
+    ('update', {}),
+    ('build', {}),
+    ('release', {'dst': 'localhost'}),
+    ('release', {'dst': 'user@remotehost'}),
+    ('info', {}),
+    ])
+def test_benchmark_project(results, stubbed, capsys, command, kwargs):
+    prj, calls = stubbed
+
+    def run_command():
+        del calls[:]
+        prj.tasks = tasks.TaskGraph(state_path=tasks.state_path(prj.path))
+        getattr(prj, command)(**kwargs)
+
+    duration = measure(run_command, repeat=3)
+    capsys.readouterr()
+    name = '-'.join([command] + [str(_) for _ in kwargs.values()])
+    check_baseline(results, f'project:{name}', duration, calls=len(calls))
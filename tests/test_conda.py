@@ -10,6 +10,25 @@ from tests.test_config import correct_myaml_content
 CURRENT_PATH = Path.cwd()
 
 
+# -----------------------------------------------------------------------------
+def stub_run(monkeypatch, respond=lambda command: ''):
+    """
+    Replaces utils.run and utils.run_streaming by a stub collecting the
+    executed commands (joined to strings). The output of each command is
+    returned by respond.
+    """
+    calls = []
+
+    def run(argv, cwd=None, **kwargs):
+        command = ' '.join(str(_) for _ in argv)
+        calls.append(command)
+        return conda.utils.ExitStatus(argv=argv, returncode=0,
+                                      output=respond(command))
+    monkeypatch.setattr(conda.utils, 'run', run)
+    monkeypatch.setattr(conda.utils, 'run_streaming', run)
+    return calls
+
+
 # =============================================================================
 class TestMetaYaml:
     # -------------------------------------------------------------------------
@@ -44,3 +63,396 @@ def test_condaenvironment_ok():
     condaenv.create(dependencies=['python=3.6', 'attrs=17.3'])
     condaenv.recreate(dependencies=['python=3.6', 'attrs=17.3'])
     condaenv.remove()
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('dependency, result', [
+    ('python 3.6.3', ('python', '=3.6.3')),
+    ('attrs >=17.4*', ('attrs', '>=17.4')),
+    ('ipython', ('ipython', '')),
+    ('numpy 1.11 py36_0', ('numpy', '=1.11')),
+    ('python=3.6', ('python', '=3.6')),
+    ('six ~=1.11', ('six', '~=1.11')),
+    ('six ==1.11', ('six', '==1.11')),
+    ('six >1.10,<2', ('six', '>1.10,<2')),
+    ])
+def test_parse_dependency_ok(dependency, result):
+    assert conda.parse_dependency(dependency) == result
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('version, spec, result', [
+    ('3.6.3', '=3.6', True),
+    ('3.6.10', '=3.6.1', False),
+    ('17.4.0', '>=17.4', True),
+    ('1.10', '>=1.9', True),
+    ('1.10', '<1.9', False),
+    ('2.1', '>=1.0,<2.0', False),
+    ('2.1', '<2.0|2.1', True),
+    ('1.5.2', '1.5*', True),
+    ('1.5.2', '', True),
+    ('1.12', '~=1.11', True),
+    ('2.0', '~=1.11', False),
+    ('1.10', '~=1.11', False),
+    ])
+def test_version_matches_ok(version, spec, result):
+    assert conda.version_matches(version, spec) == result
+
+
+# -----------------------------------------------------------------------------
+def test_condaenvironment_update_incremental_ok(tmpdir, monkeypatch):
+    calls = stub_run(monkeypatch)
+    monkeypatch.setattr(conda, 'environment_cache', lambda: None)
+    monkeypatch.setattr(conda, 'check_available', lambda dependencies: None)
+    condaenv = conda.CondaEnvironment(name='pproject_testing_env')
+    condaenv.path = Path(tmpdir)
+    (condaenv.path / 'conda-meta').mkdir()
+    for record in ('python-3.6.3-0', 'attrs-17.4.0-py36_0', 'six-1.11.0-0'):
+        (condaenv.path / 'conda-meta' / f'{record}.json').touch()
+    condaenv.store_requested_dependencies(['python 3.6.3', 'attrs', 'six'])
+    condaenv.update(['python 3.6.3', 'attrs >=17.4*', 'pyyaml'])
+    assert calls == [
+        f'{conda.conda_bin()} remove -y -q -n pproject_testing_env six',
+        f'{conda.conda_bin()} install -y -q -n pproject_testing_env pyyaml']
+    assert condaenv.requested_dependencies() == ['python 3.6.3',
+                                                 'attrs >=17.4*', 'pyyaml']
+    (condaenv.path / 'conda-meta/six-1.11.0-0.json').unlink()
+    (condaenv.path / 'conda-meta/pyyaml-3.12-py36_1.json').touch()
+    del calls[:]
+    condaenv.update(['python 3.6.3', 'attrs >=17.4*', 'pyyaml', 'six'])
+    condaenv.update(['python 3.6.3', 'attrs >=17.4*', 'pyyaml', 'six'],
+                    rebuild=True)
+    assert calls[0] == (f'{conda.conda_bin()} install -y -q -n '
+                        'pproject_testing_env six')
+    assert 'env remove' in calls[1]
+    assert 'create' in calls[2]
+
+
+# -----------------------------------------------------------------------------
+def test_environment_cache_ok(tmpdir, monkeypatch):
+    def clone(command):
+        path = Path(command.split(' -p ')[1].split()[0])
+        (path / 'conda-meta').mkdir(parents=True)
+        (path / 'conda-meta' / 'python-3.6.3-0.json').write_text('x' * 2048)
+        return ''
+    stub_run(monkeypatch, clone)
+    cache = conda.EnvironmentCache(folder=Path(tmpdir) / 'cache',
+                                   size_limit=0.003)
+    env = conda.CondaEnvironment(name='pproject_testing_env')
+    key = conda.dependency_hash
+    assert (key(['python 3.6.3', 'attrs >=17.4*'])
+            == key(['attrs>=17.4', 'python=3.6.3']))
+    assert key(['python 3.6.3']) != key(['python 3.6.4'])
+    assert cache.get(key(['python 3.6.3'])) is None
+    cache.add(env, key(['python 3.6.3']), ['python 3.6.3'])
+    assert cache.get(key(['python 3.6.3'])) == cache.folder / key(
+        ['python 3.6.3'])
+    cache.add(env, key(['python 3.6.4']), ['python 3.6.4'])
+    assert cache.get(key(['python 3.6.3'])) is None
+    assert cache.get(key(['python 3.6.4']))
+
+
+# -----------------------------------------------------------------------------
+def test_create_internal_package_ok(tmpdir, monkeypatch, capsys):
+    from ouroboros.tools.pproject import repodata
+    calls = stub_run(monkeypatch)
+    monkeypatch.setattr(conda, 'environment_cache', lambda: None)
+    monkeypatch.setattr(repodata, 'INDEX', {'index': repodata.RepodataIndex(
+        packages={'python': {'3.6.3': ['0']}})})
+    env = conda.CondaEnvironment(name='pproject_testing_env')
+    env.path = Path(tmpdir) / 'env'
+    (env.path / 'conda-meta').mkdir(parents=True)
+    env.create(['python=3.6.3', 'ouroboros-internal=1.0.0'])
+    assert calls[0].endswith(' python=3.6.3 ouroboros-internal=1.0.0')
+    assert 'ouroboros-internal=1.0.0' in capsys.readouterr()[0]
+
+
+# -----------------------------------------------------------------------------
+def test_environment_cache_lockfile_only_ok(tmpdir, monkeypatch):
+    def respond(command):
+        if ' -p ' in command:
+            path = Path(command.split(' -p ')[1].split()[0])
+            (path / 'conda-meta').mkdir(parents=True)
+        return '@EXPLICIT'
+    calls = stub_run(monkeypatch, respond)
+    cache = conda.EnvironmentCache(folder=Path(tmpdir) / 'cache',
+                                   size_limit=100)
+    monkeypatch.setattr(conda, 'environment_cache', lambda: cache)
+    monkeypatch.setattr(conda, 'check_available', lambda dependencies: None)
+    env = conda.CondaEnvironment(name='pproject_testing_env')
+    env.path = Path(tmpdir) / 'env'
+    (env.path / 'conda-meta').mkdir(parents=True)
+    env.create(['python 3.6.3'])
+    assert len(calls) == 1 and not cache.entries()
+    lockfile = conda.Lockfile(path=Path(tmpdir) / conda.LOCKFILE_NAME)
+    lockfile.write(env, ['python 3.6.3'])
+    del calls[:]
+    env.create(['python 3.6.3'], lockfile=lockfile)
+    assert '--clone' in calls[-1]
+    assert [_['path'].name for _ in cache.entries()] == [
+        lockfile.content_hash()]
+    del calls[:]
+    env.create(['python 3.6.3'], lockfile=lockfile)
+    assert len(calls) == 1 and '--clone' in calls[0]
+
+
+# -----------------------------------------------------------------------------
+def test_lockfile_ok(tmpdir, monkeypatch):
+    calls = stub_run(
+        monkeypatch,
+        lambda command: ('@EXPLICIT\n'
+                         'https://repo/linux-64/python-3.6.3-0.tar.bz2#abc'))
+    monkeypatch.setattr(conda, 'environment_cache', lambda: None)
+    monkeypatch.setattr(conda, 'check_available', lambda dependencies: None)
+    lockfile = conda.Lockfile(path=Path(tmpdir) / conda.LOCKFILE_NAME)
+    env = conda.CondaEnvironment(name='pproject_testing_env')
+    env.path = Path(tmpdir) / 'env'
+    assert lockfile.dependency_hash() is None
+    assert not lockfile.is_current(['python 3.6.3'])
+    lockfile.update(env, ['python 3.6.3'])
+    assert 'list --explicit --md5 -n pproject_testing_env' in calls[-1]
+    assert lockfile.is_current(['python=3.6.3'])
+    assert '@EXPLICIT' in lockfile.path.read_text()
+    del calls[:]
+    lockfile.update(env, ['python=3.6.3'])
+    assert not calls
+    (env.path / 'conda-meta').mkdir(parents=True)
+    env.create(['python 3.6.3'], lockfile=lockfile)
+    assert f'--file {lockfile.path}' in calls[0]
+    del calls[:]
+    env.create(['python 3.6.4'], lockfile=lockfile)
+    assert calls[0].endswith(' python=3.6.4')
+
+
+# -----------------------------------------------------------------------------
+def test_current_lockfile_ok(tmpdir, monkeypatch):
+    from types import SimpleNamespace
+    stub_run(monkeypatch, lambda command: '@EXPLICIT')
+    meta_yaml = SimpleNamespace(path=Path(tmpdir) / 'meta.yaml',
+                                dependencies=['python 3.6.3'])
+    assert conda.current_lockfile(meta_yaml) is None
+    lockfile = conda.Lockfile(path=Path(tmpdir) / conda.LOCKFILE_NAME)
+    lockfile.write(conda.CondaEnvironment(name='pproject_testing_env'),
+                   ['python 3.6.3'])
+    assert conda.current_lockfile(meta_yaml) == lockfile
+    meta_yaml.dependencies.append('attrs')
+    assert conda.current_lockfile(meta_yaml) is None
+
+
+# -----------------------------------------------------------------------------
+def test_create_remote_lockfile_ok(tmpdir, monkeypatch):
+    from ouroboros.tools.pproject import remote
+    commands = []
+
+    class Host:
+        async def put(self, localpath, remotepath):
+            commands.append(f'put {remotepath}')
+
+        async def run(self, command):
+            commands.append(command)
+            return remote.RemoteStatus(dst='user@host', command=command,
+                                       returncode=1, stderr='failed')
+
+    async def release_log(self, host, action, projectpath):
+        pass
+    monkeypatch.setattr(conda.CondaEnvironment, 'release_log', release_log)
+    lockfile = conda.Lockfile(path=Path(tmpdir) / conda.LOCKFILE_NAME)
+    env = conda.CondaEnvironment(name='pproject_testing_env')
+    with pytest.raises(SystemExit):
+        remote.run(env.create_remote(Host(), '3.6', 'pproject', '1.0.0',
+                                     Path(tmpdir), lockfile=lockfile))
+    remote_lock = f'/tmp/pproject_testing_env_{conda.LOCKFILE_NAME}'
+    assert commands[0] == f'put {remote_lock}'
+    assert commands[-1] == f'rm -f {remote_lock}'
+
+
+# -----------------------------------------------------------------------------
+def test_build_package_ok(tmpdir, monkeypatch):
+    artifact = '/var/local/conda/conda-bld/linux-64/pkg-1.0.0-py36_0.tar.bz2'
+    output = {'build': (f'TEST END: {artifact}\n'
+                        '# If you want to upload package(s) to anaconda.org '
+                        'later, type:\n\n'
+                        f'anaconda upload {artifact}\n'),
+              'output': f'{artifact}\n'}
+
+    calls = stub_run(
+        monkeypatch,
+        lambda command: output['output' if '--output' in command else 'build'])
+    path = Path(tmpdir)
+    assert conda.build_package(path, '3.6') == [Path(artifact)]
+    assert len(calls) == 1
+    del calls[:]
+    assert conda.build_package(path, '3.6', simulate=True) == [Path(artifact)]
+    assert '--output' in calls[0]
+    output['build'] = ''
+    del calls[:]
+    assert conda.build_package(path, '3.6') == [Path(artifact)]
+    assert len(calls) == 2
+
+
+# -----------------------------------------------------------------------------
+def test_build_cache_ok(tmpdir):
+    path = Path(tmpdir)
+    artifact = path / 'conda-bld/pkg-1.0.0-py36_0.tar.bz2'
+    artifact.parent.mkdir()
+    artifact.write_bytes(b'x' * 2048)
+    cache = conda.BuildCache(folder=path / 'cache', size_limit=0.003,
+                             max_age=30)
+    assert cache.get('first') is None
+    cache.add('first', [artifact])
+    artifact.unlink()
+    assert cache.get('first') == [artifact]
+    assert artifact.exists()
+    artifact.write_bytes(b'y' * 2048)
+    assert cache.get('first') == [artifact]
+    assert artifact.read_bytes() == b'x' * 2048
+    cache.add('second', [artifact])
+    assert cache.get('first') is None
+    assert cache.get('second') == [artifact]
+    cache.max_age = 0
+    cache.evict()
+    assert cache.get('second') is None
+
+
+# -----------------------------------------------------------------------------
+def test_build_cache_key_retag_ok():
+    meta_yaml_path = CURRENT_PATH / 'conda-build/meta.yaml'
+
+    def key(tag, commit):
+        return conda.build_cache_key(tree_hash='abc',
+                                     meta_yaml_path=meta_yaml_path,
+                                     pythonversion='3.6', tag=tag,
+                                     commit=commit)
+    assert key('1.0.0', 'c1') == key('1.0.0', 'c1')
+    assert key('1.0.1', 'c1') != key('1.0.0', 'c1')
+    assert key('1.0.0', 'c2') != key('1.0.0', 'c1')
+
+
+# -----------------------------------------------------------------------------
+def test_build_matrix_ok(tmpdir, monkeypatch):
+    def build(command):
+        pythonversion = command.split('--python=')[1].split()[0]
+        croot = command.split('--croot ')[1].split()[0]
+        return (f'TEST END: {croot}/linux-64/'
+                f'pkg-1.0.0-py{pythonversion}_0.tar.bz2')
+    stub_run(monkeypatch, build)
+    results = conda.build_matrix(Path(tmpdir), ['3.6', '3.7'], max_workers=2)
+    croot = Path(conda.CONFIG['conda_folder'])
+    assert results == {
+        '3.6': [croot / 'conda-bld-py3.6/linux-64/pkg-1.0.0-py3.6_0.tar.bz2'],
+        '3.7': [croot / 'conda-bld-py3.7/linux-64/pkg-1.0.0-py3.7_0.tar.bz2']}
+
+
+# -----------------------------------------------------------------------------
+def test_condaenvironment_fingerprint_ok(tmpdir, monkeypatch):
+    calls = stub_run(monkeypatch)
+    condaenv = conda.CondaEnvironment(name='pproject_testing_env')
+    condaenv.path = Path(tmpdir)
+    (condaenv.path / 'conda-meta').mkdir()
+    lockfile = conda.Lockfile(path=Path(tmpdir) / conda.LOCKFILE_NAME)
+    assert not condaenv.is_current(['python 3.6.3'])
+    condaenv.store_requested_dependencies(['python 3.6.3', 'attrs'])
+    assert condaenv.is_current(['attrs', 'python=3.6.3'])
+    assert condaenv.is_current(['attrs', 'python 3.6.3'], lockfile)
+    condaenv.update(['attrs', 'python 3.6.3'])
+    assert not calls
+    lockfile.path.write_text('@EXPLICIT')
+    assert not condaenv.is_current(['attrs', 'python 3.6.3'], lockfile)
+    condaenv.store_requested_dependencies(['python 3.6.3', 'attrs'], lockfile)
+    assert condaenv.is_current(['attrs', 'python 3.6.3'], lockfile)
+    assert not condaenv.is_current(['attrs', 'python 3.6.4'], lockfile)
+    monkeypatch.setitem(conda.CONFIG.load(), 'conda_channels', ['local'])
+    assert not condaenv.is_current(['attrs', 'python 3.6.3'], lockfile)
+
+
+# -----------------------------------------------------------------------------
+def test_read_inventory_ok(tmpdir):
+    path = Path(tmpdir) / 'inventory'
+    path.write_text('# workers\nuser@host1\n\n  user@host2  # gpu\n')
+    assert conda.read_inventory(path) == ['user@host1', 'user@host2']
+
+
+# -----------------------------------------------------------------------------
+def test_rollout_ok(capsys):
+    import threading
+    import time
+    lock = threading.Lock()
+    running = []
+    concurrency = []
+
+    def deploy(host):
+        with lock:
+            running.append(host)
+            concurrency.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(host)
+        if host.startswith('bad'):
+            raise SystemExit(1)
+
+    hosts = [f'user@host{_}' for _ in range(8)]
+    start = time.perf_counter()
+    results = conda.rollout(hosts, deploy, max_workers=8,
+                            max_failure_rate=0)
+    assert time.perf_counter() - start < 0.05 * 6
+    assert [_.status for _ in results] == ['ok'] * 8
+    assert [_.host for _ in results] == hosts
+    del concurrency[:]
+    results = conda.rollout(hosts, deploy, max_workers=8, max_unavailable=2,
+                            max_failure_rate=0)
+    assert max(concurrency) == 2
+    assert all(_.status == 'ok' for _ in results)
+    hosts = ['bad@host0', 'bad@host1'] + hosts
+    results = conda.rollout(hosts, deploy, max_workers=2,
+                            max_failure_rate=0.05)
+    assert [_.status for _ in results[:2]] == ['failed', 'failed']
+    assert results[0].error == 'aborted'
+    assert {_.status for _ in results[2:]} == {'skipped'}
+    results = conda.rollout(hosts, deploy, max_workers=4, max_unavailable=2,
+                            max_failure_rate=1)
+    assert [_.status for _ in results[:2]] == ['failed', 'failed']
+    assert {_.status for _ in results[2:]} == {'skipped'}
+    table = conda.rollout_table(results)
+    assert len(table) == len(hosts) + 1
+    assert 'bad@host0' in table[1] and 'failed' in table[1]
+
+
+# -----------------------------------------------------------------------------
+def test_publish_packages_ok(monkeypatch, capsys):
+    from ouroboros.tools.pproject import remote
+    from ouroboros.tools.pproject import repodata
+    commands = []
+
+    class Host:
+        def __init__(self, dst):
+            self.dst = dst
+
+        async def upload(self, localpath, remotepath):
+            if 'broken' in localpath:
+                raise OSError('upload failed')
+            return 'skipped' if 'old' in localpath else 'uploaded'
+
+        async def run(self, command, stdin=None):
+            commands.append(stdin)
+            return remote.RemoteStatus(dst=self.dst, command=command,
+                                       returncode=0)
+
+    monkeypatch.setattr(remote, 'RemoteHost', Host)
+    monkeypatch.setattr(repodata, 'package_record',
+                        lambda path: dict(name=Path(path).name))
+    monkeypatch.setattr(repodata, 'invalidate', lambda: None)
+    monkeypatch.setattr(conda, 'conda_repo_settings', lambda: dict(
+        user='user', host='host', packages_path='/repo',
+        conda_exe='/conda/bin/conda'))
+    results = conda.publish_packages_on_reposerver(
+        ['a/new.tar.bz2', 'b/old.tar.bz2', 'c/broken.tar.bz2',
+         'a/new.tar.bz2'])
+    assert [_.status for _ in results] == ['uploaded', 'skipped', 'failed']
+    assert results[2].error == 'upload failed' and not results[2].ok
+    assert len(commands) == 1
+    assert 'new.tar.bz2' in commands[0] and 'old.tar.bz2' in commands[0]
+    assert 'broken.tar.bz2' not in commands[0]
+    assert 'broken.tar.bz2' in capsys.readouterr()[0]
+    result = conda.publish_package_on_reposerver('c/broken.tar.bz2')
+    assert result.status == 'failed'
+    assert len(commands) == 1
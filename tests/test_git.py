@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 import random
@@ -45,6 +46,17 @@ class TestGitAndVCS:
     def test_check_remote_vcs_ok(self):
         assert git.check_remote_vcs()
 
+    # -------------------------------------------------------------------------
+    def test_require_remote_vcs_fails(self, monkeypatch, capsys):
+        monkeypatch.setattr(git.utils, 'probe_url',
+                            lambda url, timeout: 401)
+        with pytest.raises(SystemExit):
+            git.require_remote_vcs()
+        assert 'Http-code: 401' in capsys.readouterr()[0]
+        monkeypatch.setattr(git.utils, 'probe_url',
+                            lambda url, timeout: 200)
+        git.require_remote_vcs()
+
     # -------------------------------------------------------------------------
     def test_create_on_vcs_ok(self, tmpdir):
         curr_git = git.GitRepo(path=Path(tmpdir))
@@ -82,3 +94,126 @@ def test_gitrepo_initialize_ok(cleanup, tmpdir):
     assert curr_git.status()
     (Path(tmpdir) / 'testfile.txt').touch()
     assert not curr_git.status()
+
+
+# -----------------------------------------------------------------------------
+def test_gitrepo_snapshot_ok(tmpdir, monkeypatch):
+    monkeypatch.setattr(git, 'SNAPSHOTS', {})
+    path = Path(tmpdir)
+    curr_git = git.GitRepo(path=path)
+    curr_git.initialize()
+    git.utils.run(['git', 'config', 'user.name', 'Dummy User'], cwd=path)
+    git.utils.run(['git', 'config', 'user.email', 'dummy@user.com'], cwd=path)
+    snapshot = curr_git.snapshot()
+    assert snapshot.head is None
+    assert snapshot.tag == '0.0.0'
+    assert not snapshot.dirty
+    assert snapshot.username == 'Dummy User'
+    assert snapshot.email == 'dummy@user.com'
+    (path / 'testfile.txt').touch()
+    assert git.GitRepo(path=path).snapshot() is snapshot
+    assert curr_git.snapshot(refresh=True).dirty
+    curr_git.add_all()
+    git.utils.run(['git', 'commit', '-q', '-m', 'first'], cwd=path)
+    curr_git.create_tag(tag='1.0.0', message='bla')
+    snapshot = curr_git.snapshot()
+    assert snapshot.head
+    assert snapshot.tag == '1.0.0'
+    assert snapshot.branch == curr_git.get_branch()
+    assert not snapshot.dirty
+
+
+# -----------------------------------------------------------------------------
+def test_gitdir_ok(tmpdir, monkeypatch):
+    monkeypatch.setattr(git, 'SNAPSHOTS', {})
+    path = Path(tmpdir)
+
+    def run(*args):
+        return git.utils.run(['git'] + list(args), cwd=path).output
+    run('init', '-q')
+    run('config', 'user.name', 'Dummy User')
+    run('config', 'user.email', 'dummy@user.com')
+    git_dir = git.find_git_dir(path / 'subfolder')
+    assert git_dir.path == path / '.git'
+    branch = git_dir.head()[0]
+    assert git_dir.head() == (branch, None)
+    (path / 'testfile.txt').touch()
+    run('add', '.')
+    run('commit', '-q', '-m', 'first')
+    head = run('rev-parse', 'HEAD')
+    assert git_dir.head() == (branch, head)
+    assert git_dir.exact_tag(head) == '0.0.0'
+    run('tag', '-a', '1.0.0', '-m', 'bla')
+    assert git_dir.exact_tag(head) == '1.0.0'
+    run('pack-refs', '--all')
+    assert git_dir.exact_tag(head) == '1.0.0'
+    run('commit', '-q', '--allow-empty', '-m', 'second')
+    head = run('rev-parse', 'HEAD')
+    assert git_dir.exact_tag(head) is None
+    curr_git = git.GitRepo(path=path)
+    assert curr_git.get_tag() == '1.0.0'
+    run('tag', '1.1.0')
+    assert git_dir.exact_tag(head) == '1.1.0'
+    run('checkout', '-q', head)
+    assert git_dir.head() == ('HEAD', head)
+    assert curr_git.get_branch() == 'HEAD'
+    assert curr_git.get_username() == 'Dummy User'
+    snapshot = curr_git.snapshot()
+    assert (snapshot.tag, snapshot.dirty) == ('1.1.0', None)
+    assert curr_git.snapshot(refresh=True).dirty is False
+    (path / '.git/HEAD').unlink()
+    (path / '.git/HEAD').write_text('ref: refs/remotes/origin/master\n')
+    assert git_dir.head() is None
+    (path / '.git').rename(path / 'repo.git')
+    (path / '.git').write_text('gitdir: repo.git\n')
+    assert git.find_git_dir(path) is None
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('value, result', [
+    (' Dummy User ', 'Dummy User'),
+    ('"Dummy  User " # comment', 'Dummy  User '),
+    ('Dummy ; comment', 'Dummy'),
+    ('"a \\"quoted\\" \\\\ value"', 'a "quoted" \\ value'),
+    ('"unterminated', None),
+    ])
+def test_parse_config_value_ok(value, result):
+    assert git.parse_config_value(value) == result
+
+
+# -----------------------------------------------------------------------------
+def test_read_git_config_ok(tmpdir, monkeypatch):
+    path = Path(tmpdir)
+    monkeypatch.setenv('HOME', str(path))
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(path / 'xdg'))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    (path / '.gitconfig').write_text('[User]\n'
+                                     '    name = Global User\n'
+                                     '    email = global@user.com\n'
+                                     '[remote "Origin"]\n'
+                                     '    url = git@host:repo.git\n')
+    (path / 'repo/.git').mkdir(parents=True)
+    (path / 'repo/.git/HEAD').write_text('ref: refs/heads/master\n')
+    (path / 'repo/.git/config').write_text('[user]\n'
+                                           '\tname = "Local User"\n')
+    git_dir = git.find_git_dir(path / 'repo')
+    config = git.read_git_config(git_dir)
+    assert config['user.name'] == 'Local User'
+    assert config['user.email'] == 'global@user.com'
+    assert config['remote.Origin.url'] == 'git@host:repo.git'
+    assert git.read_git_config()['user.name'] == 'Global User'
+    (path / 'repo/.git/config').write_text('[include]\n'
+                                           '\tpath = other.config\n')
+    assert git.read_git_config(git_dir) is None
+
+
+# -----------------------------------------------------------------------------
+def test_get_cached_gitlab_groups_offline_ok(tmpdir):
+    cache_path = Path(tmpdir) / 'gitlab_groups.json'
+    assert git.get_cached_gitlab_groups(offline=True,
+                                        cache_path=cache_path) == {}
+    cache_path.write_text(json.dumps(dict(api=git.vcs_settings()['api'],
+                                          timestamp=0,
+                                          groups={'ouroboros-testing': 1})))
+    assert git.get_cached_gitlab_groups(
+        offline=True, cache_path=cache_path) == {'ouroboros-testing': 1}
@@ -0,0 +1,60 @@
+"""
+
+
+Description
+-----------
+   This module contains the import-time tests for the pproject-package.
+
+"""
+
+
+import subprocess
+import sys
+
+import pytest
+
+
+IMPORT_TIME_BUDGET = 100000
+"""int: Maximal cumulative import-time of a module in microseconds."""
+
+# pkg_resources isn't checked, the namespace-packages (ouroboros and
+# ouroboros.tools) are declared with it like in all other ouroboros-packages
+HEAVY_MODULES = ('cookiecutter', 'jinja2', 'marshmallow', 'paramiko',
+                 'requests', 'ruamel', 'toastedmarshmallow', 'yaml')
+
+
+# -----------------------------------------------------------------------------
+def import_module(module):
+    """
+    Imports the passed module in a new python-process. The namespace-packages
+    are imported before, so their import-time isn't part of the result.
+
+    Returns
+    -------
+    tuple
+        The cumulative import-time of the module in microseconds and the
+        names of the heavy modules imported with it.
+    """
+    code = (f'import sys; import ouroboros.tools; import {module}; '
+            f'print(",".join(m for m in {HEAVY_MODULES!r} '
+            'if m in sys.modules))')
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.PIPE,
+                         check=True)
+    import_time = 0
+    for line in res.stderr.decode('utf-8').splitlines():
+        if line.rstrip().endswith(f'| {module}'):
+            import_time = int(line.split('|')[1])
+    heavy_modules = [_ for _ in res.stdout.decode('utf-8').strip().split(',')
+                     if _]
+    return import_time, heavy_modules
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('module', ['ouroboros.tools.pproject.pproject',
+                                    'ouroboros.tools.pproject.utils'])
+def test_import_time_ok(module):
+    import_time, heavy_modules = import_module(module)
+    assert not heavy_modules
+    assert import_time < IMPORT_TIME_BUDGET
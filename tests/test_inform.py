@@ -32,6 +32,13 @@ def test_inform_error(capsys):
     assert captured[0] == b' \x1b[1;91mE\x1b[0m\x1b[0;94m    TEST_INFORM_ERROR \x1b[0mbla\n'.decode('utf8')
 
 
+# -----------------------------------------------------------------------------
+def test_inform_progress(capsys):
+    inform.progress('bla', tool='conda')
+    captured = capsys.readouterr()
+    assert captured[0] == b' \x1b[0;94m\xe2\x96\xb8\x1b[0m\x1b[0;94m                CONDA \x1b[0mbla\n'.decode('utf8')
+
+
 # -----------------------------------------------------------------------------
 def test_inform_critical(capsys):
     with pytest.raises(SystemExit):
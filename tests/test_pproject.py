@@ -184,3 +184,27 @@ class TestRun:
                 options=pproject.build_arguments(args),
                 path=Path(tmpdir))
             os.system(f'rm -rf /var/local/conda/envs/testing{nbr}')
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('args', [['update'], ['test'], ['info', 'general'],
+                                  ['build', '--python', '3.6,3.7'],
+                                  ['release', '-d', 'user@host1,user@host2',
+                                   '--max-unavailable', '1'],
+                                  ['publish', 'a.tar.bz2', 'b.tar.bz2']])
+def test_build_arguments_offline_ok(monkeypatch, args):
+    def fail():
+        raise AssertionError('gitlab-api requested')
+    monkeypatch.setattr(pproject.git, 'get_gitlab_groups', fail)
+    assert pproject.build_arguments(args).tool == args[0]
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.parametrize('value, result', [
+    ('3.6,3.7', ['3.6', '3.7']),
+    ('3.6, 3.7', ['3.6', '3.7']),
+    (' 3.6 ,,3.7, ', ['3.6', '3.7']),
+    ('user@host1, user@host2', ['user@host1', 'user@host2']),
+    ])
+def test_split_values_ok(value, result):
+    assert pproject.split_values(value) == result
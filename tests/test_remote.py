@@ -0,0 +1,256 @@
+import asyncio
+import os
+from pathlib import Path
+import subprocess
+import threading
+import time
+
+from ouroboros.tools.pproject import remote
+from ouroboros.tools.pproject import utils
+
+
+# =============================================================================
+class FakeChannel:
+    def __init__(self, command, log):
+        self.command = command
+        self.log = log
+        self.closed = threading.Event()
+
+    # -------------------------------------------------------------------------
+    def recv_exit_status(self):
+        if self.command == 'hang':
+            self.closed.wait(5)
+            return -1
+        self.log.append(('start', self.command))
+        time.sleep(0.05)
+        self.log.append(('end', self.command))
+        return 1 if self.command == 'fail' else 0
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        self.closed.set()
+
+
+# =============================================================================
+class FakeStream:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+
+    # -------------------------------------------------------------------------
+    def read(self):
+        self.channel.recv_exit_status()
+        return self.content
+
+
+# =============================================================================
+class FakeStdin:
+    def __init__(self):
+        self.content = b''
+        self.channel = self
+        self.closed = False
+
+    # -------------------------------------------------------------------------
+    def write(self, data):
+        self.content += data
+
+    # -------------------------------------------------------------------------
+    def shutdown_write(self):
+        self.closed = True
+
+
+# =============================================================================
+class FakeSFTP:
+    def __init__(self, uploads):
+        self.uploads = uploads
+
+    # -------------------------------------------------------------------------
+    def put(self, localpath, remotepath):
+        self.uploads.append((localpath, remotepath))
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        pass
+
+
+# =============================================================================
+class FakeSSH:
+    def __init__(self):
+        self.log = []
+        self.channels = []
+        self.uploads = []
+        self.stdin = FakeStdin()
+
+    # -------------------------------------------------------------------------
+    def exec_command(self, command):
+        channel = FakeChannel(command, self.log)
+        self.channels.append(channel)
+        return (self.stdin, FakeStream(channel, f' {command} out\n'.encode()),
+                FakeStream(FakeChannel('', []), b''))
+
+    # -------------------------------------------------------------------------
+    def open_sftp(self):
+        return FakeSFTP(self.uploads)
+
+
+# -----------------------------------------------------------------------------
+def concurrency(log):
+    running = maximum = 0
+    for event, _ in log:
+        running += 1 if event == 'start' else -1
+        maximum = max(maximum, running)
+    return maximum
+
+
+# -----------------------------------------------------------------------------
+def test_remotehost_ok(monkeypatch):
+    ssh = FakeSSH()
+    monkeypatch.setattr(utils, 'ssh_connection', lambda dst: ssh)
+    host = remote.RemoteHost(dst='user@host', max_channels=2)
+
+    async def commands():
+        return await asyncio.gather(*[host.run(_) for _ in
+                                      ('a', 'b', 'c', 'fail')])
+
+    statuses = remote.run(commands())
+    assert [_.stdout for _ in statuses] == ['a out', 'b out', 'c out',
+                                           'fail out']
+    assert [_.ok for _ in statuses] == [True, True, True, False]
+    assert concurrency(ssh.log) == 2
+    assert not ssh.stdin.closed
+    remote.run(host.run('cat', stdin='records'))
+    assert ssh.stdin.content == b'records' and ssh.stdin.closed
+    remote.run(remote.RemoteHost(dst='user@host').put('local', '/remote'))
+    assert ssh.uploads == [('local', '/remote')]
+
+
+# -----------------------------------------------------------------------------
+def test_remotehost_timeout_ok(monkeypatch):
+    ssh = FakeSSH()
+    monkeypatch.setattr(utils, 'ssh_connection', lambda dst: ssh)
+    host = remote.RemoteHost(dst='user@host')
+    status = remote.run(host.run('hang', timeout=0.05))
+    assert status.timed_out and not status.ok
+    assert status.returncode == -9
+    assert ssh.channels[0].closed.is_set()
+
+    async def cancelled():
+        task = asyncio.ensure_future(host.run('hang', timeout=0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+
+    assert remote.run(cancelled())
+    assert ssh.channels[1].closed.is_set()
+
+
+# =============================================================================
+class LocalFile:
+    def __init__(self, path, mode, written):
+        self.file = open(path, mode)
+        self.written = written
+
+    # -------------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # -------------------------------------------------------------------------
+    def __exit__(self, *args):
+        self.file.close()
+
+    # -------------------------------------------------------------------------
+    def seek(self, offset):
+        self.file.seek(offset)
+
+    # -------------------------------------------------------------------------
+    def set_pipelined(self, pipelined):
+        pass
+
+    # -------------------------------------------------------------------------
+    def write(self, data):
+        self.written.append(len(data))
+        self.file.write(data)
+
+
+# =============================================================================
+class LocalSFTP:
+    def __init__(self, written):
+        self.written = written
+
+    # -------------------------------------------------------------------------
+    def stat(self, path):
+        return os.stat(path)
+
+    # -------------------------------------------------------------------------
+    def open(self, path, mode):
+        return LocalFile(path, mode, self.written)
+
+    # -------------------------------------------------------------------------
+    def posix_rename(self, path, new_path):
+        os.replace(path, new_path)
+
+    # -------------------------------------------------------------------------
+    def remove(self, path):
+        os.remove(path)
+
+    # -------------------------------------------------------------------------
+    def close(self):
+        pass
+
+
+# =============================================================================
+class LocalSSH:
+    """
+    Stub for paramiko.SSHClient executing commands and sftp-operations on
+    localhost.
+    """
+    def __init__(self):
+        self.written = []
+
+    # -------------------------------------------------------------------------
+    def exec_command(self, command):
+        res = subprocess.run(command, shell=True, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+        channel = FakeChannel('', [])
+        channel.recv_exit_status = lambda: res.returncode
+        return (None, FakeStream(channel, res.stdout),
+                FakeStream(channel, res.stderr))
+
+    # -------------------------------------------------------------------------
+    def open_sftp(self):
+        return LocalSFTP(self.written)
+
+
+# -----------------------------------------------------------------------------
+def test_remotehost_upload_ok(monkeypatch, tmpdir):
+    ssh = LocalSSH()
+    monkeypatch.setattr(utils, 'ssh_connection', lambda dst: ssh)
+    monkeypatch.setattr(remote, 'UPLOAD_WINDOW_SIZE', None)
+    monkeypatch.setattr(remote, 'UPLOAD_CHUNK_SIZE', 1000)
+    host = remote.RemoteHost(dst='user@host')
+    localpath = Path(tmpdir) / 'pkg-1.0-py36_0.tar.bz2'
+    localpath.write_bytes(os.urandom(5000))
+    remotepath = Path(tmpdir) / 'repo.tar.bz2'
+    assert remote.run(host.upload(localpath, remotepath)) == 'uploaded'
+    assert remotepath.read_bytes() == localpath.read_bytes()
+    assert sum(ssh.written) == 5000
+    del ssh.written[:]
+    assert remote.run(host.upload(localpath, remotepath)) == 'skipped'
+    assert not ssh.written
+    partpath = Path(f'{remotepath}{remote.PARTIAL_SUFFIX}')
+    partpath.write_bytes(localpath.read_bytes()[:3000])
+    remotepath.unlink()
+    assert remote.run(host.upload(localpath, remotepath)) == 'resumed'
+    assert sum(ssh.written) == 2000
+    assert remotepath.read_bytes() == localpath.read_bytes()
+    assert not partpath.exists()
+    del ssh.written[:]
+    partpath.write_bytes(b'x' * 3000)
+    assert remote.run(host.upload(localpath, remotepath)) == 'skipped'
+    remotepath.write_bytes(b'other')
+    assert remote.run(host.upload(localpath, remotepath)) == 'uploaded'
+    assert sum(ssh.written) == 5000
+    assert remotepath.read_bytes() == localpath.read_bytes()
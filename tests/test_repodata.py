@@ -0,0 +1,183 @@
+import bz2
+import hashlib
+import io
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tarfile
+
+import pytest
+
+from ouroboros.tools.pproject import repodata
+
+
+# -----------------------------------------------------------------------------
+@pytest.fixture
+def channel(tmpdir, monkeypatch):
+    path = Path(tmpdir) / 'channel'
+    (path / 'linux-64').mkdir(parents=True)
+    (path / 'noarch').mkdir()
+    packages = {
+        'attrs-17.3.0-py36_0.tar.bz2': dict(name='attrs', version='17.3.0',
+                                            build='py36_0'),
+        'attrs-17.4.0-py27_0.tar.bz2': dict(name='attrs', version='17.4.0',
+                                            build='py27_0'),
+        'attrs-17.4.0-py36_0.tar.bz2': dict(name='attrs', version='17.4.0',
+                                            build='py36_0'),
+        'python-3.6.3-0.tar.bz2': dict(name='python', version='3.6.3',
+                                       build='0')}
+    (path / 'linux-64/repodata.json').write_text(
+        json.dumps(dict(packages=packages)))
+    (path / 'noarch/repodata.json').write_text(
+        json.dumps(dict(packages={'six-1.11.0-0.tar.bz2': dict(
+            name='six', version='1.11.0', build='0')})))
+    monkeypatch.setitem(repodata.CONFIG.load(), 'conda_channels',
+                        [path.as_uri()])
+    monkeypatch.setitem(repodata.CONFIG.load(), 'repodata_cache_ttl', 600)
+    monkeypatch.setattr(repodata, 'REPODATA', {})
+    monkeypatch.setattr(repodata, 'INDEX', {})
+    return path, Path(tmpdir) / 'cache'
+
+
+# -----------------------------------------------------------------------------
+def test_check_availability_ok(channel):
+    _, cache_folder = channel
+    availability = repodata.check_availability(
+        ['attrs >=17.4*', 'attrs >=18.1', 'python 3.6.3', 'six',
+         'unknown'], cache_folder=cache_folder)
+    assert availability == {'attrs >=17.4*': True,
+                            'attrs >=18.1': False,
+                            'python 3.6.3': True,
+                            'six': True,
+                            'unknown': False}
+
+
+# -----------------------------------------------------------------------------
+def test_check_availability_unknown_ok(channel, monkeypatch):
+    _, cache_folder = channel
+    monkeypatch.setattr(repodata, 'fetch_repodata',
+                        lambda url, cache_folder=None: None)
+    assert repodata.check_availability(
+        ['attrs >=17.4*', 'six'], cache_folder=cache_folder) == {
+            'attrs >=17.4*': None, 'six': None}
+
+
+# -----------------------------------------------------------------------------
+def test_compact_index_conda_format_ok():
+    assert repodata.compact_index({
+        'packages': {'attrs-17.4.0-py36_0.tar.bz2': dict(
+            name='attrs', version='17.4.0', build='py36_0')},
+        'packages.conda': {
+            'attrs-17.4.0-py36_0.conda': dict(name='attrs', version='17.4.0',
+                                              build='py36_0'),
+            'attrs-18.1.0-py36_0.conda': dict(name='attrs', version='18.1.0',
+                                              build='py36_0')}}) == {
+        'attrs': {'17.4.0': ['py36_0'], '18.1.0': ['py36_0']}}
+
+
+# -----------------------------------------------------------------------------
+def test_repodata_index_ok(channel):
+    _, cache_folder = channel
+    index = repodata.load_index(cache_folder=cache_folder)
+    assert index is repodata.load_index(cache_folder=cache_folder)
+    assert index.complete
+    assert index.versions('attrs') == ['17.3.0', '17.4.0']
+    assert index.builds('attrs', '17.4.0') == ['py27_0', 'py36_0']
+    assert index.find('attrs >=17.4*') == ['17.4.0']
+    assert index.latest('attrs') == '17.4.0'
+    assert index.latest('attrs >=18') is None
+    assert index.unavailable(['attrs', 'six 1.10*', 'unknown']) == [
+        'six 1.10*', 'unknown']
+    index.complete = False
+    assert index.unavailable(['unknown']) == []
+
+
+# -----------------------------------------------------------------------------
+def test_fetch_repodata_cached_ok(channel, monkeypatch):
+    path, cache_folder = channel
+    url = f'{path.as_uri()}/linux-64/repodata.json'
+    packages = repodata.fetch_repodata(url, cache_folder=cache_folder)
+    assert packages == {'attrs': {'17.3.0': ['py36_0'],
+                                  '17.4.0': ['py27_0', 'py36_0']},
+                        'python': {'3.6.3': ['0']}}
+    assert repodata.cache_path(url, cache_folder).exists()
+    (path / 'linux-64/repodata.json').unlink()
+    assert repodata.fetch_repodata(url, cache_folder=cache_folder) == packages
+    monkeypatch.setattr(repodata, 'REPODATA', {})
+    assert repodata.fetch_repodata(url, cache_folder=cache_folder) == packages
+    repodata.invalidate(cache_folder=cache_folder)
+    assert repodata.fetch_repodata(url, cache_folder=cache_folder) == packages
+    url = f'{path.as_uri()}/osx-64/repodata.json'
+    assert repodata.fetch_repodata(url, cache_folder=cache_folder) is None
+
+
+# -----------------------------------------------------------------------------
+def build_package(path, **index):
+    info = json.dumps(index).encode('utf-8')
+    with tarfile.open(str(path), 'w:bz2') as package:
+        entry = tarfile.TarInfo('info/index.json')
+        entry.size = len(info)
+        package.addfile(entry, io.BytesIO(info))
+    return path
+
+
+# -----------------------------------------------------------------------------
+def test_package_record_ok(tmpdir):
+    path = build_package(Path(tmpdir) / 'six-1.11.0-0.tar.bz2', name='six',
+                         version='1.11.0', build='0', subdir='noarch')
+    record = repodata.package_record(path)
+    assert record['name'] == 'six' and record['build'] == '0'
+    assert record['size'] == path.stat().st_size
+    assert record['md5'] == hashlib.md5(path.read_bytes()).hexdigest()
+    assert record['sha256'] == hashlib.sha256(path.read_bytes()).hexdigest()
+    (Path(tmpdir) / 'broken.tar.bz2').write_bytes(b'broken')
+    with pytest.raises(OSError):
+        repodata.package_record(Path(tmpdir) / 'broken.tar.bz2')
+
+
+# -----------------------------------------------------------------------------
+def test_index_command_ok(tmpdir):
+    folder = Path(tmpdir) / 'repo'
+    folder.mkdir()
+    bin_folder = Path(tmpdir) / 'bin'
+    bin_folder.mkdir()
+    (bin_folder / 'python').symlink_to(sys.executable)
+    conda_exe = bin_folder / 'conda'
+    conda_exe.write_text('#!/bin/sh\necho "{}" > "$2/repodata.json"\n')
+    conda_exe.chmod(0o755)
+    command = repodata.index_command(str(folder), str(conda_exe))
+
+    def index(records):
+        subprocess.run(command, shell=True, check=True,
+                       input=json.dumps(records).encode('utf-8'))
+
+    records = {'six-1.11.0-0.tar.bz2': dict(name='six', version='1.11.0')}
+    index(records)
+    assert json.loads((folder / 'repodata.json').read_text()) == {}
+    (folder / 'current_repodata.json').write_text(json.dumps(
+        dict(packages={'attrs-17.4.0-py36_0.tar.bz2': dict(name='attrs'),
+                       'six-1.10.0-0.tar.bz2': dict(name='six',
+                                                    version='1.10.0')})))
+    index(records)
+    content = json.loads((folder / 'repodata.json').read_text())
+    assert content == dict(packages=records)
+    assert json.loads(bz2.decompress(
+        (folder / 'repodata.json.bz2').read_bytes())) == content
+    current = json.loads((folder / 'current_repodata.json').read_text())
+    assert set(current['packages']) == {'attrs-17.4.0-py36_0.tar.bz2',
+                                        'six-1.11.0-0.tar.bz2'}
+    index({'six-1.9.0-0.tar.bz2': dict(name='six', version='1.9.0')})
+    current = json.loads((folder / 'current_repodata.json').read_text())
+    assert 'six-1.9.0-0.tar.bz2' not in current['packages']
+    assert 'six-1.9.0-0.tar.bz2' in json.loads(
+        (folder / 'repodata.json').read_text())['packages']
+    assert not (folder / 'repodata_from_packages.json').exists()
+    assert (folder / repodata.INDEX_LOCK_NAME).exists()
+    # more records than fit into one commandline-argument (128 KiB)
+    records = {f'pkg{_}-1.0.0-0.tar.bz2': dict(name=f'pkg{_}',
+                                               version='1.0.0', md5='0' * 32)
+               for _ in range(3000)}
+    index(records)
+    assert set(records) <= set(json.loads(
+        (folder / 'repodata.json').read_text())['packages'])
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from ouroboros.tools.pproject import tasks
+
+
+# -----------------------------------------------------------------------------
+def test_taskgraph_ok(tmpdir):
+    calls = []
+    inputs = dict(meta_yaml='abc')
+    state_path = tasks.state_path(Path(tmpdir), state_folder=Path(tmpdir))
+    graph = tasks.TaskGraph(state_path=state_path)
+    assert graph.run('build', lambda: calls.append('build') or 'pkg') == 'pkg'
+    assert graph.run('build', lambda: calls.append('build')) == 'pkg'
+    graph.run('update', lambda: calls.append('update'), inputs=lambda: inputs)
+    assert calls == ['build', 'update']
+    graph = tasks.TaskGraph(state_path=state_path)
+    graph.run('update', lambda: calls.append('update'), inputs=lambda: inputs)
+    graph.run('test', lambda: calls.append('test'), inputs=lambda: None)
+    assert calls == ['build', 'update', 'test']
+    graph = tasks.TaskGraph(state_path=state_path)
+    graph.run('update', lambda: calls.append('update'), inputs=lambda: inputs,
+              requested=True)
+    inputs['meta_yaml'] = 'def'
+    graph = tasks.TaskGraph(state_path=state_path)
+    graph.run('update', lambda: calls.append('update'), inputs=lambda: inputs)
+    graph.run('test', lambda: calls.append('test'), inputs=lambda: None)
+    assert calls == ['build', 'update', 'test', 'update', 'update', 'test']
@@ -8,10 +8,13 @@ Description
 """
 
 
+import hashlib
 import os
+import sys
 from subprocess import CalledProcessError
 from pathlib import Path
 import pytest
+import yaml
 from ouroboros.tools.pproject import utils
 from tests.test_config import (ssh_ok_connection,
                                ssh_fail_connections,
@@ -36,6 +39,16 @@ class TestMD5:
         os.chdir(CURRENT_PATH)
         assert utils.md5(fname) == '0f1c139fc35d4154f0bbafacd3de2189'
 
+    # -------------------------------------------------------------------------
+    def test_md5_size_ok(self, monkeypatch):
+        os.chdir(CURRENT_PATH)
+        monkeypatch.setattr(utils, 'MD5_CHUNK_SIZE', 3)
+        fname = Path('tests/md5_testfile.txt')
+        content = fname.read_bytes()
+        assert utils.md5(fname) == '0f1c139fc35d4154f0bbafacd3de2189'
+        assert utils.md5(fname, size=5) == hashlib.md5(content[:5]).hexdigest()
+        assert utils.md5(fname, size=0) == hashlib.md5(b'').hexdigest()
+
     # -------------------------------------------------------------------------
     @pytest.mark.parametrize('fname',
                              [1,
@@ -70,6 +83,95 @@ class TestRunInBash:
             utils.run_in_bash(command)
 
 
+# =============================================================================
+class TestRun:
+    # -------------------------------------------------------------------------
+    def test_run_ok(self, tmpdir):
+        status = utils.run(['pwd'], cwd=Path(tmpdir))
+        assert status.ok
+        assert status.returncode == 0
+        assert Path(status.output).resolve() == Path(tmpdir).resolve()
+
+    # -------------------------------------------------------------------------
+    def test_run_env_ok(self):
+        status = utils.run(['/bin/bash', '-c', 'echo "$PPROJECT_RUN_TEST"'],
+                           env={'PPROJECT_RUN_TEST': 'a b; c'})
+        assert status.output == 'a b; c'
+
+    # -------------------------------------------------------------------------
+    def test_run_fails(self):
+        status = utils.run(['/bin/bash', '-c', 'echo failed; exit 3'],
+                           check=False)
+        assert not status.ok
+        assert status.returncode == 3
+        assert status.output == 'failed'
+        with pytest.raises(CalledProcessError) as err:
+            status.check()
+        assert err.value.output == b'failed'
+        assert utils.run(['umdibumdi'], check=False).returncode == 127
+
+    # -------------------------------------------------------------------------
+    def test_run_separate_stderr_ok(self):
+        status = utils.run(['/bin/bash', '-c', 'echo out; echo err >&2'],
+                           merge_stderr=False)
+        assert status.output == 'out'
+        assert status.error == 'err'
+        with pytest.raises(CalledProcessError) as err:
+            utils.run(['/bin/bash', '-c', 'echo err >&2; exit 1'],
+                      merge_stderr=False)
+        assert err.value.stderr == b'err'
+
+    # -------------------------------------------------------------------------
+    def test_run_timeout(self):
+        status = utils.run(['sleep', '5'], timeout=0.1, check=False)
+        assert status.timed_out
+        assert not status.ok
+        with pytest.raises(CalledProcessError):
+            utils.run(['sleep', '5'], timeout=0.1)
+
+
+# =============================================================================
+class TestRunStreaming:
+    # -------------------------------------------------------------------------
+    def test_run_streaming_ok(self):
+        lines = []
+        script = ('import sys, time\n'
+                  'out = sys.stdout.buffer\n'
+                  'out.write(b"first \\xc3"); out.flush(); '
+                  'time.sleep(0.05)\n'
+                  'out.write(b"\\xa4\\nsecond\\rthird\\r\\nfourth")\n')
+        status = utils.run_streaming([sys.executable, '-c', script],
+                                     progress=lines.append)
+        assert status.ok
+        assert lines == ['first \u00e4', 'second', 'third', 'fourth']
+        assert status.output == 'first \u00e4\nsecond\nthird\nfourth'
+
+    # -------------------------------------------------------------------------
+    def test_run_streaming_tail_ok(self):
+        lines = []
+        status = utils.run_streaming(['seq', '1000'], progress=lines.append,
+                                     tail=3)
+        assert len(lines) == 1000
+        assert status.output == '998\n999\n1000'
+
+    # -------------------------------------------------------------------------
+    def test_run_streaming_fails(self, capsys):
+        with pytest.raises(CalledProcessError) as err:
+            utils.run_streaming(['/bin/bash', '-c', 'echo failed; exit 1'])
+        assert err.value.output == b'failed'
+        assert 'BASH' in capsys.readouterr()[0]
+        status = utils.run_streaming(['sleep', '5'], timeout=0.1,
+                                     check=False, progress=print)
+        assert status.timed_out
+
+
+# -----------------------------------------------------------------------------
+def test_probe_url_cached_ok():
+    url = 'http://127.0.0.1:1'
+    assert utils.probe_url(url=url, timeout=1) is None
+    assert url in utils.URL_PROBES
+
+
 # =============================================================================
 class TestConnectSSH:
     # -------------------------------------------------------------------------
@@ -82,22 +184,138 @@ class TestConnectSSH:
         with pytest.raises(SystemExit):
             utils.connect_ssh(userathost)
 
+    # -------------------------------------------------------------------------
+    def test_ssh_connection_pooled_ok(self, monkeypatch):
+        class Transport:
+            active = True
+            keepalive = None
+
+            def is_active(self):
+                return self.active
+
+            def set_keepalive(self, interval):
+                self.keepalive = interval
+
+        class SSH:
+            closed = False
+
+            def __init__(self):
+                self.transport = Transport()
+
+            def get_transport(self):
+                return self.transport
+
+            def close(self):
+                self.closed = True
+
+        opened = []
+
+        def connect_ssh(dst):
+            opened.append(SSH())
+            return opened[-1]
+        monkeypatch.setattr(utils, 'connect_ssh', connect_ssh)
+        monkeypatch.setattr(utils, 'SSH_CONNECTIONS', {})
+        ssh = utils.ssh_connection('user@host')
+        assert utils.ssh_connection('user@host') is ssh
+        assert ssh.transport.keepalive == utils.SSH_KEEPALIVE
+        assert utils.ssh_connection('other@host') is not ssh
+        ssh.transport.active = False
+        assert utils.ssh_connection('user@host') is not ssh
+        assert len(opened) == 3
+        utils.close_ssh_connections()
+        assert not utils.SSH_CONNECTIONS
+        assert all(_.closed for _ in opened[1:])
+
 
 # =============================================================================
 class TestConfig:
     # -------------------------------------------------------------------------
-    def test_load_configs_ok(self):
-        utils.load_configs(user_config_path=Path(testconfig_path).absolute())
+    def test_load_configs_ok(self, tmpdir):
+        utils.load_configs(user_config_path=Path(testconfig_path).absolute(),
+                           snapshot_path=Path(tmpdir) / 'config.pickle')
 
     # -------------------------------------------------------------------------
-    def test_get_config_ok(self, capsys):
+    def test_get_config_ok(self, capsys, tmpdir, monkeypatch):
+        monkeypatch.setattr(utils, 'CONFIG_SNAPSHOT_PATH',
+                            Path(tmpdir) / 'config.pickle')
         utils.get_config_for_terminal()
         captured = capsys.readouterr()
         assert captured[0] == (
             'conda_folder=/var/local/conda\n'
+            'env_cache_folder=/var/local/conda/pproject_env_cache\n'
+            'env_cache_size=20000\n'
+            'build_cache_folder=/var/local/conda/pproject_build_cache\n'
+            'build_cache_size=5000\n'
+            'build_cache_max_age=30\n'
+            'repodata_cache_ttl=600\n'
             'meta_yaml_path=conda-build/meta.yaml\n'
             'meta_yaml_md5_path=conda-build/hash.md5\n'
             'pproject_env=/var/local/conda/envs/pproject\n'
             'skeleton_repo=git@gitlab.com:skallfass-ouroboros/skeleton.git\n'
             'company=ouroboros\n'
+            'remote_timeout=5\n'
+            'namespaces_cache_ttl=3600\n'
+            'release_workers=8\n'
+            'release_max_failure_rate=0.25\n'
+            'ssh_command_timeout=3600\n'
             )
+
+    # -------------------------------------------------------------------------
+    def test_lazy_config_memoized_ok(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(utils, 'CONFIG_SNAPSHOT_PATH',
+                            Path(tmpdir) / 'config.pickle')
+        config = utils.LazyConfig(
+            user_config_path=Path(testconfig_path).absolute())
+        assert config.load() is config.load()
+        assert config['company'] == config.load()['company']
+
+    # -------------------------------------------------------------------------
+    def test_lazy_config_reload_ok(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(utils, 'CONFIG_SNAPSHOT_PATH',
+                            Path(tmpdir) / 'config.pickle')
+        config = utils.LazyConfig(
+            user_config_path=Path(testconfig_path).absolute())
+        content = config.load()
+        assert config.reload() is not content
+        assert config.reload() == content
+
+    # -------------------------------------------------------------------------
+    def test_load_configs_snapshot_ok(self, tmpdir, monkeypatch):
+        user_config = Path(tmpdir) / 'pproject_config.yml'
+        user_config.write_text('company: snapshot\n')
+        snapshot_path = Path(tmpdir) / 'config.pickle'
+        config = utils.load_configs(user_config_path=user_config,
+                                    snapshot_path=snapshot_path)
+        assert snapshot_path.exists()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('config-files parsed again')
+        monkeypatch.setattr(yaml, 'load', fail)
+        assert utils.load_configs(user_config_path=user_config,
+                                  snapshot_path=snapshot_path) == config
+
+    # -------------------------------------------------------------------------
+    def test_load_configs_snapshot_outdated_ok(self, tmpdir):
+        user_config = Path(tmpdir) / 'pproject_config.yml'
+        user_config.write_text('company: snapshot\n')
+        snapshot_path = Path(tmpdir) / 'config.pickle'
+        utils.load_configs(user_config_path=user_config,
+                           snapshot_path=snapshot_path)
+        user_config.write_text('company: changed_snapshot\n')
+        config = utils.load_configs(user_config_path=user_config,
+                                    snapshot_path=snapshot_path)
+        assert config['company'] == 'changed_snapshot'
+
+    # -------------------------------------------------------------------------
+    @pytest.mark.parametrize('key', ['env_cache_size', 'build_cache_size',
+                                     'build_cache_max_age',
+                                     'repodata_cache_ttl',
+                                     'namespaces_cache_ttl',
+                                     'release_max_failure_rate',
+                                     'ssh_command_timeout'])
+    def test_load_configs_zero_ok(self, tmpdir, key):
+        user_config = Path(tmpdir) / 'pproject_config.yml'
+        user_config.write_text(f'{key}: 0\n')
+        config = utils.load_configs(user_config_path=user_config,
+                                    use_snapshot=False)
+        assert config[key] == 0
@@ -95,7 +95,15 @@ def test_validate_SConfig_ok():
                   conda_repo_userathost='bla@blub',
                   conda_repo_pkgs_path='/var/local/conda/conda-bld/linux-64',
                   conda_repo_conda_bin='/var/local/conda/bin/conda',
-                  pytest_arguments=['--cache', '-r'])
+                  pytest_arguments=['--cache', '-r'],
+                  remote_timeout=5)
+    validators.SConfig(strict=True).load(params)
+
+
+# -----------------------------------------------------------------------------
+def test_validate_SConfig_unreachable_url_ok():
+    params = dict(conda_folder='/var/local/conda',
+                  gitlab_url='http://127.0.0.1:1')
     validators.SConfig(strict=True).load(params)
 
 
@@ -119,7 +127,6 @@ def test_validate_SConfig_ok():
     ('company', None),
     ('company', 'ha'),
     ('gitlab_url', 'bla'),
-    ('gitlab_url', 'http://httpstat.us/500'),
     ('gitlab_url', None),
     ('gitlab_api', None),
     ('gitlab_token_path', None),
@@ -133,6 +140,8 @@ def test_validate_SConfig_ok():
     ('pytest_arguments', 'bla'),
     ('pytest_arguments', {}),
     ('pytest_arguments', [1, 'blub']),
+    ('remote_timeout', 0),
+    ('remote_timeout', 'bla'),
     ])
 def test_validate_SConfig_fails(attribute, value):
     params = dict(conda_folder='/var/local/conda',